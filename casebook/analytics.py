@@ -0,0 +1,174 @@
+"""Summary tables behind the analytics dashboard.
+
+``SpendSummary`` holds channel spend grouped by channel, sector, year and
+currency; ``CaseCountSummary`` holds case counts per organization, sector, tag
+and year. Edits re-aggregate only the slices they touch (a sector and year of
+spend, one organization or tag of counts) and ``rebuild_casebook_analytics``
+recomputes everything, so the dashboard reads a few small indexed tables instead
+of scanning cases and channel spend.
+"""
+
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import caching
+from .models import CaseChannelSpend, CaseCountSummary, CaseStudy, CaseStudyTag, SpendSummary
+
+# (value, label) lookups of each case count dimension on CaseStudy; tags are counted from CaseStudyTag.
+COUNT_FIELDS = {
+    CaseCountSummary.DIMENSION_ORGANIZATION: ("organization_id", "organization__name"),
+    CaseCountSummary.DIMENSION_SECTOR: ("sector_id", "sector__name"),
+    CaseCountSummary.DIMENSION_YEAR: ("sort_end__year", "sort_end__year"),
+}
+DIMENSIONS = [choice for choice, _ in CaseCountSummary.DIMENSION_CHOICES]
+
+
+def _key(value):
+    return "" if value is None else str(value)
+
+
+def _in(field, values):
+    values = set(values)
+    conditions = [Q(**{f"{field}__in": [value for value in values if value is not None]})]
+    if None in values:
+        conditions.append(Q(**{f"{field}__isnull": True}))
+    return reduce(or_, conditions)
+
+
+def _slices(slices, sector_field, year_field):
+    return reduce(or_, (Q(**{sector_field: sector, year_field: year}) for sector, year in slices))
+
+
+def refresh_spend(slices=None):
+    """Re-aggregate the ``(sector_id, year)`` slices of spend, or every slice when ``slices`` is ``None``."""
+    summaries = SpendSummary.objects.all()
+    rows = CaseChannelSpend.objects.all()
+    if slices is not None:
+        slices = set(slices)
+        if not slices:
+            return
+        summaries = summaries.filter(_slices(slices, "sector_id", "year"))
+        rows = rows.filter(_slices(slices, "case_study__sector_id", "case_study__sort_end__year"))
+
+    rows = rows.values(
+        "channel",
+        sector_id=F("case_study__sector_id"),
+        year=F("case_study__sort_end__year"),
+        currency=F("spend_currency"),
+    ).annotate(
+        rows=Count("pk"),
+        total=Coalesce(Sum("spend_amount"), Value(Decimal(0)), output_field=DecimalField()),
+        total_base=Sum("spend_amount_base"),
+    )
+    with transaction.atomic():
+        summaries.delete()
+        SpendSummary.objects.bulk_create([SpendSummary(**row) for row in rows], batch_size=1000)
+    caching.invalidate("analytics")
+
+
+def refresh_counts(dimension, keys=None):
+    """Recount cases for ``keys`` (primary keys or years, ``None`` for cases without one) of ``dimension``.
+
+    Every key of the dimension is recounted when ``keys`` is ``None``.
+    """
+    summaries = CaseCountSummary.objects.filter(dimension=dimension)
+    if dimension == CaseCountSummary.DIMENSION_TAG:
+        field = "tag_id"
+        rows = CaseStudyTag.objects.values(value=F("tag_id"), label=F("tag__name")).annotate(
+            cases=Count("content_object_id", distinct=True)
+        )
+    else:
+        field, label = COUNT_FIELDS[dimension]
+        rows = CaseStudy.objects.values(value=F(field), label=F(label)).annotate(cases=Count("pk"))
+    if keys is not None:
+        keys = set(keys)
+        if not keys:
+            return
+        summaries = summaries.filter(key__in=[_key(key) for key in keys])
+        rows = rows.filter(_in(field, keys))
+
+    with transaction.atomic():
+        summaries.delete()
+        CaseCountSummary.objects.bulk_create(
+            [
+                CaseCountSummary(
+                    dimension=dimension, key=_key(row["value"]), label=_key(row["label"]), cases=row["cases"]
+                )
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+    caching.invalidate("analytics")
+
+
+def case_keys(queryset):
+    """Return the ``(sector_id, organization_id, year)`` each case in ``queryset`` is counted under."""
+    return set(queryset.values_list("sector_id", "organization_id", "sort_end__year"))
+
+
+def refresh_cases(keys, tag_ids=()):
+    """Refresh every summary row that cases with ``keys`` (see ``case_keys``) and ``tag_ids`` contribute to."""
+    refresh_spend({(sector, year) for sector, _, year in keys})
+    refresh_counts(CaseCountSummary.DIMENSION_ORGANIZATION, {organization for _, organization, _ in keys})
+    refresh_counts(CaseCountSummary.DIMENSION_SECTOR, {sector for sector, _, _ in keys})
+    refresh_counts(CaseCountSummary.DIMENSION_YEAR, {year for _, _, year in keys})
+    refresh_counts(CaseCountSummary.DIMENSION_TAG, tag_ids)
+
+
+def rebuild():
+    with transaction.atomic():
+        refresh_spend()
+        for dimension in DIMENSIONS:
+            refresh_counts(dimension)
+    return SpendSummary.objects.count(), CaseCountSummary.objects.count()
+
+
+def dashboard(limit=10):
+    """Return the dashboard tables, read from the summary tables only."""
+    spend = SpendSummary.objects.all()
+    by_channel = list(
+        spend.values("channel").annotate(total=Sum("total_base"), rows=Sum("rows")).order_by("-total", "channel")
+    )
+    channels = [row["channel"] for row in by_channel]
+    by_year = {}
+    for row in spend.values("year", "channel").annotate(total=Sum("total_base")):
+        by_year.setdefault(row["year"], {})[row["channel"]] = row["total"]
+    years = [
+        {
+            "year": year,
+            "cells": [totals.get(channel) for channel in channels],
+            "total": sum(value for value in totals.values() if value is not None),
+        }
+        for year, totals in sorted(by_year.items(), key=lambda item: -(item[0] or 0))
+    ]
+
+    counts = {}
+    for dimension in DIMENSIONS:
+        rows = CaseCountSummary.objects.filter(dimension=dimension)
+        if dimension == CaseCountSummary.DIMENSION_YEAR:
+            rows = rows.order_by("-key")
+        else:
+            rows = rows.order_by("-cases", "label")
+        counts[dimension] = list(rows[:limit])
+
+    return {
+        "channels": channels,
+        "spend_by_channel": by_channel,
+        "spend_by_year": years,
+        "spend_by_sector": list(
+            spend.values(name=F("sector__name"))
+            .annotate(total=Sum("total_base"), rows=Sum("rows"))
+            .order_by("-total", "name")[:limit]
+        ),
+        "spend_by_currency": list(
+            spend.values("currency")
+            .annotate(total=Sum("total"), total_base=Sum("total_base"), rows=Sum("rows"))
+            .order_by("currency")
+        ),
+        "case_counts": counts,
+    }
@@ -0,0 +1,124 @@
+"""Read-only JSON API over the casebook, in the ``export_casebook`` case shape.
+
+``fields=`` picks the keys returned; only the columns, joins and prefetches
+those keys read are loaded. Lists are keyset paginated like the index, so a
+request loads one page of cases however many match. Every response carries an
+ETag (and Last-Modified) computed from one aggregate query before any case is
+loaded, so a client that is up to date gets a 304 at that cost.
+"""
+
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from .conditional import collection_version, make_etag, not_modified, set_validators
+from .export import CASE_FIELDS, asset_queryset, serialize_case
+from .facets import FACETS, apply_filters
+from .models import CASE_ORDERING, CaseStudy
+from .pagination import cursor_url, paginate, requested_page_size
+from .replica import replica_reads
+from .search import filter_cases
+
+# Model columns read by output keys that are not simply the column of the same name.
+FIELD_COLUMNS = {
+    "organization": ["organization__name"],
+    "sector": ["sector__name"],
+    "tags": [],
+    "metrics": [],
+    "channel_spend": [],
+    "assets": [],
+}
+SELECT_RELATED = ["organization", "sector"]
+PREFETCHED = ["tags", "metrics", "channel_spend", "assets"]
+
+
+def _prefetch(name):
+    return Prefetch("assets", queryset=asset_queryset()) if name == "assets" else name
+
+
+def requested_fields(request):
+    """Return the keys named by ``?fields=`` (always including ``slug``), or every key when absent."""
+    raw = request.GET.get("fields", "")
+    if not raw.strip():
+        return list(CASE_FIELDS)
+    names = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = names - CASE_FIELDS.keys()
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}.")
+    return [name for name in CASE_FIELDS if name in names or name == "slug"]
+
+
+def case_queryset(fields, queryset=None):
+    """``queryset`` narrowed to load only what serializing ``fields`` reads."""
+    queryset = CaseStudy.objects.all() if queryset is None else queryset
+    columns = {"pk", *(name.lstrip("-") for name in CASE_ORDERING)}
+    for name in fields:
+        columns.update(FIELD_COLUMNS.get(name, [name]))
+    related = [name for name in fields if name in SELECT_RELATED]
+    prefetches = [_prefetch(name) for name in fields if name in PREFETCHED]
+    return queryset.select_related(*related).prefetch_related(*prefetches).only(*columns)
+
+
+def _error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+@replica_reads
+@require_safe
+def case_list(request):
+    try:
+        fields = requested_fields(request)
+    except ValueError as exc:
+        return _error(str(exc))
+    filters = {facet: request.GET.get(facet, "").strip() for facet in FACETS}
+    if not filters["year"].isdigit():
+        filters["year"] = ""
+    scope = apply_filters(filter_cases(CaseStudy.objects.all(), request.GET.get("q", "").strip()), filters)
+    if filters["tag"]:
+        # Tag names match case-insensitively, so one case can join more than one tag.
+        scope = scope.distinct()
+
+    count, latest = collection_version(scope)
+    etag = make_etag("list", request.GET.urlencode(), count, latest)
+    response = not_modified(request, etag, latest)
+    if response is not None:
+        return response
+
+    page = paginate(
+        case_queryset(fields, scope),
+        CASE_ORDERING,
+        requested_page_size(request),
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+    )
+    payload = {
+        "results": [serialize_case(case, fields=fields) for case in page],
+        "next": request.build_absolute_uri(cursor_url(request, "after", page.next_cursor)) if page.has_next else None,
+        "previous": (
+            request.build_absolute_uri(cursor_url(request, "before", page.previous_cursor))
+            if page.has_previous
+            else None
+        ),
+    }
+    return set_validators(JsonResponse(payload), etag, latest)
+
+
+@replica_reads
+@require_safe
+def case_detail(request, slug):
+    try:
+        fields = requested_fields(request)
+    except ValueError as exc:
+        return _error(str(exc))
+    latest = CaseStudy.objects.filter(slug=slug).values_list("updated_at", flat=True).first()
+    if latest is None:
+        return _error("No case study with that slug.", status=404)
+    etag = make_etag("case", slug, request.GET.get("fields", ""), latest)
+    response = not_modified(request, etag, latest)
+    if response is not None:
+        return response
+
+    case = case_queryset(fields).filter(slug=slug).first()
+    if case is None:
+        return _error("No case study with that slug.", status=404)
+    return set_validators(JsonResponse(serialize_case(case, fields=fields)), etag, latest)
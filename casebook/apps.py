@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
 
 
 class CasebookConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "casebook"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import configure_sqlite
+        from .replica import check_shared_cache
+
+        connection_created.connect(configure_sqlite, dispatch_uid="casebook_configure_sqlite")
+        checks.register(check_shared_cache, checks.Tags.caches)
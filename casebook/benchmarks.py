@@ -0,0 +1,160 @@
+"""Percentile benchmarks over parsed metric values.
+
+Every value compared is loaded with one query, grouped and sorted as arrays,
+and summarised with NumPy when it is installed (otherwise a pure-Python
+fallback with the same results), so the cost is one query and one sort however
+many cases take part. Values are only compared with values of the same metric
+name and unit.
+"""
+
+import bisect
+import math
+
+from .metrics import metric_key
+from .models import CaseMetric
+
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover - depends on the environment
+    _np = None
+
+PERCENTILES = [10, 25, 50, 75, 90]
+# With fewer comparable values a percentile says nothing useful.
+MIN_SAMPLE = 3
+GROUP_FIELDS = {
+    "sector": "case_study__sector__name",
+    "organization": "case_study__organization__name",
+    "year": "case_study__sort_end__year",
+}
+
+
+def _quantile(values, percent):
+    # Linear interpolation between closest ranks, as numpy.percentile does by default.
+    position = (len(values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def ordinal(number):
+    suffix = "th" if 10 <= number % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
+
+
+class Distribution:
+    """Sorted values of one metric, unit and group."""
+
+    def __init__(self, values):
+        self.values = _np.sort(_np.asarray(values, dtype=float)) if _np is not None else sorted(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def mean(self):
+        return float(self.values.mean()) if _np is not None else sum(self.values) / len(self.values)
+
+    def percentiles(self, percents=PERCENTILES):
+        if _np is not None:
+            return dict(zip(percents, (float(value) for value in _np.percentile(self.values, percents))))
+        return {percent: _quantile(self.values, percent) for percent in percents}
+
+    def ranks(self, values):
+        """Mid-rank percentile (0-100) of each of ``values`` within the distribution."""
+        if _np is not None:
+            values = _np.asarray(values, dtype=float)
+            below = _np.searchsorted(self.values, values, side="left")
+            not_above = _np.searchsorted(self.values, values, side="right")
+            return ((below + not_above) * 50 / len(self.values)).tolist()
+        return [
+            (bisect.bisect_left(self.values, value) + bisect.bisect_right(self.values, value)) * 50 / len(self.values)
+            for value in values
+        ]
+
+    def histogram(self, bins=10):
+        """Return ``[(lower, upper, count), ...]`` over equal-width bins, the last one closed."""
+        if _np is not None:
+            counts, edges = _np.histogram(self.values, bins=bins)
+            return [(float(edges[i]), float(edges[i + 1]), int(counts[i])) for i in range(len(counts))]
+        low, high = self.values[0], self.values[-1]
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        width = (high - low) / bins
+        edges = [low + width * i for i in range(bins)] + [high]
+        counts = [0] * bins
+        for value in self.values:
+            counts[min(int((value - low) / width), bins - 1)] += 1
+        return [(edges[i], edges[i + 1], counts[i]) for i in range(bins)]
+
+
+def _group(rows):
+    """Split ``(key, ..., value)`` rows into ``{key: Distribution}`` with one sort."""
+    codes, keys, values = [], {}, []
+    for *key, value in rows:
+        codes.append(keys.setdefault(tuple(key), len(keys)))
+        values.append(value)
+    labels = list(keys)
+    if not values:
+        return {}
+    if _np is None:
+        grouped = {}
+        for code, value in zip(codes, values):
+            grouped.setdefault(labels[code], []).append(value)
+        return {label: Distribution(group) for label, group in grouped.items()}
+
+    codes, values = _np.asarray(codes), _np.asarray(values, dtype=float)
+    order = _np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    starts = _np.flatnonzero(_np.diff(codes)) + 1
+    return {
+        labels[group_codes[0]]: Distribution(group_values)
+        for group_codes, group_values in zip(_np.split(codes, starts), _np.split(values, starts))
+    }
+
+
+def metric_distributions(metric_name, by=None, **filters):
+    """Return ``{(unit, group): Distribution}`` for ``metric_name`` across every case matching ``filters``.
+
+    ``by`` is a key of ``GROUP_FIELDS``; without it every case falls in the ``None`` group.
+    """
+    metrics = CaseMetric.objects.filter(metric_key=metric_key(metric_name), value_number__isnull=False, **filters)
+    fields = ["value_unit", GROUP_FIELDS[by]] if by else ["value_unit"]
+    distributions = _group(metrics.values_list(*fields, "value_number"))
+    return {(key[0], key[1] if by else None): distribution for key, distribution in distributions.items()}
+
+
+class MetricBenchmark:
+    def __init__(self, rank, count, scope):
+        self.rank = rank
+        self.count = count
+        self.scope = scope
+
+    def __str__(self):
+        return f"{ordinal(round(self.rank))} percentile in {self.scope}"
+
+
+def attach_sector_benchmarks(case):
+    """Set ``benchmark`` on each of ``case``'s metrics to its rank among the metrics of its sector.
+
+    One query covers all of the case's metrics; ``benchmark`` is ``None`` where
+    there is no sector, no parsed number or fewer than ``MIN_SAMPLE`` values.
+    """
+    metrics = list(case.metrics.all())
+    for metric in metrics:
+        metric.benchmark = None
+    numeric = [metric for metric in metrics if metric.value_number is not None]
+    if not case.sector_id or not numeric:
+        return metrics
+
+    rows = CaseMetric.objects.filter(
+        metric_key__in={metric.metric_key for metric in numeric},
+        value_number__isnull=False,
+        case_study__sector_id=case.sector_id,
+    ).values_list("metric_key", "value_unit", "value_number")
+    distributions = _group(rows)
+    for metric in numeric:
+        distribution = distributions.get((metric.metric_key, metric.value_unit))
+        if distribution is not None and len(distribution) >= MIN_SAMPLE:
+            (rank,) = distribution.ranks([metric.value_number])
+            metric.benchmark = MetricBenchmark(rank, len(distribution), case.sector.name)
+    return metrics
@@ -0,0 +1,99 @@
+"""Cache for rendered casebook pages and facet counts.
+
+Entries are keyed under version tokens: one per case (``case:<slug>``) and one
+for everything listed on the index (``index``). The signal handlers replace the
+affected tokens on every edit, so stale entries are never read again and simply
+age out. Anonymous GET requests are answered from the cache without touching the
+database; everyone else gets a freshly rendered page. Behind
+``conditional_page`` the key also carries the page's validator version, which
+covers data the page shows from other cases. Keys also name the
+database the page is read from, and for the read replica the version of its
+last sync, so a page rendered from a replica that had not caught up yet is
+replaced once it has.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from . import replica
+
+# Rendered in place of the CSRF token so cached pages can be shared between visitors.
+CSRF_PLACEHOLDER = "casebook-csrf-token-placeholder"
+
+
+def page_cache():
+    return caches[settings.CASEBOOK_CACHE]
+
+
+def _version_key(scope):
+    return f"casebook:version:{scope}"
+
+
+def version(scope):
+    return page_cache().get_or_set(_version_key(scope), time.time_ns, None)
+
+
+def invalidate(*scopes):
+    token = time.time_ns()
+    page_cache().set_many({_version_key(scope): token for scope in scopes}, None)
+
+
+def invalidate_cases(slugs, index=True):
+    scopes = [f"case:{slug}" for slug in slugs if slug]
+    if index:
+        scopes.append("index")
+    if scopes:
+        invalidate(*scopes)
+
+
+def read_source():
+    """Cache key part naming where the current request reads casebook content from."""
+    alias = replica.read_alias()
+    if alias == replica.replica_alias():
+        return f"{alias}.{version(replica.CACHE_SCOPE)}"
+    return alias
+
+
+def _with_csrf_token(request, content):
+    if CSRF_PLACEHOLDER.encode() in content:
+        content = content.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+    return content
+
+
+def cached_page(scope_for):
+    """Serve a view from the page cache under the version of ``scope_for(request, **kwargs)``."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+                response = view(request, *args, **kwargs)
+                if not response.streaming:
+                    response.content = _with_csrf_token(request, response.content)
+                return response
+
+            scope = scope_for(request, **kwargs)
+            path = hashlib.sha256(request.get_full_path().encode("utf-8")).hexdigest()
+            page_version = getattr(request, "casebook_page_version", "")
+            key = f"casebook:page:{scope}:{version(scope)}:{read_source()}:{page_version}:{path}"
+            cached = page_cache().get(key)
+            if cached is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                if hasattr(response, "render"):
+                    response.render()
+                cached = (response.content, response["Content-Type"])
+                page_cache().set(key, cached, settings.CASEBOOK_PAGE_CACHE_TIMEOUT)
+            content, content_type = cached
+            return HttpResponse(_with_csrf_token(request, content), content_type=content_type)
+
+        return wrapper
+
+    return decorator
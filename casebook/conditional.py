@@ -0,0 +1,90 @@
+"""HTTP validators (ETag / Last-Modified) for casebook responses.
+
+Validators are derived from ``updated_at``, which the save and change-tracking
+signals bump whenever a case or anything shown with it changes. Checking them
+costs one small query, and a client that is already up to date gets a 304
+before anything is loaded or rendered.
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def collection_version(queryset):
+    """Return ``(count, latest updated_at)`` of ``queryset`` in one aggregate query.
+
+    The count catches deletions, which leave no newer ``updated_at`` behind.
+    """
+    totals = queryset.order_by().aggregate(count=Count("pk"), latest=Max("updated_at"))
+    return totals["count"], totals["latest"]
+
+
+def make_etag(*parts):
+    raw = json.dumps(parts, default=str, sort_keys=True).encode("utf-8")
+    return quote_etag(hashlib.sha256(raw).hexdigest()[:32])
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """Return a 304 (or 412 for unsafe methods) when the request's validators match, otherwise ``None``."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_page(version_for):
+    """Validate GET/HEAD requests against ``version_for(request, **kwargs)`` before calling the view.
+
+    ``version_for`` returns ``(parts, last_modified)`` for the ETag, or ``None``
+    when there is nothing to validate (the view will 404). The ETag also covers
+    the full path, the visitor's CSRF secret and whether they are signed in,
+    since rendered pages embed a CSRF token and may differ for signed-in users.
+    """
+
+    def page_etag(request, parts):
+        # CSRF_COOKIE holds the secret the response will carry, including one the view just issued.
+        return make_etag(
+            request.get_full_path(), request.META.get("CSRF_COOKIE", ""), request.user.is_authenticated, *parts
+        )
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            version = version_for(request, **kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            parts, last_modified = version
+            # cached_page keys the rendered page under this too, so a cache entry can't outlive its validators.
+            request.casebook_page_version = make_etag(*parts)
+            response = not_modified(request, page_etag(request, parts), last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                set_validators(response, page_etag(request, parts), last_modified)
+            # Revalidate on every use; an unchanged page then costs the version query and a 304.
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,486 @@
+import gzip
+import hashlib
+import json
+import re
+import textwrap
+from contextlib import suppress
+from datetime import date, datetime, timezone
+from operator import attrgetter
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.text import slugify
+
+from .dates import parse_date_range
+from .models import CASE_ORDERING, CaseAsset, CaseStudy
+from .packing import iter_unpack, packb
+from .renditions import EXPORT_RENDITION_SPECS, existing_renditions, renditions_prefetch
+
+SHARD_FIELDS = {
+    "organization": ("organization_id", "organization__name"),
+    "sector": ("sector_id", "sector__name"),
+    "year": ("sort_end",),
+}
+FORMATS = ["json", "json.gz", "ndjson", "ndjson.gz", "msgpack"]
+
+
+def _split_lines(value):
+    if not value:
+        return []
+    return [line.strip() for line in value.splitlines() if line.strip()]
+
+
+def serialize_asset(asset):
+    image_urls = None
+    placeholder = None
+    video_url = None
+    if asset.image:
+        placeholder = {"color": asset.placeholder_color or None, "data_uri": asset.placeholder_data_uri or None}
+        image_urls = {"original": asset.image.file.url}
+        # Missing renditions are generated up front, so this is a read of the prefetched set.
+        renditions = existing_renditions(asset.image, [spec for _, spec in EXPORT_RENDITION_SPECS])
+        for key, spec in EXPORT_RENDITION_SPECS:
+            image_urls[key] = renditions[spec].url if spec in renditions else None
+    if asset.video:
+        video_url = asset.video.file.url
+
+    return {
+        "type": asset.asset_type,
+        "caption": asset.caption,
+        "platform": asset.platform,
+        "format": asset.format,
+        "date": asset.date,
+        "is_hero": asset.is_hero,
+        "alt_text": asset.alt_text,
+        "image_urls": image_urls,
+        "placeholder": placeholder,
+        "video": {
+            "title": asset.video.title if asset.video else None,
+            "url": video_url,
+            "filename": asset.video.file.name if asset.video else None,
+        },
+    }
+
+
+def _amount(value):
+    return str(value) if value is not None else None
+
+
+def _serialize_metrics(case):
+    return [
+        {
+            "metric_name": metric.metric_name,
+            "value": metric.value,
+            "timeframe": metric.timeframe,
+            "source": metric.source,
+            "notes": metric.notes,
+        }
+        for metric in case.metrics.all()
+    ]
+
+
+def _serialize_channel_spend(case):
+    return [
+        {
+            "channel": spend.channel,
+            "spend_currency": spend.spend_currency,
+            "spend_amount": _amount(spend.spend_amount),
+            "dates": spend.dates,
+            "notes": spend.notes,
+        }
+        for spend in case.channel_spend.all()
+    ]
+
+
+# Output key -> value for one case, in export order; fields named after a model column read it as is.
+CASE_FIELDS = {
+    "title": attrgetter("title"),
+    "slug": attrgetter("slug"),
+    "organization": lambda case: case.organization.name if case.organization else None,
+    "sector": lambda case: case.sector.name if case.sector else None,
+    "brand_or_campaign": attrgetter("brand_or_campaign"),
+    "date_start": attrgetter("date_start"),
+    "date_end": attrgetter("date_end"),
+    "sort_date": attrgetter("sort_date"),
+    "updated_at": lambda case: case.updated_at.isoformat(),
+    "location": attrgetter("location"),
+    "one_liner": attrgetter("one_liner"),
+    "objective": attrgetter("objective"),
+    "audience": attrgetter("audience"),
+    "constraints": attrgetter("constraints"),
+    "strategy": attrgetter("strategy"),
+    "creative_direction": attrgetter("creative_direction"),
+    "production_and_tooling": attrgetter("production_and_tooling"),
+    "delivery_and_distribution": attrgetter("delivery_and_distribution"),
+    "my_contribution": attrgetter("my_contribution"),
+    "team_and_partners": attrgetter("team_and_partners"),
+    "results_summary": attrgetter("results_summary"),
+    "what_worked": attrgetter("what_worked"),
+    "what_id_do_differently": attrgetter("what_id_do_differently"),
+    "spend_currency": attrgetter("spend_currency"),
+    "spend_amount_min": lambda case: _amount(case.spend_amount_min),
+    "spend_amount_max": lambda case: _amount(case.spend_amount_max),
+    "spend_notes": attrgetter("spend_notes"),
+    "proof_links": lambda case: _split_lines(case.proof_links),
+    "press_mentions": lambda case: _split_lines(case.press_mentions),
+    "tags": lambda case: [tag.name for tag in case.tags.all()],
+    "metrics": _serialize_metrics,
+    "channel_spend": _serialize_channel_spend,
+    "assets": lambda case: [serialize_asset(asset) for asset in case.assets.all()],
+}
+
+
+def serialize_case(case, include_notes=False, fields=None):
+    """Return the export payload of ``case``, limited to the keys in ``fields`` when given."""
+    if fields is None:
+        payload = {name: serialize(case) for name, serialize in CASE_FIELDS.items()}
+    else:
+        payload = {name: serialize(case) for name, serialize in CASE_FIELDS.items() if name in fields}
+    if include_notes:
+        payload["notes"] = case.notes
+    return payload
+
+
+def asset_queryset():
+    """Assets with their media and export renditions, for prefetching under cases."""
+    return CaseAsset.objects.select_related("image", "video").prefetch_related(
+        renditions_prefetch([spec for _, spec in EXPORT_RENDITION_SPECS], lookup="image__renditions")
+    )
+
+
+def export_queryset():
+    return (
+        CaseStudy.objects.select_related("organization", "sector")
+        .prefetch_related(
+            "tags",
+            "metrics",
+            "channel_spend",
+            Prefetch("assets", queryset=asset_queryset()),
+        )
+        .order_by(*CASE_ORDERING)
+    )
+
+
+def shard_partitions(shard_by):
+    """Return ``{(file_stem, label): [pk, ...]}`` with pks in export order."""
+    rows = CaseStudy.objects.order_by(*CASE_ORDERING).values_list("pk", *SHARD_FIELDS[shard_by])
+    partitions = {}
+    for pk, *values in rows.iterator(chunk_size=2000):
+        if shard_by == "year":
+            label = str(values[0].year) if values[0] else None
+            stem = label or "undated"
+        else:
+            related_id, label = values
+            stem = f"{slugify(label) or shard_by}-{related_id}" if related_id else "unassigned"
+        partitions.setdefault((stem, label), []).append(pk)
+    return partitions
+
+
+def write_json(handle, cases, header, compact=False):
+    if compact:
+        return _write_compact_json(handle, cases, header)
+    # Emits the same layout as json.dumps({**header, "cases": [...]}, indent=2) one case at a time.
+    handle.write("{\n")
+    for key, value in header.items():
+        handle.write(f"  {json.dumps(key)}: {json.dumps(value, indent=2, ensure_ascii=True)}".replace("\n", "\n  "))
+        handle.write(",\n")
+    handle.write('  "cases": [')
+    written = 0
+    for case in cases:
+        handle.write(",\n" if written else "\n")
+        handle.write(textwrap.indent(json.dumps(case, indent=2, ensure_ascii=True), "    "))
+        written += 1
+    handle.write("\n  ]\n}" if written else "]\n}")
+    return written
+
+
+def _write_compact_json(handle, cases, header):
+    handle.write("{")
+    for key, value in header.items():
+        handle.write(f"{json.dumps(key)}:{json.dumps(value, ensure_ascii=False, separators=(',', ':'))},")
+    handle.write('"cases":[')
+    written = 0
+    for case in cases:
+        if written:
+            handle.write(",")
+        handle.write(json.dumps(case, ensure_ascii=False, separators=(",", ":")))
+        written += 1
+    handle.write("]}")
+    return written
+
+
+def write_ndjson(handle, cases, header, compact=False):
+    written = 0
+    for case in cases:
+        handle.write(json.dumps(case, ensure_ascii=not compact, separators=(",", ":")))
+        handle.write("\n")
+        written += 1
+    for slug in header.get("deleted", []):
+        handle.write(json.dumps({"slug": slug, "deleted": True}, separators=(",", ":")))
+        handle.write("\n")
+    return written
+
+
+def write_msgpack(handle, cases, header, compact=False):
+    # A header map followed by one map per case, so the file can be written and read as a stream.
+    handle.write(packb(header))
+    written = 0
+    for case in cases:
+        handle.write(packb(case))
+        written += 1
+    return written
+
+
+WRITERS = {
+    "json": write_json,
+    "ndjson": write_ndjson,
+    "msgpack": write_msgpack,
+}
+
+
+class _TextStream:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def write(self, text):
+        return self.raw.write(text.encode("utf-8"))
+
+
+class HashingFile:
+    """Binary file wrapper that records the SHA-256 and size of everything written through it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+
+def write_export(raw, export_format, cases, header, compact=False):
+    """Write ``header`` and ``cases`` to the binary file ``raw`` in one of ``FORMATS``."""
+    encoding, _, compression = export_format.partition(".")
+    # mtime=0 keeps gzip output byte-identical for identical content.
+    layer = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) if compression == "gz" else raw
+    try:
+        stream = layer if encoding == "msgpack" else _TextStream(layer)
+        return WRITERS[encoding](stream, cases, header, compact=compact)
+    finally:
+        if layer is not raw:
+            layer.close()
+
+
+def open_download(export_format, version_tag, chunk_size=200):
+    """Open a compact export of every case (without notes) for ``version_tag``, for reading as bytes.
+
+    The file is written on first use into ``CASEBOOK_EXPORT_DOWNLOAD_DIR`` and
+    reused until the tag changes. The previous version's file is kept for
+    downloads that looked it up just before the change; older ones are removed.
+    """
+    directory = Path(settings.CASEBOOK_EXPORT_DOWNLOAD_DIR)
+    path = directory / f"casebook-{version_tag}.{export_format}"
+    try:
+        return path.open("rb")
+    except FileNotFoundError:
+        pass
+    directory.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.{uuid4().hex}.partial")
+    try:
+        with transaction.atomic(), partial.open("wb") as handle:
+            queryset = export_queryset()
+            header = {"generated_at": datetime.now(timezone.utc).isoformat(), "count": queryset.count()}
+            cases = (serialize_case(case) for case in queryset.iterator(chunk_size=chunk_size))
+            write_export(handle, export_format, cases, header, compact=True)
+        partial.replace(path)
+    finally:
+        partial.unlink(missing_ok=True)
+    # Opened before pruning, so a concurrent build of a newer version cannot remove it first.
+    download = path.open("rb")
+    others = sorted(
+        (stale for stale in directory.glob(f"casebook-*.{export_format}") if stale != path),
+        key=_mtime,
+        reverse=True,
+    )
+    for stale in others[1:]:
+        # Another request may still be streaming it (Windows refuses), or have removed it already.
+        with suppress(OSError):
+            stale.unlink()
+    return download
+
+
+def _mtime(path):
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0
+
+
+def detect_format(path, formats=FORMATS):
+    """Return the format of ``formats`` that ``path``'s name ends with, or ``None``."""
+    for export_format in sorted(formats, key=len, reverse=True):
+        if str(path).endswith(f".{export_format}"):
+            return export_format
+    return None
+
+
+def open_text(path, compressed=None):
+    """Open ``path`` as UTF-8 text, through gzip when ``compressed`` (default: when the name ends in ``.gz``)."""
+    if compressed is None:
+        compressed = str(path).endswith(".gz")
+    if compressed:
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def read_export(path, export_format=None):
+    """Load an export file as ``(header, cases)``; see ``iter_export``."""
+    header = {}
+    cases = list(iter_export(path, header, export_format))
+    return header, cases
+
+
+class _JSONStream:
+    """Decode the values of a JSON document one at a time from a text file."""
+
+    def __init__(self, handle, chunk_size=1 << 16):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.handle.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self):
+        """Return the next significant character, skipping whitespace and ``,``/``:`` separators."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n,:":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON export.")
+
+    def take(self, expected):
+        if self.peek() != expected:
+            raise ValueError(f"Expected {expected!r} in JSON export, found {self.buffer[self.pos]!r}.")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # A number ending exactly at the buffer edge may continue in the next chunk.
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_envelope(handle, header):
+    stream = _JSONStream(handle)
+    stream.take("{")
+    has_cases = False
+    while stream.peek() != "}":
+        key = stream.value()
+        if key != "cases":
+            header[key] = stream.value()
+            continue
+        has_cases = True
+        stream.take("[")
+        while stream.peek() != "]":
+            yield stream.value()
+        stream.take("]")
+    if not has_cases:
+        raise ValueError('the JSON envelope has no "cases" list.')
+
+
+def iter_export(path, header=None, export_format=None):
+    """Yield the cases of an export file without loading it whole.
+
+    ``export_format`` is one of ``FORMATS``; by default it is taken from the
+    file name, falling back to ``json``. Header fields (and NDJSON tombstones,
+    as ``header["deleted"]``) are collected into ``header``, which is complete
+    once the iterator is exhausted.
+    """
+    header = {} if header is None else header
+    encoding, _, compression = (export_format or detect_format(path) or "json").partition(".")
+    if encoding == "msgpack":
+        with open(path, "rb") as handle:
+            items = iter_unpack(handle)
+            header.update(next(items, {}))
+            yield from items
+        return
+
+    with open_text(path, compressed=compression == "gz") as handle:
+        if encoding == "json":
+            yield from _iter_envelope(handle, header)
+            return
+        header.setdefault("deleted", [])
+        for line in handle:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item.get("deleted") is True:
+                header["deleted"].append(item["slug"])
+            else:
+                yield item
+
+
+def read_generated_at(path, export_format=None):
+    """Return the ``generated_at`` of an export file, or ``None`` for NDJSON, which has no header.
+
+    ``export_format`` is resolved as in ``iter_export``.
+    """
+    encoding, _, compression = (export_format or detect_format(path) or "json").partition(".")
+    if encoding == "ndjson":
+        return None
+    if encoding == "msgpack":
+        # The header is the first object, so only the start of the file is read.
+        with open(path, "rb") as handle:
+            header = next(iter_unpack(handle), {})
+        return header.get("generated_at") if isinstance(header, dict) else None
+    # generated_at is the first key of the envelope, so the head of the file is enough.
+    with open_text(path, compressed=compression == "gz") as handle:
+        match = re.search(r'"generated_at":\s*"([^"]+)"', handle.read(4096))
+    return match.group(1) if match else None
+
+
+def _sort_range(case):
+    for field in ["sort_date", "date_end", "date_start"]:
+        parsed = parse_date_range(case.get(field))
+        if parsed:
+            return parsed
+    return None, None
+
+
+def sort_cases(cases):
+    """Order serialized cases like ``CASE_ORDERING`` orders rows (undated cases last).
+
+    Ids are not exported, so the unique slug stands in for ``id`` as the last key.
+    """
+    ordered = sorted(cases, key=lambda case: (case["title"], case["slug"]))
+    ranges = {id(case): _sort_range(case) for case in ordered}
+    for position in (0, 1):
+        ordered.sort(
+            key=lambda case: (ranges[id(case)][position] is not None, ranges[id(case)][position] or date.min),
+            reverse=True,
+        )
+    return ordered
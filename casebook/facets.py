@@ -0,0 +1,84 @@
+"""Facet counts for the casebook index filters.
+
+Each facet counts the cases matching every *other* active filter, so the options
+shown are exactly the ones that lead somewhere. All four facets are grouped
+aggregates combined with UNION ALL into a single query, and the result is cached
+per filter combination under the index version token (see ``casebook.caching``).
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast, ExtractYear
+
+from .caching import page_cache, read_source, version
+
+FACETS = ("organization", "sector", "tag", "year")
+
+_GROUP_BY = {
+    "organization": (F("organization_id"), F("organization__name")),
+    "sector": (F("sector_id"), F("sector__name")),
+    "tag": (F("tags__name"), F("tags__name")),
+    "year": (ExtractYear("sort_end"), ExtractYear("sort_end")),
+}
+
+
+def apply_filters(queryset, filters, skip=None):
+    """Narrow ``queryset`` by the index filters in ``filters``, ignoring facet ``skip``."""
+    lookups = {
+        "organization": "organization_id",
+        "sector": "sector_id",
+        "tag": "tags__name__iexact",
+        "year": "sort_end__year",
+    }
+    for facet, lookup in lookups.items():
+        if facet != skip and filters.get(facet):
+            queryset = queryset.filter(**{lookup: filters[facet]})
+    return queryset
+
+
+def _grouped(queryset, facet):
+    key, label = _GROUP_BY[facet]
+    return (
+        queryset.order_by()
+        .annotate(facet_key=Cast(key, CharField()), facet_label=Cast(label, CharField()))
+        .filter(facet_key__isnull=False)
+        .values("facet_key", "facet_label")
+        .annotate(facet=Value(facet, CharField()), total=Count("pk", distinct=True))
+        .values_list("facet", "facet_key", "facet_label", "total")
+    )
+
+
+def _compute(scope, filters):
+    first, *rest = [_grouped(apply_filters(scope, filters, skip=facet), facet) for facet in FACETS]
+    facets = {facet: [] for facet in FACETS}
+    for facet, key, label, total in first.union(*rest, all=True):
+        facets[facet].append({"value": key, "label": label, "count": total})
+    for facet, options in facets.items():
+        if facet == "year":
+            options.sort(key=lambda option: option["value"], reverse=True)
+        else:
+            options.sort(key=lambda option: (-option["count"], option["label"].lower()))
+        # Tag filtering is case-insensitive, the other facets match ids and years exactly.
+        selected = filters[facet].lower() if facet == "tag" else filters[facet]
+        for option in options:
+            option["selected"] = (option["value"].lower() if facet == "tag" else option["value"]) == selected
+    return facets
+
+
+def facet_counts(scope, filters, query=""):
+    """Return ``{facet: [{"value", "label", "count", "selected"}]}`` for cases in ``scope``.
+
+    ``scope`` is the queryset already narrowed by the text ``query``; the query
+    only takes part in the cache key.
+    """
+    filters = {facet: str(filters.get(facet) or "") for facet in FACETS}
+    digest = hashlib.sha256(json.dumps([query, filters], sort_keys=True).encode("utf-8")).hexdigest()
+    key = f"casebook:facets:{version('index')}:{read_source()}:{digest}"
+    facets = page_cache().get(key)
+    if facets is None:
+        facets = _compute(scope, filters)
+        page_cache().set(key, facets, settings.CASEBOOK_FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,48 @@
+"""Conversion of spend amounts into the casebook's base currency.
+
+Rates live in the local ``FxRate`` table (loaded from CSV with
+``import_fx_rates``; nothing is fetched over the network). Each spend amount is
+stored as entered and again converted at the latest rate of its currency, so
+totals across currencies are plain ``SUM()``s in the database.
+"""
+
+import csv
+import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.conf import settings
+
+CENT = Decimal("0.01")
+
+
+def base_currency():
+    return getattr(settings, "CASEBOOK_BASE_CURRENCY", "GBP")
+
+
+def convert(amount, currency, rates):
+    """Return ``amount`` of ``currency`` in the base currency, or ``None`` when there is no rate for it."""
+    rate = rates.get(currency)
+    if amount is None or rate is None:
+        return None
+    return (Decimal(amount) * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def read_rates_csv(handle):
+    """Yield ``(currency, date, rate)`` from CSV rows with ``currency``, ``date`` and ``rate`` columns.
+
+    ``rate`` is the number of base currency units one unit of ``currency`` buys.
+    """
+    reader = csv.DictReader(handle)
+    missing = {"currency", "date", "rate"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(sorted(missing))}")
+    for line, row in enumerate(reader, start=2):
+        try:
+            currency = row["currency"].strip().upper()
+            rate_date = datetime.date.fromisoformat(row["date"].strip())
+            rate = Decimal(row["rate"].strip())
+        except (AttributeError, ValueError, InvalidOperation) as exc:
+            raise ValueError(f"line {line}: {exc}") from exc
+        if not currency or not rate.is_finite() or rate <= 0:
+            raise ValueError(f"line {line}: expected a currency code and a positive rate")
+        yield currency, rate_date, rate
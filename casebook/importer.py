@@ -0,0 +1,323 @@
+"""Bulk import of ``export_casebook`` output.
+
+Cases are upserted by slug in batches: each batch looks up its organizations,
+industries, tags and existing cases with a fixed number of queries, then writes
+cases, metrics, channel spend and tag links with ``bulk_create``/``bulk_update``
+in one transaction. Child collections are replaced only when the payload carries
+them, so a CSV of flat fields leaves metrics, spend and tags alone. Assets are
+never imported: exports only reference their media files by URL.
+"""
+
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from taggit.models import Tag
+from taggit.utils import parse_tags
+
+from . import analytics, caching, search
+from .export import iter_export, open_text
+from .models import (
+    CaseChannelSpend,
+    CaseMetric,
+    CaseStudy,
+    CaseStudyTag,
+    CaseStudyTombstone,
+    FxRate,
+    Industry,
+    Organization,
+)
+from .signals import suspend_tracking, touch_sectors
+from .slugs import allocate_slugs
+
+TEXT_FIELDS = [
+    "title",
+    "brand_or_campaign",
+    "date_start",
+    "date_end",
+    "sort_date",
+    "location",
+    "one_liner",
+    "objective",
+    "audience",
+    "constraints",
+    "strategy",
+    "creative_direction",
+    "production_and_tooling",
+    "delivery_and_distribution",
+    "my_contribution",
+    "team_and_partners",
+    "results_summary",
+    "what_worked",
+    "what_id_do_differently",
+    "spend_currency",
+    "spend_notes",
+    "notes",
+]
+# Nullable text fields; everything else in TEXT_FIELDS stores "" for missing values.
+NULLABLE_FIELDS = {"date_start", "date_end", "sort_date"}
+DECIMAL_FIELDS = ["spend_amount_min", "spend_amount_max"]
+LINE_FIELDS = ["proof_links", "press_mentions"]
+UPDATE_FIELDS = [
+    *TEXT_FIELDS,
+    *DECIMAL_FIELDS,
+    *LINE_FIELDS,
+    "spend_amount_min_base",
+    "spend_amount_max_base",
+    "organization",
+    "sector",
+    "sort_start",
+    "sort_end",
+    "updated_at",
+]
+METRIC_FIELDS = ["metric_name", "value", "timeframe", "source", "notes"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.metrics = 0
+        self.channel_spend = 0
+        self.skipped_assets = 0
+        self.failed = []
+        self.started = time.perf_counter()
+
+    @property
+    def cases(self):
+        return self.created + self.updated
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __str__(self):
+        rows = self.cases + self.metrics + self.channel_spend
+        rate = rows / self.elapsed if self.elapsed else 0
+        return (
+            f"Imported {self.cases} cases ({self.created} created, {self.updated} updated), {self.metrics} metrics "
+            f"and {self.channel_spend} channel spend rows; deleted {self.deleted} cases; {len(self.failed)} failed. "
+            f"{self.elapsed:.1f} s, {rate:.0f} rows/s."
+        )
+
+
+def read_csv(path):
+    """Yield case payloads from a CSV of flat case fields.
+
+    ``tags`` use the admin's comma-separated syntax; ``proof_links`` and
+    ``press_mentions`` hold one entry per line.
+    """
+    with open_text(path) as handle:
+        for row in csv.DictReader(handle):
+            payload = {key: value for key, value in row.items() if key}
+            if "tags" in payload:
+                payload["tags"] = parse_tags(payload["tags"] or "")
+            for field in LINE_FIELDS:
+                if field in payload:
+                    payload[field] = (payload[field] or "").splitlines()
+            yield payload
+
+
+def read_cases(path, export_format, header):
+    if export_format == "csv":
+        return read_csv(path)
+    return iter_export(path, header, export_format)
+
+
+def _text(payload, field):
+    value = payload.get(field)
+    if value is None:
+        return None if field in NULLABLE_FIELDS else ""
+    return str(value)
+
+
+def _decimal(value):
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value).replace(",", ""))
+    except InvalidOperation as exc:
+        raise ValueError(f"invalid amount {value!r}") from exc
+
+
+def _upsert_names(model, names):
+    """Return ``{name: instance}`` for ``names``, creating the missing rows in bulk."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    found = {item.name: item for item in model.objects.filter(name__in=names)}
+    missing = names - found.keys()
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        found.update((item.name, item) for item in model.objects.filter(name__in=missing))
+    return found
+
+
+def _upsert_tags(names):
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    found = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = names - found.keys()
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name, slug=slugify(name)) for name in missing], ignore_conflicts=True)
+        found.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+        # Names whose slug collides with an existing tag; Tag.save() picks a free slug.
+        for name in missing - found.keys():
+            found[name] = Tag.objects.create(name=name)
+    return found
+
+
+def _build_case(payload, existing, organizations, sectors, rates, now):
+    case = CaseStudy(slug=payload.get("slug") or "")
+    for field in TEXT_FIELDS:
+        setattr(case, field, _text(payload, field))
+    if existing is not None and "notes" not in payload:
+        case.notes = existing["notes"]
+    if not case.spend_currency:
+        case.spend_currency = CaseStudy.CURRENCY_GBP
+    for field in DECIMAL_FIELDS:
+        setattr(case, field, _decimal(payload.get(field)))
+    for field in LINE_FIELDS:
+        value = payload.get(field) or []
+        setattr(case, field, "\n".join(value) if isinstance(value, list) else value)
+    case.organization = organizations.get(payload.get("organization"))
+    case.sector = sectors.get(payload.get("sector"))
+    # Mirrors CaseStudy.save(), which bulk writes bypass.
+    if not case.sort_date:
+        case.sort_date = case.date_end or case.date_start
+    case.sort_start, case.sort_end = case.parse_sort_range()
+    case.normalize_spend(rates)
+    case.updated_at = now
+    return case
+
+
+def import_batch(payloads, report):
+    """Upsert one batch of case payloads and return the ``(pks, slugs)`` imported."""
+    # A slug repeated within the batch keeps its last payload.
+    by_slug, unslugged = {}, []
+    for payload in payloads:
+        if payload.get("slug"):
+            by_slug[payload["slug"]] = payload
+        else:
+            unslugged.append(payload)
+    payloads = [*by_slug.values(), *unslugged]
+    report.skipped_assets += sum(len(payload.get("assets") or []) for payload in payloads)
+
+    organizations = _upsert_names(Organization, (payload.get("organization") for payload in payloads))
+    sectors = _upsert_names(Industry, (payload.get("sector") for payload in payloads))
+    tags = _upsert_tags(name for payload in payloads for name in payload.get("tags") or [])
+    existing = {
+        row["slug"]: row for row in CaseStudy.objects.filter(slug__in=list(by_slug)).values("slug", "pk", "notes")
+    }
+
+    rates = FxRate.latest_rates()
+    now = timezone.now()
+    cases = []
+    for payload in payloads:
+        try:
+            case = _build_case(payload, existing.get(payload.get("slug")), organizations, sectors, rates, now)
+            amounts = [_decimal(row.get("spend_amount")) for row in payload.get("channel_spend") or []]
+        except ValueError as exc:
+            report.failed.append((payload.get("slug") or payload.get("title") or "?", str(exc)))
+            continue
+        cases.append((case, payload, amounts))
+
+    unnamed = [case for case, *_ in cases if not case.slug]
+    for case, slug in zip(unnamed, allocate_slugs(CaseStudy.objects.all(), [case.base_slug() for case in unnamed])):
+        case.slug = slug
+
+    # One INSERT ... ON CONFLICT (slug) DO UPDATE per batch; bulk_update's CASE expressions are far slower.
+    upserted = [case for case, *_ in cases]
+    CaseStudy.objects.bulk_create(
+        upserted, batch_size=500, update_conflicts=True, unique_fields=["slug"], update_fields=UPDATE_FIELDS
+    )
+    if any(case.pk is None for case in upserted):
+        pks = dict(CaseStudy.objects.filter(slug__in=[case.slug for case in upserted]).values_list("slug", "pk"))
+        for case in upserted:
+            case.pk = pks[case.slug]
+    updated = sum(1 for _, payload, _ in cases if payload.get("slug") in existing)
+    report.updated += updated
+    report.created += len(cases) - updated
+
+    replaced = {
+        key: [case.pk for case, payload, _ in cases if key in payload] for key in ["metrics", "channel_spend", "tags"]
+    }
+    CaseMetric.objects.filter(case_study_id__in=replaced["metrics"]).delete()
+    CaseChannelSpend.objects.filter(case_study_id__in=replaced["channel_spend"]).delete()
+    CaseStudyTag.objects.filter(content_object_id__in=replaced["tags"]).delete()
+
+    metrics, spend, links = [], [], []
+    for case, payload, amounts in cases:
+        for order, row in enumerate(payload.get("metrics") or []):
+            metric = CaseMetric(
+                case_study_id=case.pk,
+                sort_order=order,
+                **{field: row.get(field) or "" for field in METRIC_FIELDS},
+            )
+            metric.parse_value()
+            metrics.append(metric)
+        for order, (row, amount) in enumerate(zip(payload.get("channel_spend") or [], amounts)):
+            channel_spend = CaseChannelSpend(
+                case_study_id=case.pk,
+                sort_order=order,
+                channel=row.get("channel") or CaseChannelSpend.CHANNEL_OTHER,
+                spend_currency=row.get("spend_currency") or CaseStudy.CURRENCY_GBP,
+                spend_amount=amount,
+                dates=row.get("dates") or "",
+                notes=row.get("notes") or "",
+            )
+            channel_spend.normalize_spend(rates)
+            spend.append(channel_spend)
+        for name in dict.fromkeys(payload.get("tags") or []):
+            links.append(CaseStudyTag(content_object_id=case.pk, tag=tags[name]))
+    CaseMetric.objects.bulk_create(metrics, batch_size=1000)
+    CaseChannelSpend.objects.bulk_create(spend, batch_size=1000)
+    CaseStudyTag.objects.bulk_create(links, batch_size=1000)
+    report.metrics += len(metrics)
+    report.channel_spend += len(spend)
+
+    slugs = [case.slug for case, *_ in cases]
+    CaseStudyTombstone.objects.filter(slug__in=slugs).delete()
+    return [case.pk for case, *_ in cases], slugs
+
+
+def import_cases(payloads, report, batch_size=500, on_batch=None):
+    """Import ``payloads`` in transactions of ``batch_size`` cases, refreshing search and page caches per batch.
+
+    The analytics summaries are rebuilt once at the end.
+    """
+    batch = []
+    for payload in payloads:
+        batch.append(payload)
+        if len(batch) >= batch_size:
+            _commit_batch(batch, report, on_batch)
+            batch = []
+    if batch:
+        _commit_batch(batch, report, on_batch)
+    analytics.rebuild()
+    return report
+
+
+def _commit_batch(batch, report, on_batch):
+    with transaction.atomic(), suspend_tracking():
+        pks, slugs = import_batch(batch, report)
+        search.index_cases(CaseStudy.objects.filter(pk__in=pks))
+        # Bulk writes skip the signals, and a case may have left a sector as well as joined one.
+        touch_sectors()
+    caching.invalidate_cases(slugs)
+    if on_batch:
+        on_batch(report)
+
+
+def delete_cases(slugs, report):
+    """Delete the cases listed as tombstones in a delta export."""
+    with transaction.atomic(), suspend_tracking():
+        _, deleted = CaseStudy.objects.filter(slug__in=slugs).delete()
+        analytics.rebuild()
+    report.deleted += deleted.get(CaseStudy._meta.label, 0)
+    return report
@@ -0,0 +1,142 @@
+"""Per-request SQL and timing metrics.
+
+With ``CASEBOOK_REQUEST_METRICS`` on, ``RequestMetricsMiddleware`` records
+every request's SQL statements (count, total time, the slowest few), top-level
+template render time and total time. It reports them in a ``Server-Timing``
+header and as one JSON line on the ``casebook.requests`` logger. A statement
+run ``CASEBOOK_DUPLICATE_QUERY_THRESHOLD`` times or more with different
+parameters is listed as a likely N+1 query, and the line is then logged as a
+warning. With the setting off the middleware removes itself at startup and costs
+nothing.
+"""
+
+import heapq
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger("casebook.requests")
+
+# Statements are cut to this many characters in the log line.
+SQL_PREVIEW = 300
+
+_current = ContextVar("casebook_request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, slowest=5):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+        self.slowest = []
+        self._keep = slowest
+        self._rendering = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.sql_time += duration
+            self.statements[sql] += 1
+            # The counter breaks ties so statements are never compared.
+            entry = (duration, self.queries, sql)
+            if len(self.slowest) < self._keep:
+                heapq.heappush(self.slowest, entry)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def duplicates(self, threshold):
+        """``[(count, sql)]`` for statements run at least ``threshold`` times, most repeated first."""
+        return [(count, sql) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self, total):
+        return (
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries", '
+            f"tpl;dur={self.template_time * 1000:.1f}, total;dur={total * 1000:.1f}"
+        )
+
+    def as_dict(self, total, threshold):
+        return {
+            "queries": self.queries,
+            "sql_ms": round(self.sql_time * 1000, 2),
+            "template_ms": round(self.template_time * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+            "slowest": [
+                {"ms": round(duration * 1000, 2), "sql": sql[:SQL_PREVIEW]}
+                for duration, _, sql in sorted(self.slowest, reverse=True)
+            ],
+            "duplicates": [{"count": count, "sql": sql[:SQL_PREVIEW]} for count, sql in self.duplicates(threshold)],
+        }
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "CASEBOOK_REQUEST_METRICS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics(settings.CASEBOOK_REQUEST_METRICS_SLOWEST)
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        response["Server-Timing"] = metrics.server_timing(total)
+        threshold = settings.CASEBOOK_DUPLICATE_QUERY_THRESHOLD
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            **metrics.as_dict(total, threshold),
+        }
+        level = logging.WARNING if record["duplicates"] else logging.INFO
+        logger.log(level, json.dumps(record, sort_keys=True))
+        return response
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics._rendering:
+            # Nested renders are already inside the outer one's time.
+            return super().render(context, request)
+        metrics._rendering += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics._rendering -= 1
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing renders for ``RequestMetricsMiddleware``."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.models import CaseAsset
+from casebook.placeholders import assign_placeholder
+from casebook.signals import touch_cases
+
+
+class Command(BaseCommand):
+    help = "Compute the inline placeholder of case asset images saved without one."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=200, help="Assets loaded and updated per round trip.")
+        parser.add_argument("--force", action="store_true", help="Recompute placeholders that are already set.")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive integer.")
+
+        assets = CaseAsset.objects.filter(image__isnull=False).select_related("image").order_by("pk")
+        if not options["force"]:
+            assets = assets.filter(placeholder_color="")
+
+        updated, failed, batch, case_ids = 0, 0, [], set()
+        for asset in assets.iterator(chunk_size=options["chunk_size"]):
+            if not assign_placeholder(asset):
+                failed += 1
+                self.stderr.write(f"Could not read image {asset.image_id} for asset {asset.pk}.")
+                continue
+            batch.append(asset)
+            case_ids.add(asset.case_study_id)
+            if len(batch) >= options["chunk_size"]:
+                updated += self._save(batch)
+                batch = []
+        updated += self._save(batch)
+
+        # bulk_update skips the signal handlers, so refresh cached pages and delta exports here.
+        if case_ids:
+            touch_cases(pk__in=case_ids)
+        self.stdout.write(self.style.SUCCESS(f"Computed {updated} placeholders, {failed} failed."))
+
+    def _save(self, batch):
+        CaseAsset.objects.bulk_update(batch, ["placeholder_color", "placeholder_data_uri"])
+        return len(batch)
@@ -0,0 +1,125 @@
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.export import FORMATS, read_export, write_export
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua campaign audience creative launch conversion reach growth café naïve"
+).split()
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _seeded_case(rng, idx):
+    year = rng.randint(2018, 2026)
+    return {
+        "title": f"{_text(rng, 3)} {idx}",
+        "slug": f"case-{idx}",
+        "organization": f"Organization {rng.randint(1, 40)}",
+        "sector": f"Sector {rng.randint(1, 12)}",
+        "brand_or_campaign": _text(rng, 2),
+        "date_start": f"January {year}",
+        "date_end": f"Q{rng.randint(1, 4)} {year}",
+        "sort_date": str(year),
+        "updated_at": f"{year}-01-01T00:00:00+00:00",
+        "location": "UK / US / Global",
+        "one_liner": _text(rng, 20),
+        **{
+            field: _text(rng, rng.randint(40, 160))
+            for field in [
+                "objective",
+                "audience",
+                "constraints",
+                "strategy",
+                "creative_direction",
+                "production_and_tooling",
+                "delivery_and_distribution",
+                "my_contribution",
+                "team_and_partners",
+                "results_summary",
+                "what_worked",
+                "what_id_do_differently",
+            ]
+        },
+        "spend_currency": rng.choice(["GBP", "USD", "EUR"]),
+        "spend_amount_min": f"{rng.randint(1, 50) * 1000}.00",
+        "spend_amount_max": f"{rng.randint(50, 90) * 1000}.00",
+        "spend_notes": _text(rng, 8),
+        "proof_links": [f"https://example.com/{idx}/{n}" for n in range(rng.randint(0, 3))],
+        "press_mentions": [],
+        "tags": rng.sample(WORDS, 3),
+        "metrics": [
+            {"metric_name": "ROAS", "value": f"{rng.uniform(1, 6):.1f}", "timeframe": "6 weeks", "source": "GA4", "notes": ""}
+            for _ in range(rng.randint(1, 4))
+        ],
+        "channel_spend": [
+            {"channel": "Meta", "spend_currency": "GBP", "spend_amount": "9000.00", "dates": "Jan-Feb", "notes": ""}
+            for _ in range(rng.randint(0, 3))
+        ],
+        "assets": [
+            {
+                "type": "creative",
+                "caption": _text(rng, 10),
+                "platform": "Meta",
+                "format": "9:16",
+                "date": None,
+                "is_hero": n == 0,
+                "alt_text": _text(rng, 5),
+                "image_urls": {
+                    "original": f"/media/original_images/{idx}-{n}.png",
+                    "fill_1600x900": f"/media/images/{idx}-{n}.fill-1600x900.png",
+                    "max_1200x1200": f"/media/images/{idx}-{n}.max-1200x1200.png",
+                },
+                "video": {"title": None, "url": None, "filename": None},
+            }
+            for n in range(rng.randint(0, 4))
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare size, encode time and decode time of each export format on a seeded synthetic casebook."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cases", type=int, default=2000, help="Number of synthetic cases.")
+        parser.add_argument("--seed", type=int, default=7, help="Random seed for the synthetic dataset.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per format; the fastest is reported.")
+
+    def handle(self, *args, **options):
+        if options["cases"] < 1 or options["repeat"] < 1:
+            raise CommandError("--cases and --repeat must be positive integers.")
+        rng = random.Random(options["seed"])
+        cases = [_seeded_case(rng, idx) for idx in range(options["cases"])]
+        header = {"generated_at": "2026-01-01T00:00:00+00:00", "count": len(cases)}
+        variants = [(export_format, False) for export_format in FORMATS] + [("json", True), ("json.gz", True)]
+
+        rows = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for export_format, compact in variants:
+                path = Path(tmp) / f"export.{export_format}"
+                encode = decode = float("inf")
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    with path.open("wb") as handle:
+                        write_export(handle, export_format, cases, header, compact=compact)
+                    encode = min(encode, time.perf_counter() - start)
+                    start = time.perf_counter()
+                    _, decoded = read_export(path)
+                    decode = min(decode, time.perf_counter() - start)
+                if decoded != cases:
+                    raise CommandError(f"{export_format} did not round-trip the dataset.")
+                label = f"{export_format} --compact" if compact else export_format
+                rows.append((label, path.stat().st_size, encode, decode))
+
+        baseline = rows[0][1]
+        self.stdout.write(f"{options['cases']} cases, seed {options['seed']}, best of {options['repeat']}")
+        self.stdout.write(f"{'format':<18}{'bytes':>12}{'vs json':>9}{'encode ms':>12}{'decode ms':>12}")
+        for label, size, encode, decode in rows:
+            self.stdout.write(f"{label:<18}{size:>12}{size / baseline:>9.2f}{encode * 1000:>12.1f}{decode * 1000:>12.1f}")
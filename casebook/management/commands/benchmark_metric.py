@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.benchmarks import GROUP_FIELDS, metric_distributions
+
+
+def _number(value):
+    return f"{value:.4g}"
+
+
+class Command(BaseCommand):
+    help = "Print percentiles and the distribution of one metric across cases, per sector, organization or year."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--metric", required=True, help='Metric name, matched case-insensitively (e.g. "ROAS").')
+        parser.add_argument("--by", choices=sorted(GROUP_FIELDS), help="Report one distribution per group.")
+        parser.add_argument("--sector", help="Only include cases in this sector.")
+        parser.add_argument("--year", type=int, help="Only include cases whose sort date ends in this year.")
+        parser.add_argument("--unit", help='Only include values in this unit (e.g. "%%", "x", "GBP").')
+        parser.add_argument("--bins", type=int, default=0, help="Also print a histogram with this many bins.")
+
+    def handle(self, *args, **options):
+        if options["bins"] < 0:
+            raise CommandError("--bins must not be negative.")
+        filters = {}
+        if options["sector"]:
+            filters["case_study__sector__name"] = options["sector"]
+        if options["year"]:
+            filters["case_study__sort_end__year"] = options["year"]
+        if options["unit"] is not None:
+            filters["value_unit"] = options["unit"]
+
+        distributions = metric_distributions(options["metric"], by=options["by"], **filters)
+        if not distributions:
+            self.stdout.write(f"No numeric {options['metric']} values found.")
+            return
+
+        ordered = sorted(distributions.items(), key=lambda item: (item[0][0], str(item[0][1])))
+        for (unit, group), distribution in ordered:
+            label = " ".join(part for part in [str(group) if options["by"] else "", f"[{unit or 'no unit'}]"] if part)
+            percentiles = " ".join(f"p{p}={_number(v)}" for p, v in distribution.percentiles().items())
+            self.stdout.write(
+                f"{label}: n={len(distribution)} mean={_number(distribution.mean)} "
+                f"min={_number(distribution.values[0])} {percentiles} max={_number(distribution.values[-1])}"
+            )
+            if options["bins"]:
+                for lower, upper, count in distribution.histogram(options["bins"]):
+                    self.stdout.write(f"  {_number(lower)} – {_number(upper)}: {count}")
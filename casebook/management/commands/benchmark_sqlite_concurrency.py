@@ -0,0 +1,169 @@
+import json
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.db import apply_pragmas, sqlite_pragmas
+
+INDEX_QUERY = "SELECT id, title, sort_end FROM cases ORDER BY sort_end DESC, id LIMIT 50 OFFSET ?"
+
+
+def _connect(path, pragmas):
+    # Autocommit at the driver level; transactions are opened explicitly below.
+    connection = sqlite3.connect(path, timeout=0, isolation_level=None)
+    apply_pragmas(connection.cursor(), pragmas)
+    return connection
+
+
+class _Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, started, error=False):
+        with self.lock:
+            if error:
+                self.errors += 1
+            else:
+                self.latencies.append(time.perf_counter() - started)
+
+    def summary(self, seconds):
+        latencies = sorted(self.latencies) or [0.0]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return (
+            f"{len(self.latencies)} ok ({len(self.latencies) / seconds:.0f}/s), {self.errors} locked, "
+            f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, "
+            f"max {latencies[-1] * 1000:.1f} ms"
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Run index-style reads against a scratch SQLite database while a bulk edit and an export run, "
+        "once per journal mode, with the configured SQLite PRAGMAs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cases", type=int, default=20000, help="Rows in the scratch database.")
+        parser.add_argument("--seconds", type=float, default=3.0, help="Duration of each run.")
+        parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads.")
+        parser.add_argument(
+            "--modes",
+            default="delete,wal",
+            help="Comma-separated journal modes to compare (default: delete,wal).",
+        )
+        parser.add_argument("--seed", type=int, default=7, help="Random seed for the scratch data.")
+
+    def handle(self, *args, **options):
+        if options["cases"] < 1 or options["seconds"] <= 0 or options["readers"] < 1:
+            raise CommandError("--cases, --seconds and --readers must be positive.")
+        modes = [mode.strip().lower() for mode in options["modes"].split(",") if mode.strip()]
+        pragmas = sqlite_pragmas()
+        self.stdout.write(
+            f"{options['cases']} cases, {options['readers']} readers, {options['seconds']:g} s per mode; "
+            f"busy_timeout={pragmas.get('busy_timeout', 0)} ms."
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for mode in modes:
+                path = Path(directory) / f"{mode}.sqlite3"
+                run_pragmas = {**pragmas, "journal_mode": mode}
+                self._seed(path, run_pragmas, options["cases"], random.Random(options["seed"]))
+                self._run(path, run_pragmas, mode, options)
+
+    def _seed(self, path, pragmas, cases, rng):
+        connection = _connect(path, pragmas)
+        connection.executescript(
+            "CREATE TABLE cases (id INTEGER PRIMARY KEY, title TEXT, sort_end TEXT, updated TEXT, body TEXT);"
+            "CREATE INDEX cases_sort ON cases (sort_end DESC, id);"
+        )
+        connection.execute("BEGIN")
+        connection.executemany(
+            "INSERT INTO cases (title, sort_end, updated, body) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    f"Case {idx}",
+                    f"{rng.randint(2015, 2026)}-{rng.randint(1, 12):02d}-01",
+                    "",
+                    "lorem ipsum " * rng.randint(40, 120),
+                )
+                for idx in range(cases)
+            ),
+        )
+        connection.execute("COMMIT")
+        connection.close()
+
+    def _run(self, path, pragmas, mode, options):
+        stop = threading.Event()
+        reads, writes, exports = _Stats(), _Stats(), _Stats()
+        cases = options["cases"]
+
+        def reader(seed):
+            rng = random.Random(seed)
+            connection = _connect(path, pragmas)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute(INDEX_QUERY, (rng.randrange(0, max(cases - 50, 1)),)).fetchall()
+                    reads.record(started)
+                except sqlite3.OperationalError:
+                    reads.record(started, error=True)
+            connection.close()
+
+        def bulk_editor():
+            # Like an import batch: rewrite a slice of cases in one transaction.
+            connection = _connect(path, pragmas)
+            batch = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute("BEGIN IMMEDIATE")
+                    connection.execute(
+                        "UPDATE cases SET updated = ?, body = body WHERE id % 20 = ?", (str(started), batch % 20)
+                    )
+                    connection.execute("COMMIT")
+                    writes.record(started)
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                    writes.record(started, error=True)
+                batch += 1
+                time.sleep(0.01)
+            connection.close()
+
+        def exporter():
+            # Like export_casebook: one read transaction streaming and encoding every case.
+            connection = _connect(path, pragmas)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute("BEGIN")
+                    for row in connection.execute("SELECT * FROM cases ORDER BY sort_end DESC, id"):
+                        json.dumps(row)
+                    connection.execute("COMMIT")
+                    exports.record(started)
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                    exports.record(started, error=True)
+            connection.close()
+
+        threads = [threading.Thread(target=reader, args=(idx,)) for idx in range(options["readers"])]
+        threads += [threading.Thread(target=bulk_editor), threading.Thread(target=exporter)]
+        for thread in threads:
+            thread.start()
+        time.sleep(options["seconds"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(f"journal_mode={mode}")
+        self.stdout.write(f"  index reads: {reads.summary(options['seconds'])}")
+        self.stdout.write(f"  bulk edits:  {writes.summary(options['seconds'])}")
+        self.stdout.write(f"  exports:     {exports.summary(options['seconds'])}")
@@ -1,141 +1,306 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from contextvars import copy_context
 from datetime import datetime, timezone
 from pathlib import Path
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.dateparse import parse_date, parse_datetime
 
-from casebook.models import CaseStudy
+from casebook import replica
+from casebook.export import (
+    FORMATS,
+    SHARD_FIELDS,
+    HashingFile,
+    export_queryset,
+    read_generated_at,
+    serialize_case,
+    shard_partitions,
+    write_export,
+)
+from casebook.models import CaseStudy, CaseStudyTombstone
+from casebook.profiling import add_profile_argument, profiled_command
+from casebook.renditions import (
+    EXPORT_RENDITION_SPECS,
+    RenditionReport,
+    default_workers,
+    find_missing_renditions,
+    generate_renditions,
+)
 
+MANIFEST_NAME = "manifest.json"
 
-def _split_lines(value):
-    if not value:
-        return []
-    return [line.strip() for line in value.splitlines() if line.strip()]
 
+def _resolve_since(value, export_format=None):
+    try:
+        since = parse_datetime(value)
+        if since is None and parse_date(value):
+            since = datetime.combine(parse_date(value), datetime.min.time())
+    except ValueError as exc:
+        raise CommandError(f"Invalid --since timestamp {value!r}: {exc}") from exc
+    if since is None:
+        path = Path(value)
+        if not path.is_file():
+            raise CommandError(f"--since must be an ISO timestamp or a previous export file: {value}")
+        generated_at = read_generated_at(path, export_format)
+        if not generated_at:
+            raise CommandError(f"{path} has no generated_at header; pass a timestamp to --since instead.")
+        since = parse_datetime(generated_at)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return since
 
-def _serialize_asset(asset):
-    image_urls = None
-    video_url = None
-    if asset.image:
-        image_urls = {"original": asset.image.file.url}
-        for key, spec in [("fill_1600x900", "fill-1600x900"), ("max_1200x1200", "max-1200x1200")]:
-            try:
-                image_urls[key] = asset.image.get_rendition(spec).url
-            except Exception:
-                image_urls[key] = None
-    if asset.video:
-        video_url = asset.video.file.url
-
-    return {
-        "type": asset.asset_type,
-        "caption": asset.caption,
-        "platform": asset.platform,
-        "format": asset.format,
-        "date": asset.date,
-        "is_hero": asset.is_hero,
-        "alt_text": asset.alt_text,
-        "image_urls": image_urls,
-        "video": {
-            "title": asset.video.title if asset.video else None,
-            "url": video_url,
-            "filename": asset.video.file.name if asset.video else None,
-        },
-    }
-
-
-def _serialize_case(case, include_notes=False):
-    payload = {
-        "title": case.title,
-        "slug": case.slug,
-        "organization": case.organization.name if case.organization else None,
-        "sector": case.sector.name if case.sector else None,
-        "brand_or_campaign": case.brand_or_campaign,
-        "date_start": case.date_start,
-        "date_end": case.date_end,
-        "sort_date": case.sort_date,
-        "location": case.location,
-        "one_liner": case.one_liner,
-        "objective": case.objective,
-        "audience": case.audience,
-        "constraints": case.constraints,
-        "strategy": case.strategy,
-        "creative_direction": case.creative_direction,
-        "production_and_tooling": case.production_and_tooling,
-        "delivery_and_distribution": case.delivery_and_distribution,
-        "my_contribution": case.my_contribution,
-        "team_and_partners": case.team_and_partners,
-        "results_summary": case.results_summary,
-        "what_worked": case.what_worked,
-        "what_id_do_differently": case.what_id_do_differently,
-        "spend_currency": case.spend_currency,
-        "spend_amount_min": str(case.spend_amount_min) if case.spend_amount_min is not None else None,
-        "spend_amount_max": str(case.spend_amount_max) if case.spend_amount_max is not None else None,
-        "spend_notes": case.spend_notes,
-        "proof_links": _split_lines(case.proof_links),
-        "press_mentions": _split_lines(case.press_mentions),
-        "tags": [tag.name for tag in case.tags.all()],
-        "metrics": [
-            {
-                "metric_name": metric.metric_name,
-                "value": metric.value,
-                "timeframe": metric.timeframe,
-                "source": metric.source,
-                "notes": metric.notes,
-            }
-            for metric in case.metrics.all()
-        ],
-        "channel_spend": [
-            {
-                "channel": spend.channel,
-                "spend_currency": spend.spend_currency,
-                "spend_amount": str(spend.spend_amount) if spend.spend_amount is not None else None,
-                "dates": spend.dates,
-                "notes": spend.notes,
-            }
-            for spend in case.channel_spend.all()
-        ],
-        "assets": [_serialize_asset(asset) for asset in case.assets.select_related("image", "video").all()],
-    }
-    if include_notes:
-        payload["notes"] = case.notes
-    return payload
+
+def _is_shard_file_name(name):
+    """Whether ``name`` from a manifest is a bare export file name inside the output directory."""
+    return (
+        isinstance(name, str)
+        and Path(name).name == name
+        and name != MANIFEST_NAME
+        and any(name.endswith(f".{export_format}") for export_format in FORMATS)
+    )
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
 
 
 class Command(BaseCommand):
     help = "Export casebook content to clean JSON."
 
     def add_arguments(self, parser):
-        parser.add_argument("--output", required=True, help="Path to output JSON file.")
+        parser.add_argument("--output", help="Path to output JSON file.")
         parser.add_argument(
             "--include-notes",
             action="store_true",
             help="Include campaign notes in exported payload.",
         )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default="json",
+            help=(
+                "json writes the generated_at/count/cases envelope; ndjson writes one case per line; "
+                "msgpack writes the header then one MessagePack map per case; .gz variants are gzip-compressed."
+            ),
+        )
+        parser.add_argument(
+            "--compact",
+            action="store_true",
+            help="Minify JSON output (no indentation, UTF-8 instead of ASCII escapes).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Number of cases fetched (with their related rows) per database round trip.",
+        )
+        parser.add_argument(
+            "--report-queries",
+            action="store_true",
+            help="Print the number of SQL queries executed and the time spent in them.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=default_workers(),
+            help=(
+                "Processes used to generate missing image renditions, and threads used to write shards "
+                "(default: CPU count)."
+            ),
+        )
+        parser.add_argument(
+            "--since",
+            help=(
+                "Only export cases changed after this ISO timestamp, or after the generated_at of a previous "
+                "export file. NDJSON exports carry no generated_at; pass a timestamp instead. Deleted "
+                "slugs are listed as tombstones."
+            ),
+        )
+        parser.add_argument(
+            "--since-format",
+            choices=FORMATS,
+            help="Format of the --since export file, when its name does not end in the format (e.g. renamed files).",
+        )
+        parser.add_argument(
+            "--shard-by",
+            choices=sorted(SHARD_FIELDS),
+            help="Write one file per organization, sector or year to --output-dir, plus manifest.json.",
+        )
+        parser.add_argument("--output-dir", help="Directory for sharded output (requires --shard-by).")
+        add_profile_argument(parser)
 
     def handle(self, *args, **options):
-        output = Path(options["output"])
-        include_notes = options["include_notes"]
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive integer.")
+        if options["shard_by"]:
+            if not options["output_dir"] or options["output"]:
+                raise CommandError("--shard-by writes to --output-dir instead of --output.")
+            if options["since"]:
+                raise CommandError("--since cannot be combined with --shard-by.")
+        elif not options["output"]:
+            raise CommandError("--output is required unless --shard-by/--output-dir are given.")
 
-        queryset = CaseStudy.objects.prefetch_related(
-            "tags",
-            "metrics",
-            "channel_spend",
-            "assets__image",
-            "assets__video",
-        ).order_by("-sort_date", "-date_end", "-date_start", "title")
+        query_counter = _QueryCounter() if options["report_queries"] else None
+        with (
+            profiled_command(self, "export_casebook", options["profile"]),
+            replica.routing(replica=True),
+            ExitStack() as stack,
+        ):
+            if query_counter:
+                for alias in {DEFAULT_DB_ALIAS, replica.read_alias()}:
+                    stack.enter_context(connections[alias].execute_wrapper(query_counter))
+            since = _resolve_since(options["since"], options["since_format"]) if options["since"] else None
+            self._prepare_renditions(options, since)
+            if options["shard_by"]:
+                written = self._export_shards(options)
+                destination = options["output_dir"]
+            else:
+                written = self._export(options, since)
+                destination = options["output"]
 
-        cases = [_serialize_case(case, include_notes=include_notes) for case in queryset]
+        self.stdout.write(self.style.SUCCESS(f"Exported {written} case studies to {destination}"))
+        if query_counter:
+            self.stdout.write(
+                f"Executed {query_counter.count} SQL queries in {query_counter.duration * 1000:.1f} ms."
+            )
 
-        payload = {
-            "generated_at": datetime.now(timezone.utc).isoformat(),
-            "count": len(cases),
-            "cases": cases,
-        }
+    def _prepare_renditions(self, options, since=None):
+        report = RenditionReport()
+        specs = [spec for _, spec in EXPORT_RENDITION_SPECS]
+        # A delta export only needs renditions for the cases it writes.
+        cases = CaseStudy.objects.filter(updated_at__gt=since) if since else None
+        missing = find_missing_renditions(specs, report, chunk_size=options["chunk_size"], cases=cases)
+        generate_renditions(missing, report, workers=options["workers"])
+        if report.generated:
+            # The replica has not seen the new renditions yet.
+            replica.pin()
+        self.stdout.write(str(report))
+        for image_id, spec, error in report.failed:
+            self.stderr.write(f"Rendition {spec} failed for image {image_id}: {error}")
 
+    def _export(self, options, since=None):
+        output = Path(options["output"])
+        queryset = export_queryset()
+        if since:
+            queryset = queryset.filter(updated_at__gt=since)
+        header = {"generated_at": datetime.now(timezone.utc).isoformat()}
+        partial = output.with_name(f"{output.name}.partial")
         try:
             output.parent.mkdir(parents=True, exist_ok=True)
-            output.write_text(json.dumps(payload, indent=2, ensure_ascii=True), encoding="utf-8")
+            with transaction.atomic(using=replica.read_alias()), partial.open("wb") as handle:
+                if since:
+                    header["since"] = since.isoformat()
+                header["count"] = queryset.count()
+                if since:
+                    header["deleted"] = list(
+                        CaseStudyTombstone.objects.filter(deleted_at__gt=since)
+                        .order_by("slug")
+                        .values_list("slug", flat=True)
+                    )
+                cases = (
+                    serialize_case(case, include_notes=options["include_notes"])
+                    for case in queryset.iterator(chunk_size=options["chunk_size"])
+                )
+                written = write_export(handle, options["format"], cases, header, compact=options["compact"])
+            partial.replace(output)
         except OSError as exc:
             raise CommandError(f"Unable to write export file: {exc}") from exc
+        finally:
+            partial.unlink(missing_ok=True)
+        return written
+
+    def _export_shards(self, options):
+        output_dir = Path(options["output_dir"])
+        manifest_path = output_dir / MANIFEST_NAME
+        previous = {}
+        if manifest_path.is_file():
+            try:
+                previous_manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                # Stale entries are deleted below, so only bare shard file names are trusted.
+                previous = {
+                    shard["file"]: shard["sha256"]
+                    for shard in previous_manifest["shards"]
+                    if _is_shard_file_name(shard["file"])
+                }
+            except (OSError, ValueError, KeyError, TypeError):
+                previous = {}
+
+        partitions = shard_partitions(options["shard_by"])
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            if options["workers"] <= 1:
+                shards = [self._write_shard(output_dir, key, pks, options, previous) for key, pks in partitions.items()]
+            else:
+                with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                    futures = [
+                        # Threads start with an empty context; carry the replica routing over.
+                        executor.submit(
+                            copy_context().run, self._write_shard_in_thread, output_dir, key, pks, options, previous
+                        )
+                        for key, pks in partitions.items()
+                    ]
+                    shards = [future.result() for future in futures]
+        except OSError as exc:
+            raise CommandError(f"Unable to write export shard: {exc}") from exc
+
+        shards.sort(key=lambda shard: shard["file"])
+        current = {shard["file"] for shard in shards}
+        for stale in set(previous) - current:
+            (output_dir / stale).unlink(missing_ok=True)
+        unchanged = sum(1 for shard in shards if previous.get(shard["file"]) == shard["sha256"])
+
+        manifest = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "shard_by": options["shard_by"],
+            "format": options["format"],
+            "count": sum(shard["count"] for shard in shards),
+            "shards": shards,
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=True), encoding="utf-8")
+        self.stdout.write(f"Wrote {len(shards) - unchanged} shards, skipped {unchanged} unchanged.")
+        return manifest["count"]
+
+    def _write_shard_in_thread(self, *args):
+        try:
+            return self._write_shard(*args)
+        finally:
+            connections.close_all()
 
-        self.stdout.write(self.style.SUCCESS(f"Exported {len(cases)} case studies to {output}"))
+    def _write_shard(self, output_dir, key, pks, options, previous):
+        # Shards carry no timestamp, so unchanged content produces byte-identical files.
+        stem, label = key
+        path = output_dir / f"{stem}.{options['format']}"
+        partial = path.with_name(f"{path.name}.partial")
+        header = {"shard_by": options["shard_by"], "shard": label, "count": len(pks)}
+        chunk_size = options["chunk_size"]
+        cases = (
+            serialize_case(case, include_notes=options["include_notes"])
+            for offset in range(0, len(pks), chunk_size)
+            for case in export_queryset().filter(pk__in=pks[offset : offset + chunk_size])
+        )
+        try:
+            with partial.open("wb") as handle:
+                hashed = HashingFile(handle)
+                written = write_export(hashed, options["format"], cases, header, compact=options["compact"])
+            sha256 = hashed.digest.hexdigest()
+            if previous.get(path.name) == sha256 and path.is_file():
+                partial.unlink()
+            else:
+                partial.replace(path)
+        finally:
+            partial.unlink(missing_ok=True)
+        return {"key": label, "file": path.name, "count": written, "bytes": hashed.size, "sha256": sha256}
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.export import FORMATS, detect_format
+from casebook.importer import ImportReport, delete_cases, import_cases, read_cases
+
+
+class Command(BaseCommand):
+    help = "Import cases from an export_casebook file (or a CSV of flat case fields), upserting by slug."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", required=True, help="Export file to import.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS + ["csv"],
+            help="Input format (default: taken from the file extension, falling back to json).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Cases written per transaction.")
+        parser.add_argument(
+            "--apply-deletions",
+            action="store_true",
+            help="Delete the cases a delta export lists as deleted.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        export_format = options["format"] or detect_format(options["input"], FORMATS + ["csv"]) or "json"
+        self.verbosity = options["verbosity"]
+
+        header = {}
+        report = ImportReport()
+        try:
+            payloads = read_cases(options["input"], export_format, header)
+            import_cases(payloads, report, batch_size=options["batch_size"], on_batch=self._progress)
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Unable to read import file: {exc}") from exc
+        if options["apply_deletions"] and header.get("deleted"):
+            delete_cases(header["deleted"], report)
+
+        for slug, error in report.failed:
+            self.stderr.write(f"Skipped case {slug}: {error}")
+        if report.skipped_assets:
+            self.stdout.write(f"Skipped {report.skipped_assets} assets; re-attach their media after importing.")
+        self.stdout.write(self.style.SUCCESS(str(report)))
+
+    def _progress(self, report):
+        if self.verbosity >= 2:
+            self.stdout.write(f"{report.cases} cases imported after {report.elapsed:.1f} s.")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from casebook import spend
+from casebook.export import open_text
+from casebook.fx import base_currency, read_rates_csv
+from casebook.models import FxRate
+
+
+class Command(BaseCommand):
+    help = "Load FX rates from a CSV (currency,date,rate) and convert every stored spend amount at the latest rates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", required=True, help="CSV file of rates; may be gzipped.")
+
+    def handle(self, *args, **options):
+        try:
+            with open_text(options["input"]) as handle:
+                rates = [
+                    FxRate(currency=currency, rate_date=rate_date, rate=rate)
+                    for currency, rate_date, rate in read_rates_csv(handle)
+                ]
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Unable to read rates file: {exc}") from exc
+
+        with transaction.atomic():
+            FxRate.objects.bulk_create(
+                rates,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["currency", "rate_date"],
+                update_fields=["rate"],
+            )
+            latest = spend.renormalize()
+
+        currencies = ", ".join(f"{currency}={rate.normalize()}" for currency, rate in sorted(latest.items()))
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded {len(rates)} rates. Spend converted to {base_currency()} at {currencies}.")
+        )
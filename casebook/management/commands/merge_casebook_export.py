@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.export import FORMATS, read_export, sort_cases, write_export
+
+
+class Command(BaseCommand):
+    help = "Fold a delta export (export_casebook --since) into a previous full export."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base", required=True, help="Previous full export in any export_casebook format.")
+        parser.add_argument("--delta", required=True, help="Delta export produced with --since.")
+        parser.add_argument("--output", required=True, help="Path to the merged export file.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default="json",
+            help="Format of the merged file.",
+        )
+        parser.add_argument("--compact", action="store_true", help="Minify JSON output.")
+
+    def handle(self, *args, **options):
+        try:
+            base_header, base_cases = read_export(options["base"])
+            delta_header, delta_cases = read_export(options["delta"])
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Unable to read export file: {exc}") from exc
+        if base_header.get("since"):
+            raise CommandError("--base must be a full export, not a delta.")
+
+        deleted = set(delta_header.get("deleted", []))
+        cases = {case["slug"]: case for case in base_cases if case["slug"] not in deleted}
+        replaced = sum(1 for case in delta_cases if case["slug"] in cases)
+        cases.update((case["slug"], case) for case in delta_cases)
+        merged = sort_cases(cases.values())
+
+        header = {
+            "generated_at": delta_header.get("generated_at") or base_header.get("generated_at"),
+            "count": len(merged),
+        }
+        output = Path(options["output"])
+        partial = output.with_name(f"{output.name}.partial")
+        try:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with partial.open("wb") as handle:
+                write_export(handle, options["format"], merged, header, compact=options["compact"])
+            partial.replace(output)
+        except OSError as exc:
+            raise CommandError(f"Unable to write export file: {exc}") from exc
+        finally:
+            partial.unlink(missing_ok=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Merged {len(delta_cases)} changed cases ({replaced} replaced, "
+                f"{len(delta_cases) - replaced} added) and {len(deleted)} deletions into {output}"
+            )
+        )
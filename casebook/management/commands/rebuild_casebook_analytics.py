@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from casebook.analytics import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the spend and case count summary tables behind the casebook analytics dashboard."
+
+    def handle(self, *args, **options):
+        spend_rows, count_rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {spend_rows} spend summaries and {count_rows} case counts."))
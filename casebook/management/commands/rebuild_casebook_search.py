@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite FTS5 index used by the casebook index search."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("The full-text table is missing; run migrate on an SQLite database first.")
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} case studies."))
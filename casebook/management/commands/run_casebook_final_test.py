@@ -10,6 +10,7 @@ from django.core.management.base import BaseCommand, CommandError
 from wagtail.models import Collection
 
 from casebook.models import CaseAsset, CaseChannelSpend, CaseMetric, CaseStudy, Industry, Organization
+from casebook.profiling import add_profile_argument, profiled_command
 
 
 def _build_test_assets(test_dir):
@@ -46,8 +47,13 @@ class Command(BaseCommand):
             default="test_assets",
             help="Folder for generated test images.",
         )
+        add_profile_argument(parser)
 
     def handle(self, *args, **options):
+        with profiled_command(self, "run_casebook_final_test", options["profile"]):
+            self._run(options)
+
+    def _run(self, options):
         output = Path(options["output"])
         assets_dir = Path(options["assets_dir"])
         image_paths = _build_test_assets(assets_dir)
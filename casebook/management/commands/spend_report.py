@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from casebook.fx import base_currency
+from casebook.spend import CASE_GROUP_FIELDS, CHANNEL_GROUP_FIELDS, case_spend_totals, channel_spend_totals
+
+
+def _amount(value):
+    return "-" if value is None else f"{value:,.2f}"
+
+
+class Command(BaseCommand):
+    help = "Print total and mean spend in the base currency per channel, sector, organization or year."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--by", choices=sorted(CHANNEL_GROUP_FIELDS), default="channel", help="Grouping.")
+        parser.add_argument(
+            "--source",
+            choices=["channel", "estimate"],
+            default="channel",
+            help="Sum channel spend rows (default) or the case-level min/max spend estimates.",
+        )
+        parser.add_argument("--year", type=int, help="Only include cases whose sort date ends in this year.")
+
+    def handle(self, *args, **options):
+        currency = base_currency()
+        if options["source"] == "channel":
+            filters = {"case_study__sort_end__year": options["year"]} if options["year"] else {}
+            for row in channel_spend_totals(options["by"], **filters):
+                self.stdout.write(
+                    f"{row['group'] or 'unassigned'}: total {_amount(row['total'])} {currency}, "
+                    f"mean {_amount(row['mean'])} over {row['rows']} rows"
+                    + (f" ({row['unconverted']} without an FX rate)" if row["unconverted"] else "")
+                )
+            return
+
+        if options["by"] not in CASE_GROUP_FIELDS:
+            self.stderr.write("Spend estimates are per case, not per channel; grouping by sector.")
+            options["by"] = "sector"
+        filters = {"sort_end__year": options["year"]} if options["year"] else {}
+        for row in case_spend_totals(options["by"], **filters):
+            self.stdout.write(
+                f"{row['group'] or 'unassigned'}: total {_amount(row['total_min'])}–{_amount(row['total_max'])} "
+                f"{currency}, mean {_amount(row['mean_min'])}–{_amount(row['mean_max'])} over {row['rows']} cases"
+                + (f" ({row['unconverted']} without an FX rate)" if row["unconverted"] else "")
+            )
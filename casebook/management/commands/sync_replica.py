@@ -0,0 +1,48 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from casebook import replica
+
+
+class Command(BaseCommand):
+    help = "Copy the default SQLite database into the read replica with the online backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            help="Replica alias to write (default: CASEBOOK_REPLICA_DATABASE).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running and copy again this many seconds after a change to default (default: copy once).",
+        )
+
+    def handle(self, *args, **options):
+        if options["interval"] < 0:
+            raise CommandError("--interval must not be negative.")
+        alias = options["database"] or replica.replica_alias()
+        if alias is None or alias == DEFAULT_DB_ALIAS or alias not in connections.settings:
+            raise CommandError("No replica database configured; add it to DATABASES and CASEBOOK_REPLICA_DATABASE.")
+
+        synced_version = None
+        while True:
+            # data_version changes whenever another connection commits to default.
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute("PRAGMA data_version")
+                data_version = cursor.fetchone()[0]
+            if data_version != synced_version:
+                started = time.perf_counter()
+                try:
+                    pages = replica.sync(alias)
+                except ImproperlyConfigured as exc:
+                    raise CommandError(str(exc)) from exc
+                synced_version = data_version
+                self.stdout.write(f"Copied {pages} pages to {alias} in {(time.perf_counter() - started) * 1000:.0f} ms.")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,48 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from casebook.renditions import (
+    RenditionReport,
+    default_workers,
+    find_missing_renditions,
+    generate_renditions,
+    warm_candidate_specs,
+    warm_specs,
+)
+
+
+class Command(BaseCommand):
+    help = "Generate every rendition the casebook templates and export use for case asset images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=default_workers(),
+            help="Processes used to generate missing renditions (default: CPU count).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=200, help="Images loaded per database round trip.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report the missing renditions.")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--workers and --chunk-size must be positive integers.")
+
+        report = RenditionReport()
+        missing = find_missing_renditions(
+            warm_candidate_specs(), report, chunk_size=options["chunk_size"], specs_for=warm_specs
+        )
+        by_spec = Counter(spec for specs in missing.values() for spec in specs)
+        for spec, count in sorted(by_spec.items()):
+            self.stdout.write(f"{spec}: {count} missing")
+        self.stdout.write(f"{len(missing)} images need renditions.")
+        if options["dry_run"]:
+            return
+
+        generate_renditions(missing, report, workers=options["workers"])
+        self.stdout.write(str(report))
+        for image_id, spec, error in report.failed:
+            self.stderr.write(f"Rendition {spec} failed for image {image_id}: {error}")
+        if report.failed:
+            raise CommandError(f"{len(report.failed)} renditions could not be generated.")
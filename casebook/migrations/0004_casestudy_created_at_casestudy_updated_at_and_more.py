@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0003_industry_organization_remove_casestudy_client_or_org_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='casestudy',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Bumped whenever the case or any of its assets, metrics, spend rows or tags change.'),
+        ),
+        migrations.CreateModel(
+            name='CaseStudyTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-deleted_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0004_casestudy_created_at_casestudy_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='casestudy',
+            options={'ordering': ['-sort_end', '-sort_start', 'title', 'id']},
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='sort_end',
+            field=models.DateField(blank=True, editable=False, help_text='Last day covered by the sort date label; maintained on save.', null=True),
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='sort_start',
+            field=models.DateField(blank=True, editable=False, help_text='First day covered by the sort date label; maintained on save.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='casestudy',
+            index=models.Index(fields=['-sort_end', '-sort_start', 'title', 'id'], name='casestudy_sort_idx'),
+        ),
+    ]
@@ -0,0 +1,134 @@
+import calendar
+import re
+from datetime import date
+
+from django.db import migrations
+
+# A frozen copy of casebook.dates.parse_date_range: the backfill must give the
+# same ranges however the live parser changes later.
+MONTHS = {}
+for _number in range(1, 13):
+    MONTHS[calendar.month_name[_number].lower()] = _number
+    MONTHS[calendar.month_abbr[_number].lower()] = _number
+MONTHS["sept"] = 9
+
+SEASONS = {"spring": (3, 5), "summer": (6, 8), "autumn": (9, 11), "fall": (9, 11), "winter": (12, 2)}
+
+RANGE_SEPARATOR = re.compile(r"\s*(?:\bto\b|–|—|\s-\s|-(?=[a-z])|(?<=\d{4})-(?=\d{4}\b))\s*")
+YEAR = re.compile(r"\b(\d{4})\b")
+ISO_DATE = re.compile(r"^(\d{4})-(\d{1,2})(?:-(\d{1,2}))?$")
+DAY_FIRST = re.compile(r"^(\d{1,2})(?:st|nd|rd|th)?\s+([a-z]+)\.?,?\s+(\d{4})$")
+MONTH_FIRST = re.compile(r"^([a-z]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})$")
+MONTH_YEAR = re.compile(r"^([a-z]+)\.?,?\s+(\d{4})$")
+PERIOD_YEAR = re.compile(r"^(q[1-4]|h[12])[\s-]*(\d{4})$|^(\d{4})[\s-]*(q[1-4]|h[12])$")
+
+
+def _month_range(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _period_range(period, year):
+    number = int(period[1])
+    months = 3 if period[0] == "q" else 6
+    first = (number - 1) * months + 1
+    return date(year, first, 1), _month_range(year, first + months - 1)[1]
+
+
+def _parse_single(label):
+    label = label.strip().lower()
+    if not label:
+        return None
+    if re.fullmatch(r"\d{4}", label):
+        year = int(label)
+        return date(year, 1, 1), date(year, 12, 31)
+
+    match = ISO_DATE.match(label)
+    if match:
+        year, month, day = int(match.group(1)), int(match.group(2)), match.group(3)
+        if day:
+            value = date(year, month, int(day))
+            return value, value
+        return _month_range(year, month)
+
+    for pattern, order in [(DAY_FIRST, (1, 2, 3)), (MONTH_FIRST, (2, 1, 3))]:
+        match = pattern.match(label)
+        if match and match.group(order[1]) in MONTHS:
+            value = date(int(match.group(order[2])), MONTHS[match.group(order[1])], int(match.group(order[0])))
+            return value, value
+
+    match = MONTH_YEAR.match(label)
+    if match:
+        word, year = match.group(1), int(match.group(2))
+        if word in MONTHS:
+            return _month_range(year, MONTHS[word])
+        if word in SEASONS:
+            first, last = SEASONS[word]
+            end_year = year + 1 if last < first else year
+            return date(year, first, 1), _month_range(end_year, last)[1]
+
+    match = PERIOD_YEAR.match(label)
+    if match:
+        period = match.group(1) or match.group(4)
+        year = int(match.group(2) or match.group(3))
+        return _period_range(period, year)
+    return None
+
+
+def parse_date_range(label):
+    """Return ``(start, end)`` dates covered by ``label``, or ``None`` if it has no recognisable date."""
+    if not label:
+        return None
+    label = label.strip()
+    try:
+        parsed = _parse_single(label)
+        if parsed:
+            return parsed
+
+        parts = [part for part in RANGE_SEPARATOR.split(label.lower()) if part]
+        if len(parts) == 2:
+            second = _parse_single(parts[1])
+            first = _parse_single(parts[0])
+            if first is None and second is not None:
+                # "Jan-Mar 2025": the first part borrows the year of the second.
+                first = _parse_single(f"{parts[0]} {second[0].year}")
+            if first and second and first[0] <= second[1]:
+                return first[0], second[1]
+    except ValueError:
+        # Out-of-range values such as "2025-13-01" fall through to the year fallback.
+        pass
+
+    for match in YEAR.finditer(label):
+        year = int(match.group(1))
+        # date() has no year 0.
+        if year >= 1:
+            return date(year, 1, 1), date(year, 12, 31)
+    return None
+
+
+def backfill_sort_range(apps, schema_editor):
+    CaseStudy = apps.get_model("casebook", "CaseStudy")
+    batch = []
+    for case in CaseStudy.objects.only("sort_date", "date_end", "date_start").iterator(chunk_size=500):
+        parsed = None
+        for label in (case.sort_date, case.date_end, case.date_start):
+            parsed = parse_date_range(label)
+            if parsed:
+                break
+        case.sort_start, case.sort_end = parsed or (None, None)
+        batch.append(case)
+        if len(batch) >= 500:
+            CaseStudy.objects.bulk_update(batch, ["sort_start", "sort_end"])
+            batch = []
+    if batch:
+        CaseStudy.objects.bulk_update(batch, ["sort_start", "sort_end"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0005_casestudy_sort_range'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sort_range, migrations.RunPython.noop),
+    ]
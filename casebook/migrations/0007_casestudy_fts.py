@@ -0,0 +1,81 @@
+from django.db import migrations
+
+# Frozen copies of the casebook.search table definition at the time of this migration.
+FTS_TABLE = "casebook_casestudy_fts"
+FTS_COLUMNS = [
+    "title",
+    "organization",
+    "sector",
+    "brand_or_campaign",
+    "tags",
+    "one_liner",
+    "objective",
+    "audience",
+    "constraints",
+    "strategy",
+    "creative_direction",
+    "production_and_tooling",
+    "delivery_and_distribution",
+    "my_contribution",
+    "team_and_partners",
+    "results_summary",
+    "what_worked",
+    "what_id_do_differently",
+]
+CREATE_FTS_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(FTS_COLUMNS)}, tokenize='porter unicode61 remove_diacritics 2')"
+)
+
+
+def create_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_FTS_TABLE)
+
+    CaseStudy = apps.get_model("casebook", "CaseStudy")
+    CaseStudyTag = apps.get_model("casebook", "CaseStudyTag")
+    tags = {}
+    for case_id, name in CaseStudyTag.objects.values_list("content_object_id", "tag__name"):
+        tags.setdefault(case_id, []).append(name)
+
+    rows = []
+    for case in CaseStudy.objects.select_related("organization", "sector").iterator(chunk_size=500):
+        row = [case.pk]
+        for field in FTS_COLUMNS:
+            if field == "organization":
+                row.append(case.organization.name if case.organization else "")
+            elif field == "sector":
+                row.append(case.sector.name if case.sector else "")
+            elif field == "tags":
+                row.append(" ".join(tags.get(case.pk, [])))
+            else:
+                row.append(getattr(case, field))
+        rows.append(row)
+    if rows:
+        placeholders = ", ".join(["%s"] * (len(FTS_COLUMNS) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})",
+                rows,
+            )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0006_backfill_casestudy_sort_range'),
+        ('taggit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
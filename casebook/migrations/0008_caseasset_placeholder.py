@@ -0,0 +1,23 @@
+# Generated by Django 6.0.9 on 2026-10-17 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0007_casestudy_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caseasset',
+            name='placeholder_color',
+            field=models.CharField(blank=True, editable=False, help_text='Dominant colour of the image as #rrggbb; maintained on save.', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='caseasset',
+            name='placeholder_data_uri',
+            field=models.TextField(blank=True, editable=False, help_text='Tiny inline preview of the image shown until it loads; maintained on save.'),
+        ),
+    ]
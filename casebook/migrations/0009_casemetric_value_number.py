@@ -0,0 +1,32 @@
+# Generated by Django 6.0.9 on 2026-10-17 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0008_caseasset_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='casemetric',
+            name='metric_key',
+            field=models.CharField(blank=True, editable=False, help_text='Case-folded metric name used to benchmark metrics together; maintained on save.', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='casemetric',
+            name='value_number',
+            field=models.FloatField(blank=True, editable=False, help_text='Number parsed from the value, with k/m/bn scaling applied; maintained on save.', null=True),
+        ),
+        migrations.AddField(
+            model_name='casemetric',
+            name='value_unit',
+            field=models.CharField(blank=True, editable=False, help_text='Unit parsed from the value (e.g. "%", "x", "GBP", "users"); maintained on save.', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='casemetric',
+            index=models.Index(fields=['metric_key', 'value_unit', 'value_number'], name='casemetric_benchmark_idx'),
+        ),
+    ]
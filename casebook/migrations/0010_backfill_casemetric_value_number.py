@@ -0,0 +1,81 @@
+import re
+
+from django.db import migrations
+
+# A frozen copy of casebook.metrics: the backfill must give the same numbers and
+# units however the live parser changes later.
+CURRENCIES = {"£": "GBP", "$": "USD", "€": "EUR"}
+SCALES = {
+    "k": 1e3,
+    "thousand": 1e3,
+    "m": 1e6,
+    "mn": 1e6,
+    "mm": 1e6,
+    "million": 1e6,
+    "b": 1e9,
+    "bn": 1e9,
+    "billion": 1e9,
+}
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d*\.?\d+"
+VALUE = re.compile(
+    rf"(?P<sign>[-−])?(?P<currency>[£$€])?\s*(?<![\w.])(?P<number>{_NUMBER})"
+    rf"(?:\s*(?:-|–|to)\s*[£$€]?\s*(?P<upper>{_NUMBER}))?"
+    rf"(?:\s*(?P<scale>{'|'.join(sorted(SCALES, key=len, reverse=True))})\b)?"
+    r"\s*(?P<marker>%|x\b)?",
+    re.IGNORECASE,
+)
+WORD = re.compile(r"[^\W\d_][\w/-]*")
+
+
+def metric_key(metric_name):
+    """Normalise a metric name so "ROAS" and " roas " benchmark together."""
+    return " ".join((metric_name or "").split()).casefold()
+
+
+def parse_metric_value(value, metric_name=""):
+    """Return ``(number, unit)`` for a metric value, e.g. ``(4500000.0, "users")`` for "4.5m users"."""
+    match = VALUE.search(value or "")
+    if not match:
+        return None, ""
+    number = float(match["number"].replace(",", ""))
+    if match["upper"]:
+        number = (number + float(match["upper"].replace(",", ""))) / 2
+    if match["scale"]:
+        number *= SCALES[match["scale"].lower()]
+    if match["sign"] and match.start("sign") == match.start() and not match["upper"]:
+        number = -number
+
+    if match["currency"]:
+        return number, CURRENCIES[match["currency"]]
+    if match["marker"]:
+        return number, match["marker"].lower()
+    word = WORD.search(value, match.end())
+    unit = word.group().casefold() if word else ""
+    return number, "" if unit == metric_key(metric_name) else unit
+
+
+def backfill_metric_values(apps, schema_editor):
+    CaseMetric = apps.get_model("casebook", "CaseMetric")
+    batch = []
+    for metric in CaseMetric.objects.only("metric_name", "value").iterator(chunk_size=500):
+        metric.metric_key = metric_key(metric.metric_name)
+        number, unit = parse_metric_value(metric.value, metric.metric_name)
+        metric.value_number, metric.value_unit = number, unit[:32]
+        batch.append(metric)
+        if len(batch) >= 500:
+            CaseMetric.objects.bulk_update(batch, ["metric_key", "value_number", "value_unit"])
+            batch = []
+    if batch:
+        CaseMetric.objects.bulk_update(batch, ["metric_key", "value_number", "value_unit"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0009_casemetric_value_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_metric_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.9 on 2026-10-17 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0010_backfill_casemetric_value_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=10)),
+                ('rate_date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=8, help_text='Units of the base currency bought by one unit of this currency.', max_digits=18)),
+            ],
+            options={
+                'ordering': ['currency', '-rate_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='casechannelspend',
+            name='spend_amount_base',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='spend_amount_max_base',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='casestudy',
+            name='spend_amount_min_base',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='casechannelspend',
+            index=models.Index(fields=['channel', 'spend_amount_base'], name='channelspend_base_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='fxrate',
+            constraint=models.UniqueConstraint(fields=('currency', 'rate_date'), name='fxrate_currency_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Round
+
+# Frozen copies of the casebook.spend normalizer at the time of this migration.
+CASE_SPEND_FIELDS = {"spend_amount_min_base": "spend_amount_min", "spend_amount_max_base": "spend_amount_max"}
+CHANNEL_SPEND_FIELDS = {"spend_amount_base": "spend_amount"}
+
+
+def normalize_queryset(queryset, fields, rates):
+    queryset.exclude(spend_currency__in=list(rates)).update(**{target: None for target in fields})
+    for currency, rate in rates.items():
+        rate = Value(rate, output_field=DecimalField(max_digits=18, decimal_places=8))
+        queryset.filter(spend_currency=currency).update(
+            **{target: Round(F(source) * rate, 2) for target, source in fields.items()}
+        )
+
+
+def backfill_base_spend(apps, schema_editor):
+    # No FX rates exist yet, so only amounts already in the base currency convert.
+    rates = {getattr(settings, "CASEBOOK_BASE_CURRENCY", "GBP"): Decimal(1)}
+    normalize_queryset(apps.get_model("casebook", "CaseStudy").objects.all(), CASE_SPEND_FIELDS, rates)
+    normalize_queryset(apps.get_model("casebook", "CaseChannelSpend").objects.all(), CHANNEL_SPEND_FIELDS, rates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0011_fx_rates_and_base_spend'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_base_spend, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.9 on 2026-10-17 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0012_backfill_base_spend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseCountSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('organization', 'Organization'), ('sector', 'Sector'), ('tag', 'Tag'), ('year', 'Year')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=20)),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('cases', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', '-cases'], name='casecountsummary_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='casecountsummary_key_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SpendSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=30)),
+                ('year', models.PositiveSmallIntegerField(null=True)),
+                ('currency', models.CharField(max_length=10)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_base', models.DecimalField(decimal_places=2, max_digits=16, null=True)),
+                ('sector', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='casebook.industry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sector', 'year'], name='spendsummary_slice_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.9 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('casebook', '0013_analytics_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='industry',
+            name='peers_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,7 +1,12 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
 from uuid import uuid4
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 from django.utils.text import slugify
 
 from modelcluster.contrib.taggit import ClusterTaggableManager
@@ -12,6 +17,19 @@ from wagtail.admin.panels import FieldPanel, InlinePanel, ObjectList, TabbedInte
 from wagtail.models import Orderable
 from wagtail.search import index
 
+from .dates import parse_date_range
+from .fx import base_currency, convert
+from .metrics import metric_key, parse_metric_value
+from .slugs import allocate_slug
+
+# Chronological, newest first; backed by the casestudy_sort_idx index.
+CASE_ORDERING = ["-sort_end", "-sort_start", "title", "id"]
+# Times an auto-generated slug is re-allocated after losing a race to a concurrent insert.
+SLUG_ATTEMPTS = 5
+
+# Rates set by FxRate.pinned() for the current block.
+_pinned_rates = ContextVar("casebook_fx_rates", default=None)
+
 
 class CaseStudyTag(TaggedItemBase):
     content_object = ParentalKey(
@@ -33,6 +51,9 @@ class Organization(models.Model):
 
 class Industry(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    # Bumped whenever one of the sector's cases changes or joins or leaves it; detail pages
+    # rank metrics among the sector, so their validators include it.
+    peers_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["name"]
@@ -41,6 +62,47 @@ class Industry(models.Model):
         return self.name
 
 
+class FxRate(models.Model):
+    currency = models.CharField(max_length=10)
+    rate_date = models.DateField()
+    rate = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        help_text="Units of the base currency bought by one unit of this currency.",
+    )
+
+    class Meta:
+        ordering = ["currency", "-rate_date"]
+        constraints = [models.UniqueConstraint(fields=["currency", "rate_date"], name="fxrate_currency_date_uniq")]
+
+    def __str__(self):
+        return f"{self.currency} {self.rate_date}: {self.rate}"
+
+    @classmethod
+    def latest_rates(cls):
+        """Return ``{currency: rate}`` with each currency's most recent rate and 1 for the base currency."""
+        pinned = _pinned_rates.get()
+        if pinned is not None:
+            return pinned
+        newest = cls.objects.filter(currency=OuterRef("currency")).order_by("-rate_date").values("rate_date")[:1]
+        rates = dict(cls.objects.filter(rate_date=Subquery(newest)).values_list("currency", "rate"))
+        rates[base_currency()] = Decimal(1)
+        return rates
+
+    @classmethod
+    @contextmanager
+    def pinned(cls, rates=None):
+        """Answer ``latest_rates()`` with ``rates`` (default: read once now) until the block exits.
+
+        Wrap code that saves many cases or channel spend rows, which would otherwise each read the rates.
+        """
+        token = _pinned_rates.set(cls.latest_rates() if rates is None else rates)
+        try:
+            yield _pinned_rates.get()
+        finally:
+            _pinned_rates.reset(token)
+
+
 class CaseStudy(index.Indexed, ClusterableModel):
     CURRENCY_GBP = "GBP"
     CURRENCY_USD = "USD"
@@ -159,6 +221,9 @@ class CaseStudy(index.Indexed, ClusterableModel):
         blank=True,
         help_text="Maximum spend estimate.",
     )
+    # Spend estimates in CASEBOOK_BASE_CURRENCY; None when the currency has no FX rate.
+    spend_amount_min_base = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
+    spend_amount_max_base = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
     spend_notes = models.TextField(
         blank=True,
         help_text='Assumptions (e.g. "approx, excludes production").',
@@ -181,6 +246,24 @@ class CaseStudy(index.Indexed, ClusterableModel):
         blank=True,
         help_text='Optional sortable date label (e.g. "January 2024", "2024"). Defaults to end/start text.',
     )
+    sort_start = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="First day covered by the sort date label; maintained on save.",
+    )
+    sort_end = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Last day covered by the sort date label; maintained on save.",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Bumped whenever the case or any of its assets, metrics, spend rows or tags change.",
+    )
 
     search_fields = [
         index.SearchField("title", partial_match=True),
@@ -254,7 +337,8 @@ class CaseStudy(index.Indexed, ClusterableModel):
     )
 
     class Meta:
-        ordering = ["-sort_date", "-date_end", "-date_start", "title"]
+        ordering = CASE_ORDERING
+        indexes = [models.Index(fields=CASE_ORDERING, name="casestudy_sort_idx")]
 
     def __str__(self):
         return self.title or f"Campaign {self.slug}"
@@ -270,20 +354,47 @@ class CaseStudy(index.Indexed, ClusterableModel):
                 {"spend_amount_max": "Maximum spend must be greater than or equal to minimum spend."}
             )
 
+    def base_slug(self):
+        organization_name = self.organization.name if self.organization else ""
+        source = self.title or self.brand_or_campaign or organization_name or f"campaign-{uuid4().hex[:8]}"
+        return slugify(source) or f"campaign-{uuid4().hex[:8]}"
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            organization_name = self.organization.name if self.organization else ""
-            source = self.title or self.brand_or_campaign or organization_name or f"campaign-{uuid4().hex[:8]}"
-            base_slug = slugify(source) or f"campaign-{uuid4().hex[:8]}"
-            slug_candidate = base_slug
-            counter = 2
-            while CaseStudy.objects.filter(slug=slug_candidate).exclude(pk=self.pk).exists():
-                slug_candidate = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug_candidate
+        # ClusterableModel.save() also saves the admin's inline channel spend rows; they share one rate lookup.
+        with FxRate.pinned():
+            return self._save(*args, **kwargs)
+
+    def _save(self, *args, **kwargs):
         if not self.sort_date:
             self.sort_date = self.date_end or self.date_start
-        super().save(*args, **kwargs)
+        self.sort_start, self.sort_end = self.parse_sort_range()
+        self.normalize_spend()
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        base_slug = self.base_slug()
+        others = CaseStudy.objects.exclude(pk=self.pk) if self.pk else CaseStudy.objects.all()
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = allocate_slug(others, base_slug)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS - 1 or not others.filter(slug=self.slug).exists():
+                    self.slug = ""
+                    raise
+
+    def normalize_spend(self, rates=None):
+        rates = FxRate.latest_rates() if rates is None else rates
+        self.spend_amount_min_base = convert(self.spend_amount_min, self.spend_currency, rates)
+        self.spend_amount_max_base = convert(self.spend_amount_max, self.spend_currency, rates)
+
+    def parse_sort_range(self):
+        for label in (self.sort_date, self.date_end, self.date_start):
+            parsed = parse_date_range(label)
+            if parsed:
+                return parsed
+        return None, None
 
 
 class CaseAsset(Orderable):
@@ -346,6 +457,17 @@ class CaseAsset(Orderable):
         help_text="Mark as the primary visual for this case (single hero only).",
     )
     alt_text = models.CharField(max_length=255, blank=True, help_text="Accessibility description for the image.")
+    placeholder_color = models.CharField(
+        max_length=7,
+        blank=True,
+        editable=False,
+        help_text="Dominant colour of the image as #rrggbb; maintained on save.",
+    )
+    placeholder_data_uri = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Tiny inline preview of the image shown until it loads; maintained on save.",
+    )
 
     panels = [
         FieldPanel("asset_type"),
@@ -399,6 +521,24 @@ class CaseMetric(Orderable):
         help_text='Evidence source (e.g. "GA4", "Meta Ads", "Press").',
     )
     notes = models.CharField(max_length=255, blank=True, help_text="Extra metric context or caveats.")
+    metric_key = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text="Case-folded metric name used to benchmark metrics together; maintained on save.",
+    )
+    value_number = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Number parsed from the value, with k/m/bn scaling applied; maintained on save.",
+    )
+    value_unit = models.CharField(
+        max_length=32,
+        blank=True,
+        editable=False,
+        help_text='Unit parsed from the value (e.g. "%", "x", "GBP", "users"); maintained on save.',
+    )
 
     panels = [
         FieldPanel("metric_name"),
@@ -408,9 +548,21 @@ class CaseMetric(Orderable):
         FieldPanel("notes"),
     ]
 
+    class Meta(Orderable.Meta):
+        indexes = [models.Index(fields=["metric_key", "value_unit", "value_number"], name="casemetric_benchmark_idx")]
+
     def __str__(self):
         return f"{self.metric_name}: {self.value}"
 
+    def save(self, *args, **kwargs):
+        self.parse_value()
+        super().save(*args, **kwargs)
+
+    def parse_value(self):
+        self.metric_key = metric_key(self.metric_name)
+        number, unit = parse_metric_value(self.value, self.metric_name)
+        self.value_number, self.value_unit = number, unit[:32]
+
 
 class CaseChannelSpend(Orderable):
     CHANNEL_META = "Meta"
@@ -452,6 +604,8 @@ class CaseChannelSpend(Orderable):
         blank=True,
         help_text="Spend amount for this channel segment.",
     )
+    # spend_amount in CASEBOOK_BASE_CURRENCY; None when the currency has no FX rate.
+    spend_amount_base = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
     dates = models.CharField(max_length=255, blank=True, help_text='Date label (e.g. "Jan-Mar 2025").')
     notes = models.CharField(max_length=255, blank=True, help_text="Extra context for this spend item.")
 
@@ -463,5 +617,73 @@ class CaseChannelSpend(Orderable):
         FieldPanel("notes"),
     ]
 
+    class Meta(Orderable.Meta):
+        indexes = [models.Index(fields=["channel", "spend_amount_base"], name="channelspend_base_idx")]
+
     def __str__(self):
         return f"{self.channel} - {self.spend_amount or 'N/A'}"
+
+    def save(self, *args, **kwargs):
+        self.normalize_spend()
+        super().save(*args, **kwargs)
+
+    def normalize_spend(self, rates=None):
+        rates = FxRate.latest_rates() if rates is None else rates
+        self.spend_amount_base = convert(self.spend_amount, self.spend_currency, rates)
+
+
+class SpendSummary(models.Model):
+    """Channel spend totals per channel, sector, year and currency, maintained by ``casebook.analytics``."""
+
+    channel = models.CharField(max_length=30)
+    sector = models.ForeignKey("casebook.Industry", null=True, on_delete=models.CASCADE, related_name="+")
+    year = models.PositiveSmallIntegerField(null=True)
+    currency = models.CharField(max_length=10)
+    rows = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_base = models.DecimalField(max_digits=16, decimal_places=2, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["sector", "year"], name="spendsummary_slice_idx")]
+
+    def __str__(self):
+        return f"{self.channel} {self.year or '-'} {self.currency}: {self.total}"
+
+
+class CaseCountSummary(models.Model):
+    """Number of cases per organization, sector, tag or year, maintained by ``casebook.analytics``."""
+
+    DIMENSION_ORGANIZATION = "organization"
+    DIMENSION_SECTOR = "sector"
+    DIMENSION_TAG = "tag"
+    DIMENSION_YEAR = "year"
+    DIMENSION_CHOICES = [
+        (DIMENSION_ORGANIZATION, "Organization"),
+        (DIMENSION_SECTOR, "Sector"),
+        (DIMENSION_TAG, "Tag"),
+        (DIMENSION_YEAR, "Year"),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Primary key of the organization, sector or tag, or the year; "" for cases without one.
+    key = models.CharField(max_length=20, blank=True)
+    label = models.CharField(max_length=255, blank=True)
+    cases = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["dimension", "key"], name="casecountsummary_key_uniq")]
+        indexes = [models.Index(fields=["dimension", "-cases"], name="casecountsummary_rank_idx")]
+
+    def __str__(self):
+        return f"{self.dimension} {self.label or '-'}: {self.cases}"
+
+
+class CaseStudyTombstone(models.Model):
+    slug = models.SlugField(unique=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["-deleted_at"]
+
+    def __str__(self):
+        return f"{self.slug} (deleted {self.deleted_at:%Y-%m-%d})"
@@ -0,0 +1,167 @@
+"""Minimal MessagePack codec for export payloads.
+
+Uses the ``msgpack`` package when it is installed and falls back to a pure-Python
+implementation covering the types exports contain (None, bool, int, float, str,
+bytes, list and dict).
+"""
+
+import struct
+
+try:
+    import msgpack as _msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    _msgpack = None
+
+
+def packb(obj):
+    if _msgpack is not None:
+        return _msgpack.packb(obj, use_bin_type=True)
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def iter_unpack(handle, chunk_size=65536):
+    """Yield each object from a binary file of consecutive MessagePack objects, reading it in chunks."""
+    if _msgpack is not None:
+        yield from _msgpack.Unpacker(handle, raw=False, strict_map_key=False)
+        return
+    buffer, offset = b"", 0
+    while True:
+        try:
+            obj, end = _unpack(buffer, offset)
+        except (IndexError, struct.error):
+            # The next object runs past the bytes read so far; read at least as much again.
+            chunk = handle.read(max(chunk_size, len(buffer) - offset))
+            if not chunk:
+                if offset < len(buffer):
+                    raise ValueError("Truncated MessagePack data") from None
+                return
+            buffer, offset = buffer[offset:] + chunk, 0
+            continue
+        offset = end
+        yield obj
+
+
+def _pack_length(out, length, fix_base, fix_limit, formats):
+    if length < fix_limit:
+        out.append(fix_base | length)
+        return
+    for code, fmt, limit in formats:
+        if length <= limit:
+            out.append(code)
+            out += struct.pack(fmt, length)
+            return
+    raise ValueError(f"Object too large for MessagePack: {length}")
+
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80 or -32 <= obj < 0:
+            out += struct.pack(">b" if obj < 0 else ">B", obj)
+        elif obj > 0:
+            for code, fmt, limit in [(0xCC, ">B", 0xFF), (0xCD, ">H", 0xFFFF), (0xCE, ">I", 0xFFFFFFFF)]:
+                if obj <= limit:
+                    out.append(code)
+                    out += struct.pack(fmt, obj)
+                    break
+            else:
+                out.append(0xCF)
+                out += struct.pack(">Q", obj)
+        else:
+            for code, fmt, limit in [(0xD0, ">b", 0x80), (0xD1, ">h", 0x8000), (0xD2, ">i", 0x80000000)]:
+                if -obj <= limit:
+                    out.append(code)
+                    out += struct.pack(fmt, obj)
+                    break
+            else:
+                out.append(0xD3)
+                out += struct.pack(">q", obj)
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        _pack_length(out, len(data), 0xA0, 32, [(0xD9, ">B", 0xFF), (0xDA, ">H", 0xFFFF), (0xDB, ">I", 0xFFFFFFFF)])
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        _pack_length(out, len(obj), 0, 0, [(0xC4, ">B", 0xFF), (0xC5, ">H", 0xFFFF), (0xC6, ">I", 0xFFFFFFFF)])
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_length(out, len(obj), 0x90, 16, [(0xDC, ">H", 0xFFFF), (0xDD, ">I", 0xFFFFFFFF)])
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_length(out, len(obj), 0x80, 16, [(0xDE, ">H", 0xFFFF), (0xDF, ">I", 0xFFFFFFFF)])
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Cannot serialize {type(obj).__name__} to MessagePack")
+
+
+_FIXED = {
+    0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q",
+    0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q",
+    0xCA: ">f", 0xCB: ">d",
+}
+_SIZED = {
+    0xD9: (">B", "str"), 0xDA: (">H", "str"), 0xDB: (">I", "str"),
+    0xC4: (">B", "bin"), 0xC5: (">H", "bin"), 0xC6: (">I", "bin"),
+    0xDC: (">H", "array"), 0xDD: (">I", "array"),
+    0xDE: (">H", "map"), 0xDF: (">I", "map"),
+}
+
+
+def _unpack(data, offset):
+    code = data[offset]
+    offset += 1
+    if code <= 0x7F:
+        return code, offset
+    if code >= 0xE0:
+        return code - 0x100, offset
+    if code == 0xC0:
+        return None, offset
+    if code in (0xC2, 0xC3):
+        return code == 0xC3, offset
+    if code in _FIXED:
+        fmt = _FIXED[code]
+        return struct.unpack_from(fmt, data, offset)[0], offset + struct.calcsize(fmt)
+
+    if 0xA0 <= code <= 0xBF:
+        kind, length = "str", code & 0x1F
+    elif 0x90 <= code <= 0x9F:
+        kind, length = "array", code & 0x0F
+    elif 0x80 <= code <= 0x8F:
+        kind, length = "map", code & 0x0F
+    elif code in _SIZED:
+        fmt, kind = _SIZED[code]
+        length = struct.unpack_from(fmt, data, offset)[0]
+        offset += struct.calcsize(fmt)
+    else:
+        raise ValueError(f"Unsupported MessagePack type byte 0x{code:02x}")
+
+    if kind in ("str", "bin") and offset + length > len(data):
+        raise IndexError("MessagePack string runs past the end of the data")
+
+    if kind == "str":
+        return bytes(data[offset : offset + length]).decode("utf-8"), offset + length
+    if kind == "bin":
+        return bytes(data[offset : offset + length]), offset + length
+    if kind == "array":
+        items = []
+        for _ in range(length):
+            item, offset = _unpack(data, offset)
+            items.append(item)
+        return items, offset
+    mapping = {}
+    for _ in range(length):
+        key, offset = _unpack(data, offset)
+        mapping[key], offset = _unpack(data, offset)
+    return mapping, offset
@@ -0,0 +1,173 @@
+"""Keyset (cursor) pagination.
+
+Pages are selected with a WHERE clause on the ordering columns of the last (or
+first) row already shown, so every page costs at most two indexed range scans
+regardless of depth, and no OFFSET or COUNT(*) is ever issued. NULLs are treated as the
+smallest value, matching SQLite's ordering in both directions.
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _columns(model, ordering):
+    return [(model._meta.get_field(name.lstrip("-")), name.startswith("-")) for name in ordering]
+
+
+def encode_values(values):
+    """Encode a list of JSON-serializable key values (dates as ISO strings) as a URL-safe cursor."""
+    raw = json.dumps([value.isoformat() if hasattr(value, "isoformat") else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_values(token, length):
+    """Return the list of ``length`` raw values stored in ``token``, or ``None`` if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+def encode_cursor(obj, ordering):
+    return encode_values([getattr(obj, field.attname) for field, _ in _columns(type(obj), ordering)])
+
+
+def decode_cursor(token, model, ordering):
+    """Return the ordering values stored in ``token``, or ``None`` if it is malformed."""
+    columns = _columns(model, ordering)
+    values = decode_values(token, len(columns))
+    if values is None:
+        return None
+    try:
+        return [None if value is None else field.to_python(value) for (field, _), value in zip(columns, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _beyond(field, value, smaller):
+    if smaller:
+        if value is None:
+            return None
+        condition = Q(**{f"{field.name}__lt": value})
+        return condition | Q(**{f"{field.name}__isnull": True}) if field.null else condition
+    if value is None:
+        return Q(**{f"{field.name}__isnull": False})
+    return Q(**{f"{field.name}__gt": value})
+
+
+def keyset_filter(model, ordering, values, forward=True):
+    """Q selecting rows strictly after (or before, when not ``forward``) ``values`` in ``ordering``."""
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (field, descending), value in zip(_columns(model, ordering), values):
+        beyond = _beyond(field, value, smaller=descending == forward)
+        if beyond is not None:
+            condition |= equal & beyond
+        equal &= Q(**{f"{field.name}__isnull": True}) if value is None else Q(**{field.name: value})
+    return condition
+
+
+def _reverse(ordering):
+    return [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+
+
+def _bands(model, ordering, values, forward):
+    """Split the rows beyond ``values`` into ranges on the leading column, in walk order.
+
+    An OR of keyset branches defeats SQLite's index range search, so each band
+    adds a plain bound on the leading column that the planner can seek to.
+    """
+    field, descending = _columns(model, ordering)[0]
+    leading = values[0]
+    smaller = descending == forward
+    after = keyset_filter(model, ordering, values, forward)
+    if leading is None:
+        bands = [Q(**{f"{field.name}__isnull": True}) & after]
+        if not smaller:
+            bands.append(Q(**{f"{field.name}__isnull": False}))
+        return bands
+    bands = [Q(**{f"{field.name}__{'lte' if smaller else 'gte'}": leading}) & after]
+    if smaller and field.null:
+        bands.append(Q(**{f"{field.name}__isnull": True}))
+    return bands
+
+
+def _fetch(queryset, ordering, values, forward, limit):
+    order = ordering if forward else _reverse(ordering)
+    if values is None:
+        return list(queryset.order_by(*order)[:limit])
+    rows = []
+    for band in _bands(queryset.model, ordering, values, forward):
+        rows.extend(queryset.filter(band).order_by(*order)[: limit - len(rows)])
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def paginate(queryset, ordering, page_size, after=None, before=None):
+    """Return a ``KeysetPage`` of ``page_size`` rows after cursor ``after`` or before cursor ``before``."""
+    model = queryset.model
+    if before and (values := decode_cursor(before, model, ordering)) is not None:
+        rows = _fetch(queryset, ordering, values, False, page_size + 1)
+        items = rows[:page_size][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(items[-1], ordering) if items else None,
+            previous_cursor=encode_cursor(items[0], ordering) if len(rows) > page_size else None,
+        )
+
+    values = decode_cursor(after, model, ordering) if after else None
+    rows = _fetch(queryset, ordering, values, True, page_size + 1)
+    items = rows[:page_size]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1], ordering) if len(rows) > page_size else None,
+        previous_cursor=encode_cursor(items[0], ordering) if items and values is not None else None,
+    )
+
+
+def requested_page_size(request):
+    """``?page_size=`` clamped to ``CASEBOOK_MAX_PAGE_SIZE``, defaulting to ``CASEBOOK_PAGE_SIZE``."""
+    try:
+        size = int(request.GET.get("page_size", settings.CASEBOOK_PAGE_SIZE))
+    except ValueError:
+        size = settings.CASEBOOK_PAGE_SIZE
+    return min(max(size, 1), settings.CASEBOOK_MAX_PAGE_SIZE)
+
+
+def cursor_url(request, param, cursor):
+    """The current query string with ``after``/``before`` replaced by ``param=cursor``."""
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    params[param] = cursor
+    return f"?{params.urlencode()}"
@@ -0,0 +1,55 @@
+"""Low-quality image placeholders for case assets.
+
+Each asset image gets a dominant colour and a tiny PNG (at most
+``PLACEHOLDER_SIZE`` pixels on its longest side) inlined as a data URI. Both are
+computed once when the asset is saved, so pages can paint them before any
+rendition has been requested.
+"""
+
+import base64
+import logging
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_SIZE = 16
+
+
+def compute_placeholder(image):
+    """Return ``(colour, data_uri)`` for a Wagtail image, e.g. ``("#ba2239", "data:image/png;base64,...")``."""
+    with image.open_file() as handle, Image.open(handle) as source:
+        thumbnail = ImageOps.exif_transpose(source).convert("RGB")
+        thumbnail.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+
+    palette = thumbnail.quantize(colors=4)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3 : index * 3 + 3]
+
+    buffer = BytesIO()
+    thumbnail.save(buffer, format="PNG", optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return f"#{red:02x}{green:02x}{blue:02x}", f"data:image/png;base64,{encoded}"
+
+
+def assign_placeholder(asset):
+    """Fill ``asset``'s placeholder fields from its image; clears them when there is none or it can't be read."""
+    asset.placeholder_color, asset.placeholder_data_uri = "", ""
+    if not asset.image_id:
+        return False
+    try:
+        asset.placeholder_color, asset.placeholder_data_uri = compute_placeholder(asset.image)
+    except Exception:
+        logger.warning("Could not compute a placeholder for image %s", asset.image_id, exc_info=True)
+        return False
+    return True
+
+
+def placeholder_style(color, data_uri=""):
+    """Inline CSS painting the placeholder behind an image until it loads."""
+    if not color:
+        return ""
+    if not data_uri:
+        return f"background-color: {color}"
+    return f"background: {color} url({data_uri}) center / cover no-repeat"
@@ -0,0 +1,110 @@
+"""On-demand cProfile capture.
+
+``profiled(label)`` profiles a block, writes the stats to a ``.pstats`` file in
+``CASEBOOK_PROFILE_DIR`` and keeps the top ``CASEBOOK_PROFILE_TOP`` functions by
+cumulative time as text. ``export_casebook --profile`` and
+``run_casebook_final_test --profile`` wrap the whole command in it and print
+the hot spots. ``ProfileMiddleware`` wraps requests from active staff users
+that carry ``?_profile`` or an ``X-Casebook-Profile`` header, and logs them.
+Only the thread that runs the block is profiled.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.text import slugify
+
+logger = logging.getLogger("casebook.profiling")
+
+QUERY_PARAM = "_profile"
+HEADER = "X-Casebook-Profile"
+
+
+class Capture:
+    def __init__(self):
+        self.path = None
+        self.hot_spots = ""
+
+
+def _save(profiler, label, capture):
+    directory = Path(settings.CASEBOOK_PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    capture.path = directory / f"{slugify(label) or 'profile'}-{datetime.now():%Y%m%d-%H%M%S-%f}.pstats"
+    profiler.dump_stats(capture.path)
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+        settings.CASEBOOK_PROFILE_TOP
+    )
+    capture.hot_spots = buffer.getvalue()
+
+
+@contextmanager
+def profiled(label):
+    """Profile the block; the yielded ``Capture`` holds the ``.pstats`` path and hot spots afterwards.
+
+    The block runs unprofiled, leaving ``path`` as ``None``, when another
+    profiler is already active.
+    """
+    capture = Capture()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as exc:
+        logger.warning("Not profiling %s: %s", label, exc)
+        profiler = None
+    try:
+        yield capture
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _save(profiler, label, capture)
+
+
+def add_profile_argument(parser):
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Profile the command with cProfile, write a .pstats file to CASEBOOK_PROFILE_DIR "
+            "and print the functions with the most cumulative time."
+        ),
+    )
+
+
+@contextmanager
+def profiled_command(command, name, enabled):
+    """Profile a management command's work when ``enabled``, then print where the stats went and the hot spots."""
+    if not enabled:
+        yield
+        return
+    with profiled(name) as capture:
+        yield
+    if capture.path:
+        command.stdout.write(capture.hot_spots)
+        command.stdout.write(f"Profile written to {capture.path}")
+
+
+class ProfileMiddleware:
+    """Profile requests from active staff users that ask for it with ``?_profile`` or ``X-Casebook-Profile``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wanted = QUERY_PARAM in request.GET or HEADER in request.headers
+        if not (wanted and request.user.is_active and request.user.is_staff):
+            return self.get_response(request)
+        with profiled(f"{request.method}-{request.path}") as capture:
+            response = self.get_response(request)
+        if capture.path:
+            response[HEADER] = capture.path.name
+            logger.info(
+                "Profiled %s %s into %s\n%s", request.method, request.get_full_path(), capture.path, capture.hot_spots
+            )
+        return response
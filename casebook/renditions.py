@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import Prefetch
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from . import caching
+from .models import CaseAsset, CaseStudy
+
+logger = logging.getLogger(__name__)
+
+EXPORT_RENDITION_SPECS = [("fill_1600x900", "fill-1600x900"), ("max_1200x1200", "max-1200x1200")]
+# Widths offered in the srcset of the {% responsive_image %} tag.
+RESPONSIVE_WIDTHS = [480, 800, 1200, 1600]
+# 1x and 2x crops for the {% thumbnail_image %} tag on the index.
+THUMBNAIL_SIZES = [(96, 54), (192, 108)]
+FALLBACK_FORMATS = ["jpeg", "png"]
+
+_background_pool = None
+# (image_id, specs) requests waiting on or running in the background pool.
+_queued = set()
+_queued_lock = threading.Lock()
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def renditions_prefetch(specs, lookup="renditions"):
+    rendition_model = get_image_model().get_rendition_model()
+    return Prefetch(lookup, queryset=rendition_model.objects.filter(filter_spec__in=specs))
+
+
+def _image_formats(image):
+    fallback = "png" if image.file.name.lower().endswith((".png", ".gif")) else "jpeg"
+    return [*settings.CASEBOOK_IMAGE_FORMATS, fallback]
+
+
+def _candidate_formats():
+    return [*settings.CASEBOOK_IMAGE_FORMATS, *FALLBACK_FORMATS]
+
+
+def responsive_specs(image):
+    """Specs for ``image`` in every ``CASEBOOK_IMAGE_FORMATS`` format plus a JPEG or PNG fallback.
+
+    Widths stop at the first one reaching the original, since Wagtail never upscales.
+    """
+    widths = [width for width in RESPONSIVE_WIDTHS if width < image.width]
+    widths += [width for width in RESPONSIVE_WIDTHS if width >= image.width][:1]
+    return [f"width-{width}|format-{image_format}" for image_format in _image_formats(image) for width in widths]
+
+
+def responsive_candidate_specs():
+    """Every spec ``responsive_specs`` can return, for prefetching renditions."""
+    return [
+        f"width-{width}|format-{image_format}" for image_format in _candidate_formats() for width in RESPONSIVE_WIDTHS
+    ]
+
+
+def thumbnail_specs(image):
+    return [
+        f"fill-{width}x{height}|format-{image_format}"
+        for image_format in _image_formats(image)
+        for width, height in THUMBNAIL_SIZES
+    ]
+
+
+def thumbnail_candidate_specs():
+    return [
+        f"fill-{width}x{height}|format-{image_format}"
+        for image_format in _candidate_formats()
+        for width, height in THUMBNAIL_SIZES
+    ]
+
+
+def warm_specs(image):
+    return responsive_specs(image) + thumbnail_specs(image) + [spec for _, spec in EXPORT_RENDITION_SPECS]
+
+
+def warm_candidate_specs():
+    return responsive_candidate_specs() + thumbnail_candidate_specs() + [spec for _, spec in EXPORT_RENDITION_SPECS]
+
+
+def existing_renditions(image, specs):
+    # Never generates: with renditions prefetched this is an in-memory lookup.
+    found = image.find_existing_renditions(*[Filter(spec=spec) for spec in specs])
+    return {rendition_filter.spec: rendition for rendition_filter, rendition in found.items()}
+
+
+class RenditionReport:
+    def __init__(self):
+        self.generated = 0
+        self.reused = 0
+        self.failed = []
+
+    def __str__(self):
+        return f"Renditions: {self.generated} generated, {self.reused} reused, {len(self.failed)} failed."
+
+
+def find_missing_renditions(specs, report, chunk_size=200, specs_for=None, cases=None):
+    """Return {image_id: [spec, ...]} for case asset images lacking any of ``specs``.
+
+    With ``specs_for`` each image is checked against ``specs_for(image)``, which
+    must be drawn from ``specs``. With ``cases`` (a case queryset) only their
+    assets' images are checked.
+    """
+    assets = CaseAsset.objects.filter(image__isnull=False)
+    if cases is not None:
+        assets = assets.filter(case_study__in=cases.values("pk"))
+    images = (
+        get_image_model()
+        .objects.filter(pk__in=assets.values("image_id"))
+        .prefetch_related(renditions_prefetch(specs))
+        .order_by("pk")
+    )
+    missing = {}
+    for image in images.iterator(chunk_size=chunk_size):
+        wanted = specs_for(image) if specs_for else specs
+        found = existing_renditions(image, wanted)
+        report.reused += len(found)
+        absent = [spec for spec in wanted if spec not in found]
+        if absent:
+            missing[image.pk] = absent
+    return missing
+
+
+def _refresh_pages(image_ids):
+    """Drop the cached pages showing these images, which may have been rendered without their renditions."""
+    cases = CaseStudy.objects.filter(assets__image_id__in=list(image_ids)).distinct()
+    caching.invalidate_cases(cases.values_list("slug", flat=True))
+
+
+def _init_worker():
+    django.setup()
+
+
+def _generate_for_image(image_id, specs=None):
+    image = get_image_model().objects.get(pk=image_id)
+    if specs is None:
+        specs = warm_specs(image)
+    generated = 0
+    failed = []
+    for spec in specs:
+        try:
+            image.get_rendition(spec)
+            generated += 1
+        except Exception as exc:
+            failed.append((image_id, spec, f"{type(exc).__name__}: {exc}"))
+    return generated, failed
+
+
+def generate_renditions(missing, report, workers=1):
+    """Generate ``missing`` renditions, decoding originals on up to ``workers`` processes."""
+    if not missing:
+        return report
+    if workers <= 1:
+        for image_id, specs in missing.items():
+            generated, failed = _generate_for_image(image_id, specs)
+            report.generated += generated
+            report.failed.extend(failed)
+        _refresh_pages(missing)
+        return report
+
+    # Children must open their own connections rather than inherit the parent's.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=min(workers, len(missing)), initializer=_init_worker) as executor:
+        futures = [executor.submit(_generate_for_image, image_id, specs) for image_id, specs in missing.items()]
+        for future in as_completed(futures):
+            generated, failed = future.result()
+            report.generated += generated
+            report.failed.extend(failed)
+    _refresh_pages(missing)
+    return report
+
+
+def _warm_in_background(image_id, specs):
+    try:
+        _, failed = _generate_for_image(image_id, specs)
+        for _, spec, error in failed:
+            logger.warning("Rendition %s failed for image %s: %s", spec, image_id, error)
+        _refresh_pages([image_id])
+    except Exception:
+        logger.exception("Could not warm renditions for image %s", image_id)
+    finally:
+        with _queued_lock:
+            _queued.discard((image_id, specs))
+        # Pool threads keep their own connections; don't leave them open between jobs.
+        connections.close_all()
+
+
+def warm_image(image_id, specs=None):
+    """Generate ``specs`` (default: ``warm_specs``) for one image off the request path, on ``CASEBOOK_RENDITION_WORKERS`` threads.
+
+    With the setting at 0 the renditions are generated inline. A request already
+    queued is not queued again.
+    """
+    global _background_pool
+    if settings.CASEBOOK_RENDITION_WORKERS <= 0:
+        result = _generate_for_image(image_id, specs)
+        _refresh_pages([image_id])
+        return result
+    specs = tuple(specs) if specs is not None else None
+    with _queued_lock:
+        # Pages rendered before the renditions exist ask for them again; queue each request once.
+        if (image_id, specs) in _queued:
+            return None
+        _queued.add((image_id, specs))
+    if _background_pool is None:
+        _background_pool = ThreadPoolExecutor(
+            max_workers=settings.CASEBOOK_RENDITION_WORKERS, thread_name_prefix="casebook-renditions"
+        )
+    return _background_pool.submit(_warm_in_background, image_id, specs)
@@ -0,0 +1,166 @@
+"""Read/write routing between ``default`` and a read replica.
+
+When ``CASEBOOK_REPLICA_DATABASE`` names a configured database, GET requests to
+the public read-only views (index, detail, search, analytics and the JSON API)
+and ``export_casebook`` read from it. Everything else, and every write, uses
+``default``. Once a request or command has written, its later reads go to
+``default`` as well. The response then sets a cookie that keeps the visitor on
+``default`` for ``CASEBOOK_REPLICA_PIN_SECONDS``, so the page an edit redirects
+to shows the edit before the replica has caught up.
+
+``sync`` copies ``default`` into an SQLite replica with the online backup API;
+``sync_replica`` runs it once or on an interval. It retires pages cached from
+the replica through the ``casebook`` cache, so with a replica configured that
+cache must be shared between processes; ``check_shared_cache`` enforces it.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import caching
+
+PIN_COOKIE = "casebook_primary"
+# Page cache scope replaced after every sync, so pages rendered from the replica are re-read.
+CACHE_SCOPE = "replica"
+# Users and sessions are read where they are written, so signing in takes effect at once.
+PRIMARY_APPS = {"auth", "sessions"}
+
+
+class _State:
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self, replica=False):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar("casebook_replica_state", default=None)
+
+
+def replica_alias():
+    """The configured replica alias, or ``None`` when there is none."""
+    alias = getattr(settings, "CASEBOOK_REPLICA_DATABASE", None)
+    return alias if alias and alias != DEFAULT_DB_ALIAS and alias in connections.settings else None
+
+
+def read_alias():
+    """The alias reads of casebook content use in the current request or command."""
+    state = _state.get()
+    alias = replica_alias()
+    if state is None or not state.replica or state.wrote or alias is None:
+        return DEFAULT_DB_ALIAS
+    # A transaction on default may be about to write what it reads.
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def routing(replica=False):
+    """Track writes, and read from the replica when ``replica`` is true, until the block exits."""
+    token = _state.set(_State(replica))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def pin():
+    """Send the rest of the current request or command to ``default``, as after a write."""
+    state = _state.get()
+    if state is not None:
+        state.wrote = True
+
+
+def replica_reads(view):
+    """Let a read-only view read from the replica, unless the visitor is pinned to ``default``."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is not None and request.method in ("GET", "HEAD") and not request.COOKIES.get(PIN_COOKIE):
+            state.replica = True
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaMiddleware:
+    """Give each request its routing state and pin visitors whose request wrote.
+
+    Sits above the session middleware so a session saved on the way out counts as a write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routing() as state:
+            response = self.get_response(request)
+        if state.wrote and replica_alias():
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=settings.CASEBOOK_REPLICA_PIN_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Objects read from the replica are the same rows as on default.
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema with the data, from sync.
+        if db == replica_alias():
+            return False
+        return None
+
+
+def sync(alias=None):
+    """Copy ``default`` into the SQLite replica ``alias`` (default: the configured one); return the pages copied."""
+    alias = alias or replica_alias()
+    if alias is None:
+        raise ImproperlyConfigured("CASEBOOK_REPLICA_DATABASE does not name a database in DATABASES.")
+    source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+    if source.vendor != "sqlite" or target.vendor != "sqlite":
+        raise ImproperlyConfigured("Only SQLite replicas can be synced; use the database's own replication.")
+    source.ensure_connection()
+    target.ensure_connection()
+    pages = []
+    # One step: readers of the replica see either the previous copy or this one, never a mix.
+    source.connection.backup(target.connection, progress=lambda status, remaining, total: pages.append(total))
+    caching.invalidate(CACHE_SCOPE)
+    return pages[-1] if pages else 0
+
+
+def check_shared_cache(app_configs=None, **kwargs):
+    """System check: a replica needs a page cache that ``sync_replica``'s process shares with the web workers."""
+    if replica_alias() is None or not isinstance(caching.page_cache(), LocMemCache):
+        return []
+    return [
+        checks.Error(
+            f"CASEBOOK_CACHE ({settings.CASEBOOK_CACHE!r}) is a local-memory cache, so web workers never see "
+            "sync_replica's invalidations and keep serving pages read from the replica before it caught up.",
+            hint="Point CASEBOOK_CACHE at a FileBasedCache or a shared cache server, or remove the replica.",
+            id="casebook.E001",
+        )
+    ]
@@ -0,0 +1,209 @@
+"""SQLite FTS5 full-text index over case studies.
+
+The ``casebook_casestudy_fts`` virtual table mirrors the searchable text of each
+case (keyed by ``rowid = casestudy.id``) and is kept in sync by the signal
+handlers in ``casebook.signals``. On databases without FTS5 the index view
+falls back to ``icontains`` filtering.
+"""
+
+import re
+
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .pagination import KeysetPage, decode_values, encode_values
+
+FTS_TABLE = "casebook_casestudy_fts"
+# Column name -> bm25 weight. organization, sector and tags hold related names.
+FTS_COLUMNS = {
+    "title": 10.0,
+    "organization": 5.0,
+    "sector": 3.0,
+    "brand_or_campaign": 5.0,
+    "tags": 4.0,
+    "one_liner": 3.0,
+    "objective": 1.0,
+    "audience": 1.0,
+    "constraints": 1.0,
+    "strategy": 1.0,
+    "creative_direction": 1.0,
+    "production_and_tooling": 1.0,
+    "delivery_and_distribution": 1.0,
+    "my_contribution": 1.0,
+    "team_and_partners": 1.0,
+    "results_summary": 1.0,
+    "what_worked": 1.0,
+    "what_id_do_differently": 1.0,
+}
+CREATE_FTS_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(FTS_COLUMNS)}, tokenize='porter unicode61 remove_diacritics 2')"
+)
+TOKEN = re.compile(r"\w+", re.UNICODE)
+# Control characters cannot appear in form input, so they safely delimit matches in snippets.
+MARK_OPEN, MARK_CLOSE = "\x02", "\x03"
+
+_available = None
+
+
+def fts_available():
+    global _available
+    if _available is None:
+        _available = connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def _row(case):
+    related = {
+        "organization": case.organization.name if case.organization else "",
+        "sector": case.sector.name if case.sector else "",
+        "tags": " ".join(tag.name for tag in case.tags.all()),
+    }
+    return [case.pk, *(related[field] if field in related else getattr(case, field) for field in FTS_COLUMNS)]
+
+
+def index_cases(queryset):
+    """(Re)index every case in ``queryset``."""
+    if not fts_available():
+        return 0
+    cases = queryset.select_related("organization", "sector").prefetch_related("tags")
+    rows = [_row(case) for case in cases]
+    if not rows:
+        return 0
+    placeholders = ", ".join(["%s"] * (len(FTS_COLUMNS) + 1))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(rows))})",
+            [row[0] for row in rows],
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})",
+            rows,
+        )
+    return len(rows)
+
+
+def remove_case(pk):
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+def rebuild_index(batch_size=500):
+    from .models import CaseStudy
+
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    pks = list(CaseStudy.objects.order_by("pk").values_list("pk", flat=True))
+    indexed = 0
+    for offset in range(0, len(pks), batch_size):
+        indexed += index_cases(CaseStudy.objects.filter(pk__in=pks[offset : offset + batch_size]))
+    return indexed
+
+
+def match_expression(query):
+    """Turn free text into a safe FTS5 expression: every word must match, the last as a prefix."""
+    tokens = TOKEN.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def match_filter(query):
+    """Q restricting cases to every FTS match for ``query``, unranked and uncapped."""
+    expression = match_expression(query)
+    if expression is None:
+        return Q(pk__in=[])
+    return Q(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]))
+
+
+def filter_cases(queryset, query):
+    """Narrow ``queryset`` to cases matching ``query``, with ``icontains`` on the main fields when FTS5 is missing."""
+    if not query:
+        return queryset
+    if fts_available():
+        return queryset.filter(match_filter(query))
+    return queryset.filter(
+        Q(title__icontains=query)
+        | Q(organization__name__icontains=query)
+        | Q(sector__name__icontains=query)
+        | Q(brand_or_campaign__icontains=query)
+        | Q(one_liner__icontains=query)
+    )
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(MARK_OPEN, "<mark>").replace(MARK_CLOSE, "</mark>"))
+
+
+def _search_cursor(token):
+    values = decode_values(token, 2) if token else None
+    if values is None:
+        return None
+    try:
+        return float(values[0]), int(values[1])
+    except (TypeError, ValueError):
+        return None
+
+
+def search_cases(query, queryset, page_size, after=None, before=None):
+    """Return a ``KeysetPage`` of ``(pk, snippet_html)`` for cases in ``queryset`` matching ``query``, best match first.
+
+    Hits are ordered by bm25 score then id, and the ``after``/``before`` cursors
+    hold the score and id of the last/first hit shown, so every hit is reachable
+    page by page like the unsearched index.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return KeysetPage([])
+    forward, cursor = True, _search_cursor(after)
+    if before and (previous := _search_cursor(before)) is not None:
+        forward, cursor = False, previous
+
+    scope_sql, scope_params = queryset.order_by().values("pk").query.sql_with_params()
+    weights = ", ".join(str(weight) for weight in FTS_COLUMNS.values())
+    beyond, beyond_params = "", []
+    if cursor is not None:
+        op = ">" if forward else "<"
+        beyond = f"WHERE score {op} %s OR (score = %s AND pk {op} %s)"
+        beyond_params = [cursor[0], cursor[0], cursor[1]]
+    direction = "ASC" if forward else "DESC"
+    ranked_sql = (
+        f"SELECT pk, score FROM (SELECT rowid AS pk, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({scope_sql})) {beyond} "
+        f"ORDER BY score {direction}, pk {direction} LIMIT %s"
+    )
+    try:
+        # The connection the queryset reads from, which is the replica inside replica_reads views.
+        with transaction.atomic(using=queryset.db), connections[queryset.db].cursor() as db:
+            db.execute(ranked_sql, [expression, *scope_params, *beyond_params, page_size + 1])
+            rows = db.fetchall()
+            hits = rows[:page_size] if forward else rows[:page_size][::-1]
+            snippets = {}
+            if hits:
+                # Snippets only for the page shown, not every match.
+                db.execute(
+                    f"SELECT rowid, snippet({FTS_TABLE}, -1, %s, %s, '…', 16) FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({', '.join(['%s'] * len(hits))})",
+                    [MARK_OPEN, MARK_CLOSE, expression, *(pk for pk, _ in hits)],
+                )
+                snippets = dict(db.fetchall())
+    except OperationalError:
+        return KeysetPage([])
+
+    if not hits:
+        return KeysetPage([])
+    more = len(rows) > page_size
+    has_next, has_previous = (more, cursor is not None) if forward else (True, more)
+    return KeysetPage(
+        [(pk, _highlight(snippets.get(pk, ""))) for pk, _ in hits],
+        next_cursor=encode_values([hits[-1][1], hits[-1][0]]) if has_next else None,
+        previous_cursor=encode_values([hits[0][1], hits[0][0]]) if has_previous else None,
+    )
@@ -0,0 +1,216 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from taggit.models import Tag
+
+from . import analytics, caching, placeholders, renditions, search, spend
+from .models import (
+    CaseAsset,
+    CaseChannelSpend,
+    CaseCountSummary,
+    CaseMetric,
+    CaseStudy,
+    CaseStudyTag,
+    CaseStudyTombstone,
+    FxRate,
+    Industry,
+    Organization,
+)
+
+
+_tracking_suspended = ContextVar("casebook_tracking_suspended", default=False)
+
+
+@contextmanager
+def suspend_tracking():
+    """Skip the per-row touch and reindex handlers for child rows; the caller refreshes the cases itself."""
+    token = _tracking_suspended.set(True)
+    try:
+        yield
+    finally:
+        _tracking_suspended.reset(token)
+
+
+def touch_sectors(**filters):
+    """Bump ``peers_updated_at`` on matching sectors, so detail pages of their cases revalidate."""
+    Industry.objects.filter(**filters).update(peers_updated_at=timezone.now())
+
+
+def touch_cases(index=True, **filters):
+    """Bump ``updated_at`` on matching cases so delta exports pick them up, and drop their cached pages."""
+    cases = CaseStudy.objects.filter(**filters)
+    caching.invalidate_cases(cases.values_list("slug", flat=True), index=index)
+    touch_sectors(pk__in=cases.values("sector_id"))
+    cases.update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=CaseAsset)
+@receiver([post_save, post_delete], sender=CaseMetric)
+@receiver([post_save, post_delete], sender=CaseChannelSpend)
+def touch_case_for_child(sender, instance, **kwargs):
+    if _tracking_suspended.get():
+        return
+    # Hero assets appear as index thumbnails.
+    touch_cases(index=sender is CaseAsset, pk=instance.case_study_id)
+
+
+@receiver([post_save, post_delete], sender=CaseChannelSpend)
+def refresh_spend_summary(sender, instance, **kwargs):
+    if _tracking_suspended.get():
+        return
+    keys = analytics.case_keys(CaseStudy.objects.filter(pk=instance.case_study_id))
+    analytics.refresh_spend({(sector, year) for sector, _, year in keys})
+
+
+@receiver(pre_save, sender=CaseAsset)
+def compute_asset_placeholder(sender, instance, **kwargs):
+    if not instance.image_id:
+        instance.placeholder_color = instance.placeholder_data_uri = ""
+        return
+    if instance.placeholder_color and instance.pk is not None:
+        previous_image = CaseAsset.objects.filter(pk=instance.pk).values_list("image_id", flat=True).first()
+        if previous_image == instance.image_id:
+            return
+    placeholders.assign_placeholder(instance)
+
+
+@receiver(post_save, sender=CaseAsset)
+def warm_asset_renditions(sender, instance, **kwargs):
+    if instance.image_id and settings.CASEBOOK_WARM_RENDITIONS_ON_SAVE:
+        transaction.on_commit(partial(renditions.warm_image, instance.image_id))
+
+
+@receiver([post_save, post_delete], sender=CaseStudyTag)
+def touch_case_for_tagged_item(sender, instance, **kwargs):
+    if _tracking_suspended.get():
+        return
+    touch_cases(pk=instance.content_object_id)
+    search.index_cases(CaseStudy.objects.filter(pk=instance.content_object_id))
+    analytics.refresh_counts(CaseCountSummary.DIMENSION_TAG, [instance.tag_id])
+
+
+@receiver(post_save, sender=Tag)
+def touch_cases_for_tag(sender, instance, created, **kwargs):
+    if not created:
+        touch_cases(tags=instance)
+        search.index_cases(CaseStudy.objects.filter(tags=instance))
+        analytics.refresh_counts(CaseCountSummary.DIMENSION_TAG, [instance.pk])
+
+
+@receiver(post_save, sender=Organization)
+@receiver(pre_delete, sender=Organization)
+def touch_cases_for_organization(sender, instance, signal, **kwargs):
+    touch_cases(organization=instance)
+    if signal is post_save:
+        search.index_cases(CaseStudy.objects.filter(organization=instance))
+        analytics.refresh_counts(CaseCountSummary.DIMENSION_ORGANIZATION, [instance.pk])
+
+
+@receiver(post_delete, sender=Organization)
+def recount_cases_for_organization(sender, instance, **kwargs):
+    analytics.refresh_counts(CaseCountSummary.DIMENSION_ORGANIZATION, [instance.pk, None])
+
+
+@receiver(post_save, sender=Industry)
+@receiver(pre_delete, sender=Industry)
+def touch_cases_for_sector(sender, instance, signal, **kwargs):
+    touch_cases(sector=instance)
+    if signal is post_save:
+        search.index_cases(CaseStudy.objects.filter(sector=instance))
+        analytics.refresh_counts(CaseCountSummary.DIMENSION_SECTOR, [instance.pk])
+
+
+@receiver(post_delete, sender=Industry)
+def refresh_summaries_for_sector(sender, instance, **kwargs):
+    # The sector's cases now have none; its own spend summaries went with it.
+    keys = analytics.case_keys(CaseStudy.objects.filter(sector=None))
+    analytics.refresh_spend({(sector, year) for sector, _, year in keys})
+    analytics.refresh_counts(CaseCountSummary.DIMENSION_SECTOR, [instance.pk, None])
+
+
+@receiver(pre_save, sender=CaseStudy)
+def tombstone_renamed_slug(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    previous_slug = CaseStudy.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+    if previous_slug and previous_slug != instance.slug:
+        caching.invalidate_cases([previous_slug], index=False)
+        CaseStudyTombstone.objects.update_or_create(slug=previous_slug, defaults={"deleted_at": timezone.now()})
+
+
+@receiver(pre_save, sender=CaseStudy)
+@receiver(pre_delete, sender=CaseStudy)
+def remember_summary_keys(sender, instance, signal, **kwargs):
+    if _tracking_suspended.get():
+        return
+    if instance.pk is None:
+        instance._summary_keys = set()
+        return
+    instance._summary_keys = analytics.case_keys(CaseStudy.objects.filter(pk=instance.pk))
+    if signal is pre_delete:
+        tags = CaseStudyTag.objects.filter(content_object_id=instance.pk)
+        instance._summary_tags = list(tags.values_list("tag_id", flat=True))
+
+
+@receiver(post_save, sender=CaseStudy)
+@receiver(post_delete, sender=CaseStudy)
+def refresh_summaries_for_case(sender, instance, signal, **kwargs):
+    if _tracking_suspended.get():
+        return
+    previous = getattr(instance, "_summary_keys", set())
+    if signal is post_delete:
+        analytics.refresh_cases(previous, getattr(instance, "_summary_tags", []))
+        return
+    current = {(instance.sector_id, instance.organization_id, instance.sort_end.year if instance.sort_end else None)}
+    if current != previous:
+        analytics.refresh_cases(previous | current)
+
+
+@receiver(pre_save, sender=CaseStudy)
+def remember_sector(sender, instance, **kwargs):
+    instance._previous_sector_id = None
+    if instance.pk is not None:
+        previous = CaseStudy.objects.filter(pk=instance.pk).values_list("sector_id", flat=True)
+        instance._previous_sector_id = previous.first()
+
+
+@receiver([post_save, post_delete], sender=CaseStudy)
+def touch_sectors_for_case(sender, instance, **kwargs):
+    sectors = {instance.sector_id, getattr(instance, "_previous_sector_id", None)} - {None}
+    if sectors:
+        touch_sectors(pk__in=sectors)
+
+
+@receiver(post_save, sender=CaseStudy)
+def clear_reused_slug(sender, instance, **kwargs):
+    CaseStudyTombstone.objects.filter(slug=instance.slug).delete()
+
+
+@receiver(post_save, sender=CaseStudy)
+def index_case(sender, instance, **kwargs):
+    search.index_cases(CaseStudy.objects.filter(pk=instance.pk))
+
+
+@receiver([post_save, post_delete], sender=CaseStudy)
+def drop_cached_pages(sender, instance, **kwargs):
+    caching.invalidate_cases([instance.slug])
+
+
+@receiver(post_delete, sender=CaseStudy)
+def tombstone_deleted_case(sender, instance, **kwargs):
+    if instance.slug:
+        CaseStudyTombstone.objects.update_or_create(slug=instance.slug, defaults={"deleted_at": timezone.now()})
+    search.remove_case(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=FxRate)
+def renormalize_spend(sender, instance, **kwargs):
+    if _tracking_suspended.get():
+        return
+    spend.renormalize()
@@ -0,0 +1,51 @@
+"""Allocate unique slugs with a fixed number of queries.
+
+A base slug's family is the base itself plus every ``<base>-<n>`` suffix. The
+family is read with one indexed range scan over the ``<base>-`` prefix and the
+lowest free suffix is picked in memory, so the number of queries does not grow
+with the number of collisions. Allocation does not reserve anything:
+callers insert inside a savepoint and retry on ``IntegrityError`` when a
+concurrent writer wins the race.
+"""
+
+from django.db.models import Q
+
+# "." sorts directly after "-", so [base + "-", base + ".") is exactly the "base-" prefix.
+_PREFIX_END = chr(ord("-") + 1)
+
+
+def _family(base_slug):
+    return Q(slug=base_slug) | Q(slug__gt=f"{base_slug}-", slug__lt=f"{base_slug}{_PREFIX_END}")
+
+
+def allocate_slugs(queryset, base_slugs, chunk_size=200):
+    """Return a free slug for each of ``base_slugs``, unique within ``queryset`` and the batch.
+
+    Issues one query per ``chunk_size`` distinct bases; pass ``queryset`` with the
+    object being saved excluded so it can keep its own slug.
+    """
+    distinct = list(dict.fromkeys(base_slugs))
+    taken = set()
+    for start in range(0, len(distinct), chunk_size):
+        family = Q()
+        for base_slug in distinct[start : start + chunk_size]:
+            family |= _family(base_slug)
+        taken.update(queryset.filter(family).values_list("slug", flat=True))
+
+    next_suffix = {}
+    allocated = []
+    for base_slug in base_slugs:
+        candidate = base_slug
+        if candidate in taken:
+            suffix = next_suffix.get(base_slug, 2)
+            while f"{base_slug}-{suffix}" in taken:
+                suffix += 1
+            candidate = f"{base_slug}-{suffix}"
+            next_suffix[base_slug] = suffix + 1
+        taken.add(candidate)
+        allocated.append(candidate)
+    return allocated
+
+
+def allocate_slug(queryset, base_slug):
+    return allocate_slugs(queryset, [base_slug])[0]
@@ -0,0 +1,86 @@
+"""Spend totals in the base currency, aggregated in the database.
+
+The ``*_base`` columns hold each amount converted at the latest FX rate (see
+``fx``), so totals and means by channel, sector, organization or year are a
+single grouped query over indexed columns however many cases there are.
+"""
+
+from django.db import transaction
+from django.db.models import Avg, Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Round
+
+from . import analytics
+from .models import CaseChannelSpend, CaseStudy, FxRate
+
+CHANNEL_GROUP_FIELDS = {
+    "channel": "channel",
+    "sector": "case_study__sector__name",
+    "organization": "case_study__organization__name",
+    "year": "case_study__sort_end__year",
+}
+CASE_GROUP_FIELDS = {
+    "sector": "sector__name",
+    "organization": "organization__name",
+    "year": "sort_end__year",
+}
+CASE_SPEND_FIELDS = {"spend_amount_min_base": "spend_amount_min", "spend_amount_max_base": "spend_amount_max"}
+CHANNEL_SPEND_FIELDS = {"spend_amount_base": "spend_amount"}
+
+
+def normalize_queryset(queryset, fields, rates):
+    """Rewrite the ``{base_field: amount_field}`` columns of ``queryset`` with one UPDATE per currency."""
+    queryset.exclude(spend_currency__in=list(rates)).update(**{target: None for target in fields})
+    for currency, rate in rates.items():
+        rate = Value(rate, output_field=DecimalField(max_digits=18, decimal_places=8))
+        queryset.filter(spend_currency=currency).update(
+            **{target: Round(F(source) * rate, 2) for target, source in fields.items()}
+        )
+
+
+def renormalize(rates=None):
+    """Convert every stored spend amount at the latest rates; run after the rate table changes."""
+    rates = FxRate.latest_rates() if rates is None else rates
+    with transaction.atomic():
+        normalize_queryset(CaseStudy.objects.all(), CASE_SPEND_FIELDS, rates)
+        normalize_queryset(CaseChannelSpend.objects.all(), CHANNEL_SPEND_FIELDS, rates)
+        analytics.refresh_spend()
+    return rates
+
+
+def channel_spend_totals(by="channel", **filters):
+    """Return ``group``, ``total``, ``mean``, ``rows`` and ``unconverted`` per group of channel spend rows.
+
+    ``unconverted`` counts amounts left out because their currency has no rate.
+    """
+    return (
+        CaseChannelSpend.objects.filter(**filters)
+        .values(group=F(CHANNEL_GROUP_FIELDS[by]))
+        .annotate(
+            total=Sum("spend_amount_base"),
+            mean=Avg("spend_amount_base"),
+            rows=Count("spend_amount_base"),
+            unconverted=Count("pk", filter=Q(spend_amount_base__isnull=True, spend_amount__isnull=False)),
+        )
+        .order_by(F("total").desc(nulls_last=True), "group")
+    )
+
+
+def case_spend_totals(by="sector", **filters):
+    """Return the summed and mean case spend estimates (min and max) per group of cases."""
+    return (
+        CaseStudy.objects.filter(**filters)
+        .values(group=F(CASE_GROUP_FIELDS[by]))
+        .annotate(
+            total_min=Sum("spend_amount_min_base"),
+            total_max=Sum("spend_amount_max_base"),
+            mean_min=Avg("spend_amount_min_base"),
+            mean_max=Avg("spend_amount_max_base"),
+            rows=Count("pk", filter=Q(spend_amount_min_base__isnull=False) | Q(spend_amount_max_base__isnull=False)),
+            unconverted=Count(
+                "pk",
+                filter=Q(spend_amount_min_base__isnull=True, spend_amount_max_base__isnull=True)
+                & (Q(spend_amount_min__isnull=False) | Q(spend_amount_max__isnull=False)),
+            ),
+        )
+        .order_by(F("total_max").desc(nulls_last=True), "group")
+    )
@@ -0,0 +1,107 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from wagtail.images.models import Picture
+
+from casebook.placeholders import placeholder_style
+from casebook.renditions import THUMBNAIL_SIZES as THUMBNAIL_CROPS
+from casebook.renditions import existing_renditions, responsive_specs, thumbnail_specs, warm_image
+
+register = template.Library()
+
+# The asset gallery spans the max-desktop container (960px less the box and card padding).
+GALLERY_SIZES = "(min-width: 1024px) 880px, calc(100vw - 5rem)"
+THUMBNAIL_SIZES = "96px"
+
+
+def _picture(image, specs=responsive_specs):
+    """A ``Picture`` of the stored renditions of ``image``, or ``None`` while it has none.
+
+    Renditions are never generated during a render: missing ones are handed to
+    ``warm_image`` and show up on a later request.
+    """
+    wanted = specs(image)
+    found = existing_renditions(image, wanted)
+    missing = [spec for spec in wanted if spec not in found]
+    if missing:
+        warm_image(image.pk, missing)
+    # In spec order: the first rendition becomes the <img> fallback.
+    renditions = {spec: found[spec] for spec in wanted if spec in found}
+    return Picture(renditions) if renditions else None
+
+
+def _original(image, attrs, width=None, height=None):
+    """An ``<img>`` of the original file, for images whose renditions are still being generated."""
+    return format_html(
+        '<img src="{}" width="{}" height="{}"{}>',
+        image.file.url,
+        width or image.width,
+        height or image.height,
+        flatatt(attrs),
+    )
+
+
+def _placeholder_attrs(color, placeholder):
+    style = placeholder_style(color, placeholder)
+    return {"style": style} if style else {}
+
+
+@register.simple_tag
+def responsive_image(image, alt="", hero=False, sizes=GALLERY_SIZES, color="", placeholder=""):
+    """Render ``image`` as a ``<picture>`` with modern-format sources, a srcset and explicit dimensions.
+
+    Non-hero images load lazily; the hero loads eagerly at high priority. ``color`` and
+    ``placeholder`` (an asset's precomputed placeholder) are painted behind the image until it loads.
+    """
+    if not image:
+        return ""
+    attrs = {"alt": alt, "sizes": sizes, "decoding": "async"}
+    if hero:
+        attrs["fetchpriority"] = "high"
+    else:
+        attrs["loading"] = "lazy"
+    attrs.update(_placeholder_attrs(color, placeholder))
+    picture = _picture(image)
+    if picture is None:
+        del attrs["sizes"]
+        return _original(image, attrs)
+    picture.attrs = attrs
+    return picture.__html__()
+
+
+@register.simple_tag
+def thumbnail_image(image, alt="", color="", placeholder=""):
+    """Render a lazily loaded 96x54 crop of ``image`` for the index, over its placeholder."""
+    if not image:
+        return ""
+    attrs = {"alt": alt, "loading": "lazy", "decoding": "async", **_placeholder_attrs(color, placeholder)}
+    picture = _picture(image, thumbnail_specs)
+    if picture is None:
+        # Cropped to the thumbnail box like the renditions.
+        style = f"object-fit: cover; {attrs.get('style', '')}".strip()
+        return _original(image, {**attrs, "style": style}, *THUMBNAIL_CROPS[0])
+    picture.attrs = {**attrs, "sizes": THUMBNAIL_SIZES}
+    return picture.__html__()
+
+
+@register.simple_tag
+def preload_image(image, sizes=GALLERY_SIZES):
+    """``<link rel="preload">`` for the preferred format of a ``responsive_image``, for the document head."""
+    if not image:
+        return ""
+    picture = _picture(image)
+    if picture is None:
+        return format_html('<link rel="preload" as="image" href="{}">', image.file.url)
+    for image_format in picture.source_format_order:
+        if image_format.name in picture.formats:
+            return format_html(
+                '<link rel="preload" as="image" type="{}" imagesrcset="{}" imagesizes="{}">',
+                image_format.mime_type,
+                picture.get_width_srcset(picture.formats[image_format.name]),
+                sizes,
+            )
+    return format_html(
+        '<link rel="preload" as="image" imagesrcset="{}" imagesizes="{}">',
+        picture.get_width_srcset(picture.renditions),
+        sizes,
+    )
@@ -1,3 +1,985 @@
-from django.test import TestCase
+import json
+import pickle
+import tempfile
+from concurrent.futures import Future
+from datetime import date
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.files.images import ImageFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from wagtail.images import get_image_model
+from wagtail.models import Collection
+
+from . import analytics, benchmarks, renditions, replica
+from .caching import CSRF_PLACEHOLDER
+from .dates import parse_date_range
+from .db import sqlite_pragmas
+from .export import FORMATS, read_export
+from .facets import facet_counts
+from .instrumentation import RequestMetricsMiddleware
+from .metrics import parse_metric_value
+from .models import (
+    CaseAsset,
+    CaseChannelSpend,
+    CaseCountSummary,
+    CaseMetric,
+    CaseStudy,
+    FxRate,
+    Industry,
+    Organization,
+    SpendSummary,
+)
+from .packing import iter_unpack
+from .signals import suspend_tracking
+from .slugs import allocate_slugs
+from .spend import case_spend_totals, channel_spend_totals
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix="casebook-tests-")
+
+
+def _create_case(title, **kwargs):
+    case = CaseStudy.objects.create(title=title, **kwargs)
+    CaseMetric.objects.create(case_study=case, metric_name="ROAS", value="3.2")
+    CaseChannelSpend.objects.create(case_study=case, channel="Meta", spend_amount="100.00")
+    case.tags.add("lorem")
+    return case
+
+
+def _create_image(title, size=(320, 180), color=(186, 34, 57)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    image = get_image_model()(
+        title=title,
+        collection=Collection.get_first_root_node(),
+        file=ImageFile(buffer, name=f"{title}.png"),
+    )
+    image.save()
+    return image
+
+
+class DateRangeTests(SimpleTestCase):
+    def test_parses_common_labels(self):
+        cases = {
+            "2024": (date(2024, 1, 1), date(2024, 12, 31)),
+            "January 2024": (date(2024, 1, 1), date(2024, 1, 31)),
+            "Q1 2025": (date(2025, 1, 1), date(2025, 3, 31)),
+            "H2 2023": (date(2023, 7, 1), date(2023, 12, 31)),
+            "2025-03-31": (date(2025, 3, 31), date(2025, 3, 31)),
+            "March 15, 2025": (date(2025, 3, 15), date(2025, 3, 15)),
+            "Jan-Mar 2025": (date(2025, 1, 1), date(2025, 3, 31)),
+            "Nov 2023 - Feb 2024": (date(2023, 11, 1), date(2024, 2, 29)),
+            "Winter 2024": (date(2024, 12, 1), date(2025, 2, 28)),
+            "Late 2024": (date(2024, 1, 1), date(2024, 12, 31)),
+        }
+        for label, expected in cases.items():
+            with self.subTest(label=label):
+                self.assertEqual(parse_date_range(label), expected)
+
+    def test_unparseable_labels(self):
+        for label in [None, "", "ongoing", "0000", "Campaign 0000"]:
+            self.assertIsNone(parse_date_range(label))
+
+
+class SqlitePragmaTests(TestCase):
+    def test_connections_apply_configured_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_settings_override_the_default_pragmas(self):
+        with self.settings(CASEBOOK_SQLITE_PRAGMAS={"busy_timeout": 10000, "journal_mode": None}):
+            pragmas = sqlite_pragmas()
+        self.assertEqual(pragmas["busy_timeout"], 10000)
+        self.assertEqual(pragmas["temp_store"], "MEMORY")
+        self.assertNotIn("journal_mode", pragmas)
+
+    def test_rejects_pragmas_that_are_not_plain_values(self):
+        with self.settings(CASEBOOK_SQLITE_PRAGMAS={"journal_mode": "WAL; DROP TABLE casebook_casestudy"}):
+            with self.assertRaises(ImproperlyConfigured):
+                sqlite_pragmas()
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A second SQLite file standing in for the replica, filled by replica.sync(). It is
+        # added after the test runner set up its databases, so the runner leaves it alone.
+        directory = tempfile.mkdtemp(prefix="casebook-replica-")
+        connections.settings["replica"] = {
+            **connections.settings["default"],
+            "NAME": str(Path(directory) / "replica.sqlite3"),
+        }
+        cls.databases = {"default", "replica"}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+
+    def setUp(self):
+        self.case = _create_case("Replica launch")
+        replica.sync()
+
+    def test_read_only_views_serve_the_replica_until_it_is_synced(self):
+        url = reverse("casebook_detail", args=[self.case.slug])
+        self.case.title = "Edited launch"
+        self.case.save()
+        self.assertContains(self.client.get(url), "Replica launch")
+        self.assertContains(self.client.get(reverse("casebook_index")), "Replica launch")
+
+        search = {"q": "edited"}
+        self.assertEqual(list(self.client.get(reverse("casebook_index"), search).context["cases"]), [])
+
+        replica.sync()
+        self.assertContains(self.client.get(url), "Edited launch")
+        self.assertEqual(list(self.client.get(reverse("casebook_index"), search).context["cases"]), [self.case])
+
+    def test_replica_requires_a_shared_page_cache(self):
+        self.assertEqual([error.id for error in replica.check_shared_cache()], ["casebook.E001"])
+        shared = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tempfile.mkdtemp()}
+        with self.settings(CACHES={**settings.CACHES, "casebook": shared}):
+            self.assertEqual(replica.check_shared_cache(), [])
+
+    def test_writes_keep_the_request_and_the_visitor_on_default(self):
+        with replica.routing(replica=True):
+            self.assertEqual(CaseStudy.objects.all().db, "replica")
+            self.case.save()
+            self.assertEqual(CaseStudy.objects.all().db, "default")
+
+        url = reverse("casebook_detail", args=[self.case.slug])
+        response = self.client.post(reverse("casebook_delete", args=[self.case.slug]))
+        self.assertIn(replica.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # Other visitors read the replica, which has not seen the delete yet.
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(CASEBOOK_REQUEST_METRICS=True, CASEBOOK_DUPLICATE_QUERY_THRESHOLD=3)
+class RequestMetricsTests(TestCase):
+    def test_reports_sql_and_render_times(self):
+        case = _create_case("Metrics launch")
+        with self.assertLogs("casebook.requests", "INFO") as logs:
+            response = self.client.get(reverse("casebook_detail", args=[case.slug]))
+        self.assertRegex(
+            response["Server-Timing"], r'^sql;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record["path"], record["status"]), (f"/casebook/{case.slug}/", 200))
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["template_ms"], 0)
+        self.assertLessEqual(len(record["slowest"]), 5)
+        self.assertEqual(record["duplicates"], [])
+
+    def test_flags_repeated_statements(self):
+        cases = [_create_case(f"Case {idx}") for idx in range(3)]
+
+        def view(request):
+            for case in cases:
+                CaseStudy.objects.filter(pk=case.pk).exists()
+            return HttpResponse()
+
+        with self.assertLogs("casebook.requests", "WARNING") as logs:
+            RequestMetricsMiddleware(view)(RequestFactory().get("/"))
+        duplicates = json.loads(logs.records[0].getMessage())["duplicates"]
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0]["count"], 3)
+
+        with self.settings(CASEBOOK_REQUEST_METRICS=False), self.assertRaises(MiddlewareNotUsed):
+            RequestMetricsMiddleware(view)
+
+
+class ProfileRequestTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.url = reverse("casebook_detail", args=[_create_case("Profiled launch").slug])
+
+    def test_staff_requests_are_profiled_on_request(self):
+        user = get_user_model().objects.create_user("editor", password="unused", is_staff=True)
+        self.client.force_login(user)
+        with self.settings(CASEBOOK_PROFILE_DIR=self.tmp.name), self.assertLogs("casebook.profiling") as logs:
+            response = self.client.get(self.url, {"_profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue((Path(self.tmp.name) / response["X-Casebook-Profile"]).is_file())
+        self.assertIn("cumulative", logs.output[0])
+
+    def test_other_visitors_are_not_profiled(self):
+        with self.settings(CASEBOOK_PROFILE_DIR=self.tmp.name):
+            response = self.client.get(self.url, headers={"X-Casebook-Profile": "1"})
+        self.assertNotIn("X-Casebook-Profile", response)
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+
+    def test_export_command_writes_stats_and_prints_hot_spots(self):
+        stdout = StringIO()
+        with self.settings(CASEBOOK_PROFILE_DIR=self.tmp.name):
+            output = Path(self.tmp.name) / "export.json"
+            call_command("export_casebook", output=str(output), workers=1, profile=True, stdout=stdout)
+        self.assertIn("Ordered by: cumulative time", stdout.getvalue())
+        self.assertEqual(len(list(Path(self.tmp.name).glob("export_casebook-*.pstats"))), 1)
+
+
+class MetricValueTests(SimpleTestCase):
+    def test_parses_common_values(self):
+        cases = {
+            ("ROAS 3.2", "ROAS"): (3.2, ""),
+            ("3.2x", "ROAS"): (3.2, "x"),
+            ("4.5m users", "Reach"): (4_500_000, "users"),
+            ("£1.2k", "Revenue/day"): (1200, "GBP"),
+            ("10-15%", "CTR"): (12.5, "%"),
+            ("1,234 sign-ups", ""): (1234, "sign-ups"),
+            ("n/a", ""): (None, ""),
+        }
+        for (value, name), expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(parse_metric_value(value, name), expected)
+
+
+class MetricBenchmarkTests(TestCase):
+    def setUp(self):
+        sector = Industry.objects.create(name="Consumer Tech")
+        for idx, value in enumerate(["ROAS 1.5", "2x", "ROAS 2.5", "3", "roas 3.2"]):
+            case = CaseStudy.objects.create(title=f"Case {idx}", sector=sector, sort_date="2024")
+            CaseMetric.objects.create(case_study=case, metric_name="ROAS" if idx % 2 else " roas", value=value)
+        CaseMetric.objects.create(case_study=case, metric_name="Reach", value="4.5m users")
+
+    def test_detail_shows_sector_percentile(self):
+        response = self.client.get(reverse("casebook_detail", args=["case-4"]))
+        self.assertContains(response, "88th percentile in Consumer Tech")
+        # A single Reach value is too few to rank against.
+        self.assertContains(response, "4.5m users (n/a, unknown)</li>")
+
+    def test_detail_follows_edits_to_peer_metrics(self):
+        url = reverse("casebook_detail", args=["case-4"])
+        first = self.client.get(url)
+        self.assertContains(first, "88th percentile in Consumer Tech")
+
+        peer = CaseMetric.objects.get(case_study__slug="case-0")
+        peer.value = "ROAS 9"
+        peer.save()
+        response = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertContains(response, "62nd percentile in Consumer Tech")
+
+    def test_detail_follows_cases_leaving_the_sector(self):
+        url = reverse("casebook_detail", args=["case-4"])
+        first = self.client.get(url)
+        peer = CaseStudy.objects.get(slug="case-0")
+        peer.sector = Industry.objects.create(name="Retail")
+        peer.save()
+        response = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, headers={"if-none-match": response["ETag"]}).status_code, 304)
+
+    def test_distributions_match_without_numpy(self):
+        stdout = StringIO()
+        call_command("benchmark_metric", metric="ROAS", by="sector", bins=2, stdout=stdout)
+        with mock.patch.object(benchmarks, "_np", None):
+            fallback = StringIO()
+            call_command("benchmark_metric", metric="ROAS", by="sector", bins=2, stdout=fallback)
+        self.assertEqual(stdout.getvalue(), fallback.getvalue())
+        self.assertIn("Consumer Tech [no unit]: n=4 mean=2.55 min=1.5 p10=1.8 p25=2.25 p50=2.75", stdout.getvalue())
+        self.assertIn("Consumer Tech [x]: n=1", stdout.getvalue())
+
+
+class SpendNormalizationTests(TestCase):
+    def setUp(self):
+        retail = Industry.objects.create(name="Retail")
+        self.case = CaseStudy.objects.create(
+            title="Launch", sector=retail, spend_currency="USD", spend_amount_min="1000", spend_amount_max="2000"
+        )
+        for channel, currency, amount in [("Meta", "GBP", "100"), ("Meta", "USD", "200"), ("Google", "EUR", "50")]:
+            CaseChannelSpend.objects.create(
+                case_study=self.case, channel=channel, spend_currency=currency, spend_amount=amount
+            )
+        CaseChannelSpend.objects.create(case_study=self.case, channel="Google", spend_currency="Other", spend_amount="9")
+
+    def test_import_fx_rates_converts_spend_in_the_database(self):
+        self.assertEqual(CaseStudy.objects.get().spend_amount_max_base, None)
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as handle:
+            handle.write("currency,date,rate\nusd,2026-01-01,0.80\nUSD,2026-06-01,0.75\nEUR,2026-06-01,0.85\n")
+        self.addCleanup(Path(handle.name).unlink)
+        call_command("import_fx_rates", input=handle.name, stdout=StringIO())
+
+        case = CaseStudy.objects.get()
+        self.assertEqual((case.spend_amount_min_base, case.spend_amount_max_base), (750, 1500))
+        with self.assertNumQueries(1):
+            totals = {row["group"]: row for row in channel_spend_totals("channel")}
+        self.assertEqual(totals["Meta"]["total"], 250)
+        self.assertEqual(totals["Meta"]["mean"], 125)
+        self.assertEqual((totals["Google"]["total"], totals["Google"]["unconverted"]), (Decimal("42.50"), 1))
+        (row,) = case_spend_totals("sector")
+        self.assertEqual((row["group"], row["total_min"], row["total_max"]), ("Retail", 750, 1500))
+
+    def test_saving_a_rate_renormalizes_and_new_rows_convert_on_save(self):
+        FxRate.objects.create(currency="EUR", rate_date=date(2026, 6, 1), rate="0.9")
+        spend = CaseChannelSpend.objects.create(case_study=self.case, spend_currency="EUR", spend_amount="10")
+        self.assertEqual(spend.spend_amount_base, 9)
+        self.assertEqual(CaseChannelSpend.objects.get(channel="Google", spend_currency="EUR").spend_amount_base, 45)
+        stdout = StringIO()
+        call_command("spend_report", by="sector", stdout=stdout)
+        self.assertIn("Retail: total 154.00 GBP, mean 51.33 over 3 rows (2 without an FX rate)", stdout.getvalue())
+
+    def test_saving_a_case_with_its_spend_rows_reads_the_rates_once(self):
+        FxRate.objects.create(currency="EUR", rate_date=date(2026, 1, 1), rate="0.8")
+        FxRate.objects.create(currency="EUR", rate_date=date(2026, 6, 1), rate="0.9")
+        self.assertEqual(FxRate.latest_rates()["EUR"], Decimal("0.9"))
+
+        case = CaseStudy(title="Relaunch", spend_currency="EUR", spend_amount_min="100")
+        case.channel_spend = [
+            CaseChannelSpend(channel=channel, spend_currency="EUR", spend_amount="10") for channel in ["Meta", "TikTok"]
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            case.save()
+        self.assertEqual(sum("casebook_fxrate" in query["sql"] for query in queries.captured_queries), 1)
+        self.assertEqual(case.spend_amount_min_base, 90)
+        self.assertEqual([spend.spend_amount_base for spend in case.channel_spend.all()], [9, 9])
+
+
+class AnalyticsSummaryTests(TestCase):
+    def setUp(self):
+        self.retail = Industry.objects.create(name="Retail")
+        self.acme = Organization.objects.create(name="Acme")
+        self.launch = _create_case("Launch", sector=self.retail, organization=self.acme, sort_date="2024")
+        self.relaunch = _create_case("Relaunch", sector=self.retail, sort_date="2025")
+        CaseChannelSpend.objects.create(case_study=self.relaunch, channel="Google", spend_currency="USD", spend_amount="50")
+
+    def _snapshot(self):
+        spend = SpendSummary.objects.values_list("channel", "sector_id", "year", "currency", "rows", "total", "total_base")
+        counts = CaseCountSummary.objects.values_list("dimension", "key", "label", "cases")
+        return sorted(spend), sorted(counts)
+
+    def test_edits_keep_summaries_equal_to_a_rebuild(self):
+        self.launch.sector = Industry.objects.create(name="Travel")
+        self.launch.sort_date = "2023"
+        self.launch.save()
+        self.relaunch.tags.add("awards")
+        self.relaunch.delete()
+        Organization.objects.filter(pk=self.acme.pk).get().delete()
+
+        incremental = self._snapshot()
+        call_command("rebuild_casebook_analytics", stdout=StringIO())
+        self.assertEqual(incremental, self._snapshot())
+        self.assertIn(("Meta", self.launch.sector_id, 2023, "GBP", 1, 100, 100), incremental[0])
+        self.assertIn(("tag", str(self.launch.tags.get().pk), "lorem", 1), incremental[1])
+
+    def test_dashboard_reads_only_summary_tables(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("casebook_analytics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if "casebook_casechannelspend" in query["sql"]])
+        self.assertContains(response, "<th>2025</th>")
+        self.assertContains(response, "no FX rate GBP")
+        self.assertContains(response, 'Retail <span class="tag is-light">2</span>')
+
+        CaseChannelSpend.objects.create(case_study=self.launch, channel="Meta", spend_amount="20")
+        self.assertContains(self.client.get(reverse("casebook_analytics")), "220.00")
+
+
+class CaseApiTests(TestCase):
+    def setUp(self):
+        acme = Organization.objects.create(name="Acme")
+        for year in range(2020, 2025):
+            # Cluster tags are written on save.
+            _create_case(f"Case {year}", organization=acme, sort_date=str(year), notes="private").save()
+
+    def test_sparse_fields_and_cursor_pagination(self):
+        url = reverse("casebook_api_cases")
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"fields": "title,organization", "page_size": 2})
+        data = response.json()
+        self.assertEqual(
+            data["results"],
+            [
+                {"title": "Case 2024", "slug": "case-2024", "organization": "Acme"},
+                {"title": "Case 2023", "slug": "case-2023", "organization": "Acme"},
+            ],
+        )
+        self.assertIsNone(data["previous"])
+        following = self.client.get(data["next"]).json()
+        self.assertEqual([case["slug"] for case in following["results"]], ["case-2022", "case-2021"])
+
+        full = self.client.get(url, {"tag": "LOREM", "year": "2020"}).json()["results"]
+        self.assertEqual(len(full), 1)
+        self.assertEqual(full[0]["metrics"][0]["metric_name"], "ROAS")
+        self.assertNotIn("notes", full[0])
+        self.assertEqual(self.client.get(url, {"fields": "title,secret"}).status_code, 400)
+
+    def test_conditional_requests(self):
+        url = reverse("casebook_api_case", args=["case-2022"])
+        response = self.client.get(url, {"fields": "title,tags"})
+        self.assertEqual(response.json(), {"title": "Case 2022", "slug": "case-2022", "tags": ["lorem"]})
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, {"fields": "title,tags"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        CaseMetric.objects.create(case_study=CaseStudy.objects.get(slug="case-2022"), metric_name="CTR", value="2%")
+        changed = self.client.get(url, {"fields": "title,tags"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(self.client.get(reverse("casebook_api_case", args=["missing"])).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.case = _create_case("Launch", sort_date="2024")
+
+    def _revalidate(self, url, response, **params):
+        return self.client.get(
+            url,
+            params,
+            HTTP_IF_NONE_MATCH=response["ETag"],
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+
+    def test_pages_answer_304_before_rendering(self):
+        for url in [reverse("casebook_index"), reverse("casebook_detail", args=["launch"])]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("no-cache", response["Cache-Control"])
+                with self.assertNumQueries(1):
+                    self.assertEqual(self._revalidate(url, response).status_code, 304)
+
+        response = self.client.get(reverse("casebook_detail", args=["launch"]))
+        CaseMetric.objects.create(case_study=self.case, metric_name="CTR", value="2%")
+        self.assertEqual(self._revalidate(reverse("casebook_detail", args=["launch"]), response).status_code, 200)
+        self.assertEqual(self.client.get(reverse("casebook_detail", args=["missing"])).status_code, 404)
+
+    def test_export_download_is_built_once_per_version(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(CASEBOOK_EXPORT_DOWNLOAD_DIR=directory):
+            url = reverse("casebook_export")
+            response = self.client.get(url, {"format": "ndjson"})
+            self.assertEqual(json.loads(b"".join(response.streaming_content))["slug"], "launch")
+            self.assertIn("casebook_export.ndjson", response["Content-Disposition"])
+            with self.assertNumQueries(1):
+                self.assertEqual(self._revalidate(url, response, format="ndjson").status_code, 304)
+            # A client without validators streams the stored file.
+            with self.assertNumQueries(1):
+                list(self.client.get(url, {"format": "ndjson"}).streaming_content)
+
+            _create_case("Relaunch")
+            updated = self.client.get(url, {"format": "ndjson"})
+            self.assertEqual(len(b"".join(updated.streaming_content).splitlines()), 2)
+            # The previous version stays for downloads that looked it up just before; older ones go.
+            previous = {path.name for path in Path(directory).iterdir()}
+            self.assertEqual(len(previous), 2)
+            _create_case("Encore")
+            list(self.client.get(url, {"format": "ndjson"}).streaming_content)
+            files = {path.name for path in Path(directory).iterdir()}
+            self.assertEqual(len(files), 2)
+            self.assertEqual(len(files & previous), 1)
+            self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 400)
+
+
+class SlugAllocationTests(TestCase):
+    def _create_queries(self, title):
+        with CaptureQueriesContext(connection) as queries:
+            case = CaseStudy.objects.create(title=title)
+        return case, len(queries)
+
+    def test_slug_costs_do_not_grow_with_collisions(self):
+        CaseStudy.objects.create(title="Lorem Ipsum", slug="lorem-ipsum-campaign-launch")
+        case, few = self._create_queries("Lorem Ipsum Campaign")
+        self.assertEqual(case.slug, "lorem-ipsum-campaign")
+        for _ in range(20):
+            case, many = self._create_queries("Lorem Ipsum Campaign")
+        self.assertEqual(case.slug, "lorem-ipsum-campaign-21")
+        self.assertEqual(few, many)
+
+        CaseStudy.objects.filter(slug="lorem-ipsum-campaign-5").delete()
+        self.assertEqual(CaseStudy.objects.create(title="Lorem Ipsum Campaign").slug, "lorem-ipsum-campaign-5")
+
+    def test_lost_race_reallocates_the_slug(self):
+        CaseStudy.objects.create(title="Race")
+        with mock.patch("casebook.models.allocate_slug", side_effect=["race", "race-2"]):
+            self.assertEqual(CaseStudy.objects.create(title="Race").slug, "race-2")
+
+    def test_bulk_allocation_is_unique_within_the_batch(self):
+        CaseStudy.objects.create(title="Lorem")
+        CaseStudy.objects.create(title="Lorem")
+        with self.assertNumQueries(1):
+            slugs = allocate_slugs(CaseStudy.objects.all(), ["lorem", "ipsum", "lorem", "lorem-2", "ipsum"])
+        self.assertEqual(slugs, ["lorem-3", "ipsum", "lorem-4", "lorem-2-2", "ipsum-2"])
+
+
+class CaseOrderingTests(TestCase):
+    def test_cases_sort_chronologically(self):
+        for label in ["March 2025", "2026", "Q1 2024", None, "January 2025"]:
+            CaseStudy.objects.create(title=f"Case {label}", sort_date=label)
+        self.assertEqual(
+            list(CaseStudy.objects.values_list("sort_date", flat=True)),
+            ["2026", "March 2025", "January 2025", "Q1 2024", None],
+        )
+
+    def test_index_pages_with_keyset_cursors(self):
+        for idx, label in enumerate(["2026", "2025", None, "2025", None, "2024", "2026"]):
+            CaseStudy.objects.create(title=f"Case {idx % 3}", sort_date=label)
+        expected = list(CaseStudy.objects.all())
+
+        seen, params = [], {"page_size": 2}
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("casebook_index"), params)
+            self.assertFalse(any("OFFSET" in q["sql"] or "COUNT(*)" in q["sql"] for q in queries.captured_queries))
+            seen.extend(response.context["cases"])
+            if not response.context["next_url"]:
+                break
+            params = QueryDict(response.context["next_url"][1:])
+        self.assertEqual(seen, expected)
+
+        response = self.client.get(reverse("casebook_index"), QueryDict(response.context["previous_url"][1:]))
+        self.assertEqual(list(response.context["cases"]), expected[4:6])
+        self.assertEqual(self.client.get(reverse("casebook_index"), {"after": "garbage"}).status_code, 200)
+
+
+class CasebookSearchTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name="Acme")
+        self.hit = CaseStudy.objects.create(title="Spring launch", strategy="Creator-led <b>TikTok</b> seeding")
+        self.other = CaseStudy.objects.create(title="Retention push", organization=organization)
+
+    def test_search_covers_narrative_fields_with_snippets(self):
+        response = self.client.get(reverse("casebook_index"), {"q": "tikto"})
+        self.assertEqual(list(response.context["cases"]), [self.hit])
+        self.assertContains(response, "&lt;b&gt;<mark>TikTok</mark>&lt;/b&gt;")
+
+    def test_index_follows_related_renames_and_deletes(self):
+        organization = Organization.objects.get(name="Acme")
+        organization.name = "Globex"
+        organization.save()
+        response = self.client.get(reverse("casebook_index"), {"q": "globex"})
+        self.assertEqual(list(response.context["cases"]), [self.other])
+
+        self.other.delete()
+        response = self.client.get(reverse("casebook_index"), {"q": "globex"})
+        self.assertEqual(list(response.context["cases"]), [])
+
+    def test_facet_counts_follow_other_filters_and_edits(self):
+        self.hit.sort_date = "2024"
+        self.hit.tags.add("launch")
+        self.hit.save()
+        self.other.tags.add("launch", "retention")
+        self.other.save()
+
+        response = self.client.get(reverse("casebook_index"), {"tag": "launch"})
+        facets = response.context["facets"]
+        self.assertEqual([(o["label"], o["count"]) for o in facets["organization"]], [("Acme", 1)])
+        self.assertEqual(
+            [(o["label"], o["count"], o["selected"]) for o in facets["tag"]],
+            [("launch", 2, True), ("retention", 1, False)],
+        )
+        self.assertEqual([(o["value"], o["count"]) for o in facets["year"]], [("2024", 1)])
+
+        with self.assertNumQueries(0):
+            facet_counts(CaseStudy.objects.all(), {"tag": "launch"})
+        self.other.sort_date = "2024"
+        self.other.save()
+        response = self.client.get(reverse("casebook_index"), {"tag": "launch"})
+        self.assertEqual([(o["value"], o["count"]) for o in response.context["facets"]["year"]], [("2024", 2)])
+
+    def test_search_results_are_paged(self):
+        for idx in range(5):
+            CaseStudy.objects.create(title=f"Autumn launch {idx}")
+        params = {"q": "launch", "page_size": 2}
+        seen = []
+        while True:
+            response = self.client.get(reverse("casebook_index"), params)
+            seen.extend(response.context["cases"])
+            if not response.context["next_url"]:
+                break
+            params = QueryDict(response.context["next_url"][1:])
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
+        self.assertEqual(seen[-1].title, "Spring launch")
+
+        response = self.client.get(reverse("casebook_index"), QueryDict(response.context["previous_url"][1:]))
+        self.assertEqual(list(response.context["cases"]), seen[2:4])
+
+    def test_search_respects_filters_and_odd_input(self):
+        response = self.client.get(reverse("casebook_index"), {"q": 'launch" OR (', "sector": "999"})
+        self.assertEqual(list(response.context["cases"]), [])
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        self.case = _create_case("Cached case", organization=Organization.objects.create(name="Acme"))
+        self.detail_url = reverse("casebook_detail", args=[self.case.slug])
+
+    def test_detail_is_served_from_cache_until_the_case_changes(self):
+        self.client.get(self.detail_url)
+        # Only the updated_at lookup behind the page's ETag.
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(self.detail_url), "ROAS")
+
+        self.case.metrics.update(metric_name="CPA")
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(self.detail_url), "ROAS")
+        CaseMetric.objects.get(case_study=self.case).save()
+        self.assertContains(self.client.get(self.detail_url), "CPA")
+
+        organization = self.case.organization
+        organization.name = "Globex"
+        organization.save()
+        self.assertContains(self.client.get(self.detail_url), "Globex")
+
+    def test_cached_index_gets_a_fresh_csrf_token(self):
+        self.client.get(reverse("casebook_index"))
+        response = self.client.get(reverse("casebook_index"))
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        self.assertIn("csrftoken", response.cookies)
+
+        self.case.delete()
+        self.assertNotContains(self.client.get(reverse("casebook_index")), "Cached case")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AssetGalleryTests(TestCase):
+    @override_settings(CASEBOOK_RENDITION_WORKERS=0)
+    def test_gallery_serves_responsive_pictures(self):
+        self.addCleanup(cache.clear)
+        case = CaseStudy.objects.create(title="Gallery")
+        CaseAsset.objects.create(case_study=case, image=_create_image("hero", size=(1080, 1920)), is_hero=True)
+        CaseAsset.objects.create(case_study=case, image=_create_image("still"))
+
+        # Nothing is rendered yet: the originals are shown and the renditions are handed to warm_image.
+        with mock.patch("casebook.templatetags.casebook_images.warm_image", wraps=renditions.warm_image) as warm:
+            cold = self.client.get(reverse("casebook_detail", args=[case.slug])).content.decode()
+        self.assertEqual(cold.count("<picture>"), 0)
+        self.assertIn('<link rel="preload" as="image" href="/media/original_images/hero', cold)
+        self.assertIn('height="1920" alt="Gallery" decoding="async" fetchpriority="high"', cold)
+        self.assertEqual(warm.call_count, 3)
+
+        response = self.client.get(reverse("casebook_detail", args=[case.slug]))
+        content = response.content.decode()
+        self.assertEqual(content.count("<picture>"), 2)
+        self.assertEqual(content.count('type="image/avif"'), 3)
+        self.assertIn('<link rel="preload" as="image" type="image/avif"', content)
+        self.assertIn("480w", content)
+        self.assertIn("1080w", content)
+        self.assertEqual(content.count('loading="lazy"'), 1)
+        self.assertEqual(content.count('fetchpriority="high"'), 1)
+        self.assertIn('height="853"', content)
+        self.assertIn('height="180" loading="lazy"', content)
+        self.assertEqual(content.count("background: #ba2239 url(data:image/png;base64,"), 2)
+
+        cold = self.client.get(reverse("casebook_index"))
+        self.assertContains(cold, 'src="/media/original_images/hero.png" width="96" height="54"', count=1)
+        response = self.client.get(reverse("casebook_index"))
+        self.assertContains(response, 'height="54" loading="lazy"', count=1)
+        self.assertContains(response, "data:image/png;base64,", count=1)
+
+    def test_placeholders_follow_the_image_and_are_backfilled(self):
+        case = CaseStudy.objects.create(title="Placeholders")
+        asset = CaseAsset.objects.create(case_study=case, image=_create_image("red"))
+        self.assertEqual(asset.placeholder_color, "#ba2239")
+        self.assertTrue(asset.placeholder_data_uri.startswith("data:image/png;base64,"))
+
+        asset.image = _create_image("blue", color=(20, 60, 200))
+        asset.save()
+        self.assertEqual(asset.placeholder_color, "#143cc8")
+
+        CaseAsset.objects.update(placeholder_color="", placeholder_data_uri="")
+        stdout = StringIO()
+        call_command("backfill_placeholders", stdout=stdout)
+        self.assertIn("Computed 1 placeholders, 0 failed.", stdout.getvalue())
+        asset.refresh_from_db()
+        self.assertEqual(asset.placeholder_color, "#143cc8")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenditionWarmingTests(TestCase):
+    @override_settings(CASEBOOK_RENDITION_WORKERS=0)
+    def test_asset_save_warms_every_rendition_spec(self):
+        # Wagtail caches renditions by image id, and ids are reused once this test rolls back.
+        self.addCleanup(cache.clear)
+        case = _create_case("Warmed launch")
+        with self.captureOnCommitCallbacks(execute=True):
+            CaseAsset.objects.create(case_study=case, image=_create_image("cold"))
+        CaseAsset.objects.create(case_study=case, image=_create_image("unwarmed"))
+
+        stdout = StringIO()
+        call_command("warm_renditions", dry_run=True, stdout=stdout)
+        self.assertIn("width-480|format-avif: 1 missing", stdout.getvalue())
+        self.assertIn("1 images need renditions.", stdout.getvalue())
+        call_command("warm_renditions", workers=1, stdout=stdout)
+        self.assertIn("11 generated, 11 reused, 0 failed", stdout.getvalue())
+
+
+class ExportedCasesMixin:
+    """Five dated cases in one organization and sector, and a temporary directory to export them to."""
+
+    def setUp(self):
+        organization = Organization.objects.create(name="Lorem Org")
+        sector = Industry.objects.create(name="Consumer Tech")
+        for idx in range(5):
+            _create_case(
+                f"Campaign {idx}",
+                organization=organization,
+                sector=sector,
+                sort_date=f"202{idx}",
+                strategy="Line one\nLine two",
+            )
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _export(self, name, **options):
+        output = Path(self.tmp.name) / name
+        # The in-memory test database is not visible to worker processes.
+        options.setdefault("workers", 1)
+        self.stdout = StringIO()
+        call_command("export_casebook", output=str(output), stdout=self.stdout, **options)
+        return output
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportCasebookTests(ExportedCasesMixin, TestCase):
+    def test_streamed_json_matches_indented_dump(self):
+        output = self._export("export.json", chunk_size=2)
+        text = output.read_text(encoding="utf-8")
+        payload = json.loads(text)
+        self.assertEqual(payload["count"], 5)
+        self.assertEqual([case["title"] for case in payload["cases"]][0], "Campaign 4")
+        self.assertEqual(text, json.dumps(payload, indent=2, ensure_ascii=True))
+
+    def test_empty_json_export(self):
+        CaseStudy.objects.all().delete()
+        text = self._export("empty.json").read_text(encoding="utf-8")
+        payload = json.loads(text)
+        self.assertEqual(payload["cases"], [])
+        self.assertEqual(text, json.dumps(payload, indent=2, ensure_ascii=True))
+
+    def test_ndjson_writes_one_case_per_line(self):
+        output = self._export("export.ndjson", format="ndjson", chunk_size=2)
+        lines = output.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])["metrics"][0]["metric_name"], "ROAS")
+
+    def test_query_count_does_not_grow_with_cases(self):
+        for case in CaseStudy.objects.all():
+            CaseAsset.objects.create(case_study=case, image=_create_image(case.slug))
+        self._export("warm.json")
+
+        with CaptureQueriesContext(connection) as small:
+            self._export("small.json")
+        for idx in range(5, 10):
+            case = _create_case(f"Campaign {idx}")
+            CaseAsset.objects.create(case_study=case, image=_create_image(case.slug))
+        self._export("warm.json")
+        with CaptureQueriesContext(connection) as large:
+            output = self._export("large.json")
+
+        self.assertEqual(len(small), len(large))
+        self.assertIn("0 generated, 20 reused, 0 failed", self.stdout.getvalue())
+        asset = json.loads(output.read_text(encoding="utf-8"))["cases"][0]["assets"][0]
+        self.assertTrue(asset["image_urls"]["fill_1600x900"])
+        self.assertEqual(asset["placeholder"]["color"], "#ba2239")
+
+    def test_delta_export_merges_into_full_export(self):
+        full = self._export("full.json")
+        changed = CaseStudy.objects.get(title="Campaign 1")
+        CaseMetric.objects.create(case_study=changed, metric_name="Reach", value="4.5m users")
+        CaseStudy.objects.get(title="Campaign 3").delete()
+        # Same title and dates: only the final tie-break orders them.
+        _create_case("Campaign 9", sort_date="2022")
+        _create_case("Campaign 9", sort_date="2022")
+
+        delta = self._export("delta.json", since=str(full))
+        header = json.loads(delta.read_text(encoding="utf-8"))
+        self.assertEqual(
+            sorted(case["title"] for case in header["cases"]), ["Campaign 1", "Campaign 9", "Campaign 9"]
+        )
+        self.assertEqual(header["deleted"], ["campaign-3"])
+
+        merged = Path(self.tmp.name) / "merged.json"
+        call_command("merge_casebook_export", base=str(full), delta=str(delta), output=str(merged), stdout=StringIO())
+        expected = json.loads(self._export("fresh.json").read_text(encoding="utf-8"))
+        actual = json.loads(merged.read_text(encoding="utf-8"))
+        self.assertEqual(actual["cases"], expected["cases"])
+
+    def test_delta_export_reads_since_from_renamed_and_ndjson_exports(self):
+        full = self._export("full.msgpack", format="msgpack")
+        renamed = full.rename(full.with_name("full.bin"))
+        CaseMetric.objects.create(case_study=CaseStudy.objects.get(title="Campaign 1"), metric_name="Reach", value="1")
+
+        delta = self._export("delta.json", since=str(renamed), since_format="msgpack")
+        self.assertEqual([case["title"] for case in read_export(delta)[1]], ["Campaign 1"])
+
+        ndjson = self._export("full.ndjson", format="ndjson")
+        with self.assertRaisesMessage(CommandError, "has no generated_at header"):
+            self._export("delta.json", since=str(ndjson))
+
+    def test_delta_export_renders_only_its_cases_images(self):
+        self.addCleanup(cache.clear)
+        full = self._export("full.json")
+        CaseAsset.objects.create(case_study=CaseStudy.objects.get(title="Campaign 1"), image=_create_image("changed"))
+        with suspend_tracking():
+            # Leaves the case's updated_at alone, so it stays out of the delta.
+            CaseAsset.objects.create(
+                case_study=CaseStudy.objects.get(title="Campaign 2"), image=_create_image("unchanged")
+            )
+        self._export("delta.json", since=str(full))
+        self.assertIn("Renditions: 2 generated, 0 reused", self.stdout.getvalue())
+
+    def test_sharded_export_writes_manifest_and_skips_unchanged_shards(self):
+        _create_case("Unassigned Campaign", sort_date="2021")
+        output_dir = Path(self.tmp.name) / "shards"
+        call_command(
+            "export_casebook", shard_by="organization", output_dir=str(output_dir), workers=1, stdout=StringIO()
+        )
+        manifest = json.loads((output_dir / "manifest.json").read_text(encoding="utf-8"))
+        counts = {shard["key"]: shard["count"] for shard in manifest["shards"]}
+        self.assertEqual(counts, {"Lorem Org": 5, None: 1})
+        shard = json.loads((output_dir / "unassigned.json").read_text(encoding="utf-8"))
+        self.assertEqual(shard["cases"][0]["title"], "Unassigned Campaign")
+
+        stdout = StringIO()
+        call_command("export_casebook", shard_by="organization", output_dir=str(output_dir), workers=1, stdout=stdout)
+        self.assertIn("Wrote 0 shards, skipped 2 unchanged.", stdout.getvalue())
+
+    def test_sharded_export_only_removes_stale_shards_inside_the_output_dir(self):
+        output_dir = Path(self.tmp.name) / "shards"
+        output_dir.mkdir()
+        outside = Path(self.tmp.name) / "keep.json"
+        kept = [outside, output_dir / "notes.txt"]
+        for path in [*kept, output_dir / "retired.json"]:
+            path.write_text("{}")
+        entries = ["../keep.json", str(outside), "notes.txt", "retired.json", None]
+        manifest = {"shards": [{"file": name, "sha256": ""} for name in entries]}
+        (output_dir / "manifest.json").write_text(json.dumps(manifest))
+
+        call_command(
+            "export_casebook", shard_by="organization", output_dir=str(output_dir), workers=1, stdout=StringIO()
+        )
+        self.assertTrue(all(path.exists() for path in kept))
+        self.assertFalse((output_dir / "retired.json").exists())
+
+    def test_every_format_round_trips(self):
+        expected = json.loads(self._export("export.json").read_text(encoding="utf-8"))["cases"]
+        for export_format in FORMATS:
+            for compact in (False, True):
+                with self.subTest(export_format=export_format, compact=compact):
+                    output = self._export(f"export.{export_format}", format=export_format, compact=compact)
+                    header, cases = read_export(output)
+                    self.assertEqual(cases, expected)
+                    if not export_format.startswith("ndjson"):
+                        self.assertEqual(header["count"], 5)
+
+    def test_msgpack_is_read_incrementally(self):
+        output = self._export("export.msgpack", format="msgpack")
+        header, cases = read_export(output)
+        with output.open("rb") as handle:
+            self.assertEqual(list(iter_unpack(handle, chunk_size=7)), [header, *cases])
+        with self.assertRaisesMessage(ValueError, "Truncated"):
+            list(iter_unpack(BytesIO(output.read_bytes()[:-3])))
+
+    def test_renditions_are_split_across_worker_processes(self):
+        self.addCleanup(cache.clear)
+        for case, title in zip(CaseStudy.objects.order_by("pk"), ["first", "second", "third"]):
+            CaseAsset.objects.create(case_study=case, image=_create_image(title))
+        report = renditions.RenditionReport()
+        missing = renditions.find_missing_renditions(["fill-160x90", "max-80x80"], report)
+        bogus = next(iter(missing))
+        missing[bogus] = missing[bogus] + ["bogus-spec"]
+        pools = []
+
+        class InlinePool:
+            """Runs each task here, through pickle as a worker process would: the test database is in memory."""
+
+            def __init__(self, max_workers, initializer):
+                self.max_workers = max_workers
+                self.initializer = initializer
+                self.tasks = []
+                pools.append(self)
+
+            def __enter__(self):
+                self.initializer()
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def submit(self, fn, *args):
+                fn, args = pickle.loads(pickle.dumps((fn, args)))
+                self.tasks.append(args)
+                future = Future()
+                future.set_result(pickle.loads(pickle.dumps(fn(*args))))
+                return future
+
+        # Closing connections would end the test's transaction; the pool is what's under test.
+        with mock.patch.object(renditions, "ProcessPoolExecutor", InlinePool), mock.patch.object(
+            renditions.connections, "close_all"
+        ) as close_all:
+            renditions.generate_renditions(missing, report, workers=2)
+
+        close_all.assert_called_once_with()
+        (pool,) = pools
+        self.assertEqual(pool.max_workers, 2)
+        self.assertIs(pool.initializer, renditions._init_worker)
+        self.assertEqual(sorted(pool.tasks), sorted(missing.items()))
+        self.assertEqual(report.generated, 6)
+        self.assertEqual([(image_id, spec) for image_id, spec, _ in report.failed], [(bogus, "bogus-spec")])
+        self.assertEqual(renditions.find_missing_renditions(["fill-160x90", "max-80x80"], report), {})
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImportCasebookTests(ExportedCasesMixin, TestCase):
+    def test_import_restores_an_export(self):
+        def cases(path):
+            return [{**case, "updated_at": None} for case in read_export(path)[1]]
+
+        full = self._export("full.json", include_notes=True)
+        CaseStudy.objects.all().delete()
+        Organization.objects.all().delete()
+
+        stdout = StringIO()
+        call_command("import_casebook", input=str(full), batch_size=2, stdout=stdout)
+        self.assertIn("Imported 5 cases (5 created, 0 updated), 5 metrics and 5 channel spend rows", stdout.getvalue())
+        self.assertEqual(cases(self._export("restored.json", include_notes=True)), cases(full))
+        response = self.client.get(reverse("casebook_index"), {"q": "campaign"})
+        self.assertEqual(len(response.context["cases"]), 5)
+
+        ndjson = self._export("restored.ndjson.gz", format="ndjson.gz")
+        call_command("import_casebook", input=str(ndjson), stdout=stdout)
+        self.assertIn("(0 created, 5 updated)", stdout.getvalue())
+        self.assertEqual(CaseMetric.objects.count(), 5)
+
+        csv_path = Path(self.tmp.name) / "flat.csv"
+        csv_path.write_text("title,organization,tags,spend_amount_min\nCampaign 0,Globex,\"new, lorem\",1 000\n")
+        call_command("import_casebook", input=str(csv_path), stdout=stdout, stderr=StringIO())
+        self.assertIn("Imported 0 cases", stdout.getvalue())
+        csv_path.write_text("title,organization,tags\nCampaign 0,Globex,\"new, lorem\"\n")
+        call_command("import_casebook", input=str(csv_path), stdout=stdout)
+        case = CaseStudy.objects.get(slug="campaign-0-2")
+        self.assertEqual(case.organization.name, "Globex")
+        self.assertEqual(sorted(case.tags.names()), ["lorem", "new"])
+
+    def test_import_uses_the_requested_format(self):
+        dump = self._export("export.ndjson", format="ndjson").rename(Path(self.tmp.name) / "dump.txt")
+        stdout = StringIO()
+        call_command("import_casebook", input=str(dump), format="ndjson", stdout=stdout)
+        self.assertIn("Imported 5 cases (0 created, 5 updated)", stdout.getvalue())
+
+        envelope = Path(self.tmp.name) / "empty.json"
+        envelope.write_text('{"generated_at": "2025-01-01T00:00:00+00:00", "count": 0}')
+        with self.assertRaisesMessage(CommandError, 'no "cases" list'):
+            call_command("import_casebook", input=str(envelope), stdout=stdout)
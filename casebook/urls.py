@@ -1,12 +1,16 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.casebook_index, name="casebook_index"),
     path("new/", views.casebook_create, name="casebook_create"),
     path("organizations/", views.organization_list, name="casebook_organizations"),
     path("industries/", views.industry_list, name="casebook_industries"),
+    path("analytics/", views.casebook_analytics, name="casebook_analytics"),
+    path("export/", views.casebook_export, name="casebook_export"),
+    path("api/cases/", api.case_list, name="casebook_api_cases"),
+    path("api/cases/<slug:slug>/", api.case_detail, name="casebook_api_case"),
     path("<slug:slug>/", views.casebook_detail, name="casebook_detail"),
     path("<slug:slug>/edit/", views.casebook_edit, name="casebook_edit"),
     path("<slug:slug>/delete/", views.casebook_delete, name="casebook_delete"),
@@ -1,5 +1,7 @@
-from django.db.models import Q
+from django.db.models import Prefetch
+from django.http import FileResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_safe
 
 from .forms import (
     CaseAssetFormSet,
@@ -9,56 +11,142 @@ from .forms import (
     OrganizationForm,
     CaseStudyForm,
 )
-from .models import CaseStudy, Industry, Organization
+from . import analytics
+from .benchmarks import attach_sector_benchmarks
+from .caching import CSRF_PLACEHOLDER, cached_page
+from .conditional import collection_version, conditional_page, make_etag, not_modified, set_validators
+from .export import FORMATS, open_download
+from .facets import FACETS, apply_filters, facet_counts
+from .fx import base_currency
+from .models import CASE_ORDERING, CaseAsset, CaseStudy, FxRate, Industry, Organization
+from .pagination import cursor_url, paginate, requested_page_size
+from .replica import replica_reads
+from .renditions import renditions_prefetch, responsive_candidate_specs, thumbnail_candidate_specs
+from .search import filter_cases, fts_available, search_cases
 
 
+def _hero_assets_prefetch():
+    assets = (
+        CaseAsset.objects.filter(is_hero=True, image__isnull=False)
+        .select_related("image")
+        .prefetch_related(renditions_prefetch(thumbnail_candidate_specs(), "image__renditions"))
+    )
+    return Prefetch("assets", queryset=assets, to_attr="hero_assets")
+
+
+def _index_version(request):
+    count, latest = collection_version(CaseStudy.objects.all())
+    return [count, latest], latest
+
+
+def _case_version(request, slug):
+    # Metric percentiles rank the case among its sector, whose peers_updated_at follows every change
+    # to its cases (including one joining or leaving it).
+    version = CaseStudy.objects.filter(slug=slug).values_list("updated_at", "sector__peers_updated_at").first()
+    if version is None:
+        return None
+    latest, peers_latest = version
+    return [latest, peers_latest], max(latest, peers_latest or latest)
+
+
+@replica_reads
+@conditional_page(_index_version)
+@cached_page(lambda request: "index")
 def casebook_index(request):
     query = request.GET.get("q", "").strip()
-    organization = request.GET.get("organization", "").strip()
-    sector = request.GET.get("sector", "").strip()
-    tag = request.GET.get("tag", "").strip()
-
-    cases = CaseStudy.objects.select_related("organization", "sector").all().prefetch_related("tags")
-
-    if query:
-        cases = cases.filter(
-            Q(title__icontains=query)
-            | Q(organization__name__icontains=query)
-            | Q(sector__name__icontains=query)
-            | Q(brand_or_campaign__icontains=query)
-            | Q(one_liner__icontains=query)
+    filters = {facet: request.GET.get(facet, "").strip() for facet in FACETS}
+    if not filters["year"].isdigit():
+        filters["year"] = ""
+
+    scope = filter_cases(CaseStudy.objects.all(), query)
+    facets = facet_counts(scope, filters, query)
+
+    cases = apply_filters(
+        CaseStudy.objects.select_related("organization", "sector").prefetch_related("tags", _hero_assets_prefetch()),
+        filters,
+    )
+    if query and fts_available():
+        page = search_cases(
+            query,
+            cases,
+            requested_page_size(request),
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
         )
-    if organization:
-        cases = cases.filter(organization_id=organization)
-    if sector:
-        cases = cases.filter(sector_id=sector)
-    if tag:
-        cases = cases.filter(tags__name__iexact=tag)
-
-    cases = cases.distinct().order_by("-sort_date", "-date_end", "-date_start", "title")
+        matched = cases.in_bulk([pk for pk, _ in page])
+        cases = []
+        for pk, snippet in page:
+            if pk in matched:
+                matched[pk].search_snippet = snippet
+                cases.append(matched[pk])
+    else:
+        page = paginate(
+            apply_filters(scope, filters)
+            .select_related("organization", "sector")
+            .prefetch_related("tags", _hero_assets_prefetch())
+            .distinct(),
+            CASE_ORDERING,
+            requested_page_size(request),
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+        cases = page.items
+    next_url = cursor_url(request, "after", page.next_cursor) if page.has_next else None
+    previous_url = cursor_url(request, "before", page.previous_cursor) if page.has_previous else None
     return render(
         request,
         "casebook/index.html",
         {
             "cases": cases,
             "query": query,
-            "organization": organization,
-            "sector": sector,
-            "tag": tag,
-            "organizations": Organization.objects.all(),
-            "sectors": Industry.objects.all(),
+            **filters,
+            "facets": facets,
+            "next_url": next_url,
+            "previous_url": previous_url,
+            "csrf_token": CSRF_PLACEHOLDER,
         },
     )
 
 
+@replica_reads
+@conditional_page(_case_version)
+@cached_page(lambda request, slug: f"case:{slug}")
 def casebook_detail(request, slug):
+    assets = CaseAsset.objects.select_related("image", "video").prefetch_related(
+        renditions_prefetch(responsive_candidate_specs(), "image__renditions")
+    )
     case = get_object_or_404(
-        CaseStudy.objects.prefetch_related("assets__image", "assets__video", "metrics", "channel_spend", "tags"),
+        CaseStudy.objects.select_related("organization", "sector").prefetch_related(
+            Prefetch("assets", queryset=assets), "metrics", "channel_spend", "tags"
+        ),
         slug=slug,
     )
+    attach_sector_benchmarks(case)
     return render(request, "casebook/detail.html", {"case": case})
 
 
+@replica_reads
+@cached_page(lambda request: "analytics")
+def casebook_analytics(request):
+    return render(request, "casebook/analytics.html", {**analytics.dashboard(), "base_currency": base_currency()})
+
+
+@replica_reads
+@require_safe
+def casebook_export(request):
+    export_format = request.GET.get("format", "json")
+    if export_format not in FORMATS:
+        return HttpResponseBadRequest(f"Unknown export format; expected one of {', '.join(FORMATS)}.")
+    count, latest = collection_version(CaseStudy.objects.all())
+    etag = make_etag("export", export_format, count, latest)
+    response = not_modified(request, etag, latest)
+    if response is not None:
+        return response
+    download = open_download(export_format, etag.strip('"'))
+    response = FileResponse(download, as_attachment=True, filename=f"casebook_export.{export_format}")
+    return set_validators(response, etag, latest)
+
+
 def _build_case_form_bundle(request, instance=None):
     case_form = CaseStudyForm(request.POST or None, instance=instance)
     asset_formset = CaseAssetFormSet(request.POST or None, request.FILES or None, instance=instance, prefix="assets")
@@ -81,13 +169,15 @@ def casebook_create(request):
             and metric_formset.is_valid()
             and channel_spend_formset.is_valid()
         ):
-            case = case_form.save()
-            asset_formset.instance = case
-            metric_formset.instance = case
-            channel_spend_formset.instance = case
-            asset_formset.save()
-            metric_formset.save()
-            channel_spend_formset.save()
+            # Every spend row converts at the same rates, read once.
+            with FxRate.pinned():
+                case = case_form.save()
+                asset_formset.instance = case
+                metric_formset.instance = case
+                channel_spend_formset.instance = case
+                asset_formset.save()
+                metric_formset.save()
+                channel_spend_formset.save()
             return redirect("casebook_detail", slug=case.slug)
 
     return render(
@@ -117,10 +207,11 @@ def casebook_edit(request, slug):
             and metric_formset.is_valid()
             and channel_spend_formset.is_valid()
         ):
-            case = case_form.save()
-            asset_formset.save()
-            metric_formset.save()
-            channel_spend_formset.save()
+            with FxRate.pinned():
+                case = case_form.save()
+                asset_formset.save()
+                metric_formset.save()
+                channel_spend_formset.save()
             return redirect("casebook_detail", slug=case.slug)
 
     return render(
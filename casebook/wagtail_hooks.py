@@ -1,10 +1,11 @@
 import django_filters
 from taggit.models import Tag
 from wagtail.admin.filters import WagtailFilterSet
+from wagtail.admin.ui.tables import Column
 from wagtail.snippets.models import register_snippet
 from wagtail.snippets.views.snippets import SnippetViewSet
 
-from .models import CaseStudy
+from .models import CaseStudy, FxRate
 
 
 class CaseStudyFilterSet(WagtailFilterSet):
@@ -24,9 +25,21 @@ class CaseStudyViewSet(SnippetViewSet):
     icon = "folder-open-inverse"
     menu_label = "Case Studies"
     menu_name = "case_studies"
-    list_display = ["title", "organization", "sector", "sort_date"]
+    list_display = ["title", "organization", "sector", Column("sort_date", label="Sort date", sort_key="sort_end")]
     search_fields = ["title", "organization__name", "sector__name", "brand_or_campaign", "one_liner"]
     filterset_class = CaseStudyFilterSet
 
 
 register_snippet(CaseStudyViewSet)
+
+
+class FxRateViewSet(SnippetViewSet):
+    model = FxRate
+    icon = "form"
+    menu_label = "FX Rates"
+    menu_name = "fx_rates"
+    list_display = ["currency", "rate_date", "rate"]
+    list_filter = ["currency"]
+
+
+register_snippet(FxRateViewSet)
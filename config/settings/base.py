@@ -50,11 +50,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "casebook.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "casebook.replica.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "casebook.profiling.ProfileMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "wagtail.contrib.redirects.middleware.RedirectMiddleware",
@@ -64,7 +67,9 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # django.template.backends.django.DjangoTemplates that also times renders for
+        # casebook.instrumentation.RequestMetricsMiddleware.
+        "BACKEND": "casebook.instrumentation.DjangoTemplates",
         "DIRS": [
             PROJECT_DIR / "templates",
             BASE_DIR / "templates",
@@ -94,6 +99,23 @@ DATABASES = {
     }
 }
 
+# Public read-only views and export_casebook read from CASEBOOK_REPLICA_DATABASE
+# when DATABASES defines it; writes always go to default. For a local SQLite
+# replica, add to local.py:
+#   DATABASES["replica"] = {
+#       "ENGINE": "django.db.backends.sqlite3",
+#       "NAME": BASE_DIR / "db.replica.sqlite3",
+#       "TEST": {"MIRROR": "default"},
+#   }
+# and keep it current with `manage.py sync_replica --interval 5`.
+DATABASE_ROUTERS = ["casebook.replica.ReplicaRouter"]
+
+# Overrides for casebook.db.DEFAULT_PRAGMAS, which configure_sqlite runs on every
+# new SQLite connection (WAL, synchronous=NORMAL, busy_timeout=5000, a larger
+# cache and mmap, in-memory temp tables), e.g. {"busy_timeout": 10000}. A value
+# of None leaves that PRAGMA at SQLite's default.
+CASEBOOK_SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -172,6 +194,69 @@ WAGTAILSEARCH_BACKENDS = {
     }
 }
 
+# Caches
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Rendered casebook pages, facet counts and their version tokens. Switch to
+    # django.core.cache.backends.filebased.FileBasedCache (LOCATION: a directory)
+    # or a shared server cache when running several processes; a configured read
+    # replica requires it (system check casebook.E001).
+    "casebook": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "casebook",
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+}
+
+# Casebook
+# Cache alias for rendered pages and facet counts, and how long a cached page may live.
+CASEBOOK_CACHE = "casebook"
+CASEBOOK_PAGE_CACHE_TIMEOUT = 3600
+# Rows per casebook index page; ?page_size= may ask for up to CASEBOOK_MAX_PAGE_SIZE.
+CASEBOOK_PAGE_SIZE = 50
+CASEBOOK_MAX_PAGE_SIZE = 200
+# Generate the template and export renditions of an asset image in the background
+# after it is saved, on at most CASEBOOK_RENDITION_WORKERS threads (0 renders inline).
+CASEBOOK_WARM_RENDITIONS_ON_SAVE = True
+CASEBOOK_RENDITION_WORKERS = 2
+# Modern formats offered by the casebook image tags, in order of preference.
+CASEBOOK_IMAGE_FORMATS = ["avif", "webp"]
+# Where /casebook/export/ keeps the export file built for the current casebook version.
+CASEBOOK_EXPORT_DOWNLOAD_DIR = BASE_DIR / "exports" / "downloads"
+# Currency that spend amounts are converted into (at the latest FxRate) for totals.
+CASEBOOK_BASE_CURRENCY = "GBP"
+# Seconds a cached set of index facet counts may live; edits invalidate it immediately.
+CASEBOOK_FACET_CACHE_TIMEOUT = 300
+# Database alias read by the public read-only views (see DATABASE_ROUTERS), and how
+# long a visitor's reads stay on default after a request of theirs wrote.
+CASEBOOK_REPLICA_DATABASE = "replica"
+CASEBOOK_REPLICA_PIN_SECONDS = 10
+# Add a Server-Timing header and log a line of SQL and timing metrics to the
+# casebook.requests logger for every request, listing the slowest statements.
+CASEBOOK_REQUEST_METRICS = False
+CASEBOOK_REQUEST_METRICS_SLOWEST = 5
+# A statement run this many times in one request is flagged as a likely N+1 query.
+CASEBOOK_DUPLICATE_QUERY_THRESHOLD = 5
+# Where `--profile` and profiled staff requests (?_profile or an X-Casebook-Profile
+# header) write cProfile .pstats files, and how many functions by cumulative time they print.
+CASEBOOK_PROFILE_DIR = BASE_DIR / "profiles"
+CASEBOOK_PROFILE_TOP = 30
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        # One JSON line per request when CASEBOOK_REQUEST_METRICS is on.
+        "casebook.requests": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        # Hot spots of profiled staff requests.
+        "casebook.profiling": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 # Base URL to use when referring to full URLs within the Wagtail admin backend -
 # e.g. in notification emails. Don't include '/admin' or a trailing slash
 WAGTAILADMIN_BASE_URL = "http://example.com"